@@ -1,11 +1,20 @@
+import os
 import uuid
-from datetime import datetime
+from datetime import datetime, timedelta
 from typing import Optional
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.core import dependencies, models, store
+from app.config import settings
+from app.core import dependencies, models, profiling, store
+from app.services import (
+    get_model_registry,
+    get_remoderation_runner,
+    get_scheduler,
+    whatif,
+)
+from app.services.registry import MAX_VERSION_LENGTH
 
 router = APIRouter(prefix="/admin", tags=["admin"])
 
@@ -33,16 +42,64 @@ async def get_request(
 async def update_request(
     request_id: str,
     update: models.ModerationUpdate,
-    _: models.AdminUser = Depends(dependencies.require_admin),
+    admin: models.AdminUser = Depends(dependencies.require_admin),
     session: AsyncSession = Depends(dependencies.get_db_session),
 ) -> models.ModerationResponse:
     request_uuid = uuid.UUID(request_id)
-    db_request, db_result = await store.update_moderation_result(session, request_uuid, update)
+    db_request, db_result = await store.update_moderation_result(
+        session, request_uuid, update, moderator_id=uuid.UUID(admin.user_id)
+    )
     return models.ModerationResponse(
         request=store.map_request_to_api(db_request), result=store.map_result_to_api(db_result)
     )
 
 
+@router.get("/search", response_model=list[models.SearchHit])
+async def search_requests(
+    q: str = Query(..., min_length=1, max_length=500),
+    service_id: Optional[str] = None,
+    decision: Optional[models.ModerationDecision] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    limit: int = Query(default=50, ge=1, le=500),
+    offset: int = Query(default=0, ge=0),
+    _: models.AdminUser = Depends(dependencies.require_admin),
+    session: AsyncSession = Depends(dependencies.get_db_session),
+) -> list[models.SearchHit]:
+    service_uuid = uuid.UUID(service_id) if service_id else None
+    return await store.search_requests(
+        session, q, service_uuid, decision, since, until, limit, offset
+    )
+
+
+@router.get("/review-queue", response_model=list[models.ReviewItem])
+async def list_review_queue(
+    service_id: Optional[str] = None,
+    limit: int = Query(default=50, ge=1, le=500),
+    offset: int = Query(default=0, ge=0),
+    _: models.AdminUser = Depends(dependencies.require_admin),
+    session: AsyncSession = Depends(dependencies.get_db_session),
+) -> list[models.ReviewItem]:
+    service_uuid = uuid.UUID(service_id) if service_id else None
+    return await store.list_review_queue(session, service_uuid, limit, offset)
+
+
+@router.post("/review-queue/claim", response_model=list[models.ReviewItem])
+async def claim_review_items(
+    claim: models.ReviewClaimRequest,
+    admin: models.AdminUser = Depends(dependencies.require_admin),
+    session: AsyncSession = Depends(dependencies.get_db_session),
+) -> list[models.ReviewItem]:
+    """Lease the next items to the caller; resolve each with ``PATCH /admin/requests/{id}``."""
+    return await store.claim_review_items(
+        session,
+        uuid.UUID(admin.user_id),
+        claim.count,
+        settings.review_claim_lease_seconds,
+        uuid.UUID(claim.service_id) if claim.service_id else None,
+    )
+
+
 @router.get("/categories", response_model=list[models.ViolationCategory])
 async def list_categories(
     _: models.AdminUser = Depends(dependencies.require_admin),
@@ -79,6 +136,35 @@ async def get_statistics(
     return await store.compute_statistics(session, service_uuid)
 
 
+@router.post("/statistics/what-if", response_model=models.WhatIfReport)
+async def replay_thresholds(
+    request: models.WhatIfRequest,
+    _: models.AdminUser = Depends(dependencies.require_admin),
+    session: AsyncSession = Depends(dependencies.get_db_session),
+) -> models.WhatIfReport:
+    """Re-decide stored results under proposed thresholds and rules, without inference."""
+    return await whatif.replay(session, request)
+
+
+@router.get("/shadow/report", response_model=list[models.ShadowReport])
+async def shadow_report(
+    candidate_version: Optional[str] = None,
+    hours: float = Query(default=24.0, gt=0, le=24 * 90),
+    _: models.AdminUser = Depends(dependencies.require_admin),
+    session: AsyncSession = Depends(dependencies.get_db_session),
+) -> list[models.ShadowReport]:
+    """Decision agreement and model time of shadow candidates over the last ``hours``."""
+    since = datetime.utcnow() - timedelta(hours=hours)
+    return await store.shadow_reports(session, since, candidate_version)
+
+
+@router.get("/scheduler", response_model=list[models.SchedulerQueueStats])
+async def get_scheduler_stats(
+    _: models.AdminUser = Depends(dependencies.require_admin),
+) -> list[models.SchedulerQueueStats]:
+    return get_scheduler().snapshot()
+
+
 @router.get("/services", response_model=list[models.WebService])
 async def list_services(
     _: models.AdminUser = Depends(dependencies.require_admin),
@@ -96,6 +182,63 @@ async def create_service(
     return await store.create_service(session, payload)
 
 
+@router.patch("/services/{service_id}/limits", response_model=models.WebService)
+async def update_service_limits(
+    service_id: str,
+    limits: models.ServiceLimits,
+    _: models.AdminUser = Depends(dependencies.require_admin),
+    session: AsyncSession = Depends(dependencies.get_db_session),
+) -> models.WebService:
+    return await store.update_service_limits(session, uuid.UUID(service_id), limits)
+
+
+@router.put("/services/{service_id}/webhook", response_model=models.WebService)
+async def update_service_webhook(
+    service_id: str,
+    config: models.WebhookConfig,
+    _: models.AdminUser = Depends(dependencies.require_admin),
+    session: AsyncSession = Depends(dependencies.get_db_session),
+) -> models.WebService:
+    return await store.update_service_webhook(session, uuid.UUID(service_id), config)
+
+
+@router.get("/services/{service_id}/categories", response_model=list[models.ViolationCategory])
+async def get_service_categories(
+    service_id: str,
+    _: models.AdminUser = Depends(dependencies.require_admin),
+    session: AsyncSession = Depends(dependencies.get_db_session),
+) -> list[models.ViolationCategory]:
+    return await store.get_service_categories(session, uuid.UUID(service_id))
+
+
+@router.put("/services/{service_id}/categories", response_model=list[models.ViolationCategory])
+async def update_service_categories(
+    service_id: str,
+    subscription: models.ServiceCategories,
+    _: models.AdminUser = Depends(dependencies.require_admin),
+    session: AsyncSession = Depends(dependencies.get_db_session),
+) -> list[models.ViolationCategory]:
+    """Moderate the service only for these categories; models none of them need are skipped."""
+    return await store.set_service_categories(session, uuid.UUID(service_id), subscription)
+
+
+@router.get("/services/{service_id}/usage", response_model=models.ServiceUsage)
+async def get_service_usage(
+    service_id: str,
+    _: models.AdminUser = Depends(dependencies.require_admin),
+    session: AsyncSession = Depends(dependencies.get_db_session),
+) -> models.ServiceUsage:
+    return await store.get_service_usage(session, uuid.UUID(service_id))
+
+
+@router.get("/usage", response_model=list[models.ServiceUsage])
+async def list_service_usage(
+    _: models.AdminUser = Depends(dependencies.require_admin),
+    session: AsyncSession = Depends(dependencies.get_db_session),
+) -> list[models.ServiceUsage]:
+    return await store.list_service_usage(session)
+
+
 @router.post("/services/{service_id}/api-keys", response_model=models.APIKeyIssueResponse)
 async def issue_api_key(
     service_id: str,
@@ -144,3 +287,144 @@ async def create_admin_user(
             status_code=status.HTTP_403_FORBIDDEN, detail="Only SUPER_ADMIN can create users"
         )
     return await store.create_admin_user(session, payload)
+
+
+@router.post(
+    "/profile",
+    response_class=Response,
+    responses={200: {"content": {"application/zip": {}}}},
+)
+async def profile_worker(
+    options: models.ProfileRequest,
+    current_user: models.AdminUser = Depends(dependencies.require_admin),
+) -> Response:
+    """Profile the worker serving this call; see ``app.core.profiling`` for the archive."""
+    if current_user.role != models.UserRole.SUPER_ADMIN:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN, detail="Only SUPER_ADMIN can profile workers"
+        )
+    archive = await profiling.run(options)
+    filename = f"profile-{os.getpid()}-{datetime.utcnow():%Y%m%dT%H%M%S}.zip"
+    return Response(
+        archive,
+        media_type="application/zip",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
+@router.get("/models", response_model=models.ModelRegistryStatus)
+async def get_models(
+    _: models.AdminUser = Depends(dependencies.require_admin),
+) -> models.ModelRegistryStatus:
+    return get_model_registry().status()
+
+
+@router.post(
+    "/models/{version}/activate",
+    response_model=models.ModelRegistryStatus,
+    status_code=status.HTTP_202_ACCEPTED,
+)
+async def activate_model(
+    version: str,
+    current_user: models.AdminUser = Depends(dependencies.require_admin),
+) -> models.ModelRegistryStatus:
+    """Load and warm up a registry version here, then switch every worker to it."""
+    if current_user.role != models.UserRole.SUPER_ADMIN:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN, detail="Only SUPER_ADMIN can deploy models"
+        )
+    if len(version) > MAX_VERSION_LENGTH:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=f"Model version names are at most {MAX_VERSION_LENGTH} characters",
+        )
+    registry = get_model_registry()
+    if version not in {entry.version for entry in registry.versions()}:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Model version not found")
+    if not registry.deploy(version):
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="A model version is loading")
+    return registry.status()
+
+
+@router.get("/remoderation-jobs", response_model=list[models.RemoderationJob])
+async def list_remoderation_jobs(
+    _: models.AdminUser = Depends(dependencies.require_admin),
+    session: AsyncSession = Depends(dependencies.get_db_session),
+) -> list[models.RemoderationJob]:
+    return await store.list_remoderation_jobs(session)
+
+
+@router.get("/remoderation-jobs/{job_id}", response_model=models.RemoderationJob)
+async def get_remoderation_job(
+    job_id: str,
+    _: models.AdminUser = Depends(dependencies.require_admin),
+    session: AsyncSession = Depends(dependencies.get_db_session),
+) -> models.RemoderationJob:
+    return store.map_remoderation_job_to_api(await store.get_remoderation_job(session, uuid.UUID(job_id)))
+
+
+@router.post(
+    "/remoderation-jobs",
+    response_model=models.RemoderationJob,
+    status_code=status.HTTP_202_ACCEPTED,
+)
+async def create_remoderation_job(
+    spec: models.RemoderationJobCreate,
+    current_user: models.AdminUser = Depends(dependencies.require_admin),
+    session: AsyncSession = Depends(dependencies.get_db_session),
+) -> models.RemoderationJob:
+    """Re-score stored comments with the serving model, in the background of this worker."""
+    if current_user.role != models.UserRole.SUPER_ADMIN:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN, detail="Only SUPER_ADMIN can re-moderate history"
+        )
+    job = await store.create_remoderation_job(
+        session, spec, get_model_registry().deployed, uuid.UUID(current_user.user_id)
+    )
+    get_remoderation_runner().launch(job.job_id)
+    return store.map_remoderation_job_to_api(job)
+
+
+@router.post("/remoderation-jobs/{job_id}/pause", response_model=models.RemoderationJob)
+async def pause_remoderation_job(
+    job_id: str,
+    current_user: models.AdminUser = Depends(dependencies.require_admin),
+    session: AsyncSession = Depends(dependencies.get_db_session),
+) -> models.RemoderationJob:
+    """Stop the job after its current page, on whichever worker runs it."""
+    if current_user.role != models.UserRole.SUPER_ADMIN:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN, detail="Only SUPER_ADMIN can re-moderate history"
+        )
+    return store.map_remoderation_job_to_api(await store.pause_remoderation_job(session, uuid.UUID(job_id)))
+
+
+@router.post(
+    "/remoderation-jobs/{job_id}/resume",
+    response_model=models.RemoderationJob,
+    status_code=status.HTTP_202_ACCEPTED,
+)
+async def resume_remoderation_job(
+    job_id: str,
+    current_user: models.AdminUser = Depends(dependencies.require_admin),
+    session: AsyncSession = Depends(dependencies.get_db_session),
+) -> models.RemoderationJob:
+    """Continue a paused, failed or orphaned job from its checkpoint on this worker."""
+    if current_user.role != models.UserRole.SUPER_ADMIN:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN, detail="Only SUPER_ADMIN can re-moderate history"
+        )
+    job = await store.get_remoderation_job(session, uuid.UUID(job_id))
+    job_status = models.RemoderationJobStatus
+    if job.status == job_status.COMPLETED.value or (
+        job.status == job_status.RUNNING.value
+        and job.updated_at > datetime.utcnow() - timedelta(seconds=settings.remoderation_stale_seconds)
+    ):
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=f"Job is {job.status}")
+    if job.target_version != get_model_registry().deployed:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Job was created for another model version; create a new job",
+        )
+    get_remoderation_runner().launch(job.job_id)
+    return store.map_remoderation_job_to_api(job)
@@ -1,26 +1,358 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+import asyncio
+import json
+import logging
+from typing import Dict, FrozenSet, List, Optional, Tuple
+
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, WebSocket, WebSocketDisconnect, status
+from starlette.requests import ClientDisconnect
+from starlette.types import Receive, Scope, Send
+import pydantic_core
+from pydantic import ValidationError
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.core import dependencies, models, store
-from app.services import evaluate_text
+from app.config import settings
+from app.core import deadlines, dependencies, metrics, models, ratelimit, store, tracing
+from app.db import models as db_models
+from app.db.session import get_session
+from app.services import bulk, detectors_for, get_degraded_mode, get_duplicate_index, get_scheduler
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/moderation", tags=["moderation"])
 
+STREAM_CONNECTIONS = metrics.Gauge(
+    "moderation_stream_connections", "Open WebSocket moderation streams."
+)
+
+
+async def moderate_text(
+    session: AsyncSession,
+    service: db_models.WebService,
+    payload: models.ModerationRequestIn,
+    deadline: Optional[deadlines.Deadline] = None,
+) -> Tuple[db_models.ModerationRequest, db_models.ModerationResult, models.ModerationResult]:
+    if deadline is not None:
+        deadline.check("admission")
+    with tracing.stage("db_write"):
+        db_request = await store.save_moderation_request(session, service, payload)
+    detectors = detectors_for(await store.active_category_types(session, service.service_id))
+    try:
+        result, degraded = await _decide(service, db_request, payload, deadline, detectors)
+        if deadline is not None:
+            deadline.check("result_write")
+    except deadlines.DeadlineExceeded:
+        await store.fail_moderation_request(session, db_request)
+        raise
+    with tracing.stage("db_result_write"):
+        db_result = await store.save_moderation_result(
+            session, db_request, result, service, rescore_pending=degraded
+        )
+    metrics.DECISIONS_TOTAL.inc(service_id=str(service.service_id), decision=result.decision.value)
+    return db_request, db_result, result
+
+
+async def _decide(
+    service: db_models.WebService,
+    db_request: db_models.ModerationRequest,
+    payload: models.ModerationRequestIn,
+    deadline: Optional[deadlines.Deadline],
+    detectors: Optional[FrozenSet[str]] = None,
+) -> Tuple[models.ModerationResult, bool]:
+    """The decision for one comment and whether it was made in degraded mode."""
+    if settings.near_duplicate_enabled:
+        with tracing.stage("near_duplicate"):
+            result = get_duplicate_index().lookup(str(service.service_id), payload.content_text)
+        if result is not None:
+            return result, False
+    if not get_degraded_mode().check():
+        try:
+            with tracing.stage("inference"):
+                result = await get_scheduler().submit(
+                    service.service_id,
+                    payload.content_text,
+                    priority=payload.priority,
+                    weight=service.scheduling_weight or 1.0,
+                    deadline=deadline,
+                    request_id=db_request.request_id,
+                    detectors=detectors,
+                )
+        except deadlines.DeadlineExceeded:
+            raise
+        except Exception:
+            if not settings.degraded_mode_enabled:
+                raise
+            logger.exception("Inference failed, deciding request %s lexically", db_request.request_id)
+        else:
+            if settings.near_duplicate_enabled:
+                get_duplicate_index().add(
+                    str(service.service_id), str(db_request.request_id), payload.content_text, result
+                )
+            return result, False
+    with tracing.stage("degraded"):
+        return get_degraded_mode().decide(payload.content_text), True
+
+
+def _api_result(
+    db_request: db_models.ModerationRequest,
+    db_result: db_models.ModerationResult,
+    result: models.ModerationResult,
+) -> models.ModerationResult:
+    # Everything here was validated on the way in, so nothing is parsed or checked again.
+    return models.ModerationResult.model_construct(
+        result_id=str(db_result.result_id),
+        request_id=str(db_request.request_id),
+        decision=result.decision,
+        confidence_score=result.confidence_score,
+        processed_at=result.processed_at,
+        model_version=result.model_version,
+        label_scores=result.label_scores or {},
+    )
+
+
+def moderation_response_body(
+    db_request: db_models.ModerationRequest,
+    db_result: db_models.ModerationResult,
+    result: models.ModerationResult,
+    timings: Optional[List[models.StageTiming]] = None,
+) -> bytes:
+    """``ModerationResponse`` JSON encoded straight from in-memory values.
+
+    Mirrors the model field by field; pydantic-core encodes UUIDs, datetimes and enums
+    exactly as the model serializer would, without building or validating models.
+    """
+    return pydantic_core.to_json(
+        {
+            "request": {
+                "request_id": db_request.request_id,
+                "service_id": db_request.service_id,
+                "timestamp": db_request.timestamp,
+                "content_type": db_request.content_type,
+                "content_text": db_request.content_text,
+                "status": db_request.status,
+            },
+            "result": {
+                "result_id": db_result.result_id,
+                "request_id": db_request.request_id,
+                "decision": result.decision,
+                "confidence_score": result.confidence_score,
+                "processed_at": result.processed_at,
+                "model_version": result.model_version,
+                "label_scores": result.label_scores or {},
+            },
+            "timings": timings,
+        }
+    )
+
 
 @router.post("/text", response_model=models.ModerationResponse)
 async def create_text_moderation(
     payload: models.ModerationRequestIn,
+    request: Request,
+    response: Response,
+    # Declared before ``service`` so the deadline counts from arrival and the auth and
+    # rate-limit stages land in the trace.
+    deadline: deadlines.Deadline = Depends(dependencies.request_deadline),
+    trace: Optional[tracing.Trace] = Depends(dependencies.trace_request),
     service=Depends(dependencies.get_service),
     session: AsyncSession = Depends(dependencies.get_db_session),
-) -> models.ModerationResponse:
+) -> Response:
     if payload.service_id != str(service.service_id):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Service identifier mismatch",
         )
-    db_request = await store.save_moderation_request(session, service, payload)
-    result = evaluate_text(payload.content_text)
-    db_result = await store.save_moderation_result(session, db_request, result)
-    api_request = store.map_request_to_api(db_request)
-    api_result = store.map_result_to_api(db_result)
-    return models.ModerationResponse(request=api_request, result=api_result)
+    if trace is not None:
+        trace.service_id = str(service.service_id)
+    deadline.set_default_timeout(service.request_timeout_ms)
+    # The body has been read, so the next ASGI message is the client going away.
+    watcher = asyncio.create_task(deadlines.cancel_on_disconnect(request.receive, deadline))
+    try:
+        db_request, db_result, result = await moderate_text(session, service, payload, deadline)
+    except deadlines.DeadlineExceeded as exc:
+        raise HTTPException(status_code=status.HTTP_504_GATEWAY_TIMEOUT, detail=str(exc)) from exc
+    finally:
+        watcher.cancel()
+    if trace is not None:
+        trace.request_id = str(db_request.request_id)
+    timings = None
+    if trace is not None:
+        response.headers["Server-Timing"] = trace.server_timing()
+        if payload.include_timings:
+            timings = trace.timings()
+    # Returning a Response skips FastAPI's response_model validation and serialization;
+    # the model stays on the route for OpenAPI. Headers set on ``response`` (rate limits,
+    # Server-Timing) are not merged by FastAPI in that case, so they are copied here.
+    lean = Response(
+        moderation_response_body(db_request, db_result, result, timings), media_type="application/json"
+    )
+    lean.raw_headers.extend(response.raw_headers)
+    return lean
+
+
+class _BulkModerationResponse(Response):
+    """Reads the NDJSON upload and writes results on the same connection.
+
+    ``StreamingResponse`` listens for disconnects on ``receive`` while streaming, which
+    would steal body chunks, so this response owns ``receive`` itself. A slow reader
+    blocks ``send``, which stops the upload from being read: memory stays bounded.
+    """
+
+    media_type = "application/x-ndjson"
+
+    def __init__(self, service: db_models.WebService) -> None:
+        super().__init__(media_type=self.media_type)
+        # The body length is unknown up front: send it chunked.
+        self.raw_headers = [(name, value) for name, value in self.raw_headers if name != b"content-length"]
+        self.service = service
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        async def chunks():
+            while True:
+                message = await receive()
+                if message["type"] == "http.disconnect":
+                    raise ClientDisconnect()
+                body = message.get("body", b"")
+                if body:
+                    yield body
+                if not message.get("more_body", False):
+                    return
+
+        await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+        async for reply in bulk.moderate_ndjson(self.service, chunks()):
+            body = (reply.model_dump_json(exclude_none=True) + "\n").encode("utf-8")
+            await send({"type": "http.response.body", "body": body, "more_body": True})
+        await send({"type": "http.response.body", "body": b"", "more_body": False})
+
+
+@router.post("/bulk", response_class=_BulkModerationResponse)
+async def create_bulk_moderation(
+    service=Depends(dependencies.authenticate_service),
+) -> _BulkModerationResponse:
+    """Moderate an NDJSON upload; results stream back as NDJSON while it is read."""
+    return _BulkModerationResponse(service)
+
+
+class _ModerationStream:
+    """One WebSocket connection: many messages in flight, replies in completion order.
+
+    At most ``STREAM_MAX_IN_FLIGHT`` messages are processed at once; past that the
+    server stops reading, so a fast client is slowed down by TCP backpressure instead
+    of growing server-side buffers.
+    """
+
+    def __init__(self, websocket: WebSocket, service: db_models.WebService) -> None:
+        self.websocket = websocket
+        self.service = service
+        self.in_flight = asyncio.Semaphore(settings.stream_max_in_flight)
+        self.outgoing: "asyncio.Queue[models.StreamMessageOut]" = asyncio.Queue()
+        self.pending: Dict[str, asyncio.Task] = {}
+
+    async def run(self) -> None:
+        sender = asyncio.create_task(self._send_replies())
+        try:
+            while True:
+                # The slot is released once the reply has been sent, so a client that
+                # stops reading also stops being read from.
+                await self.in_flight.acquire()
+                if sender.done():
+                    break
+                raw = await self.websocket.receive_text()
+                try:
+                    message = models.StreamMessageIn.model_validate_json(raw)
+                except ValidationError as exc:
+                    error = bulk.describe_validation_error(exc)
+                    self._reply(models.StreamMessageOut(id=_message_id(raw), error=error))
+                    continue
+                if message.id in self.pending:
+                    self._reply(models.StreamMessageOut(id=message.id, error="Duplicate message id"))
+                    continue
+                self.pending[message.id] = asyncio.create_task(self._moderate(message))
+        except WebSocketDisconnect:
+            pass
+        finally:
+            for task in self.pending.values():
+                task.cancel()
+            sender.cancel()
+            await asyncio.gather(sender, *self.pending.values(), return_exceptions=True)
+
+    def _reply(self, reply: models.StreamMessageOut) -> None:
+        # Never holds more than STREAM_MAX_IN_FLIGHT replies: each one owns a slot.
+        self.outgoing.put_nowait(reply)
+
+    async def _send_replies(self) -> None:
+        try:
+            while True:
+                reply = await self.outgoing.get()
+                try:
+                    await self.websocket.send_text(reply.model_dump_json(exclude_none=True))
+                finally:
+                    self.in_flight.release()
+        except Exception:
+            # The socket is unusable: wake the read loop so it sees the sender is gone.
+            self.in_flight.release()
+            raise
+
+    async def _moderate(self, message: models.StreamMessageIn) -> None:
+        trace = tracing.start_trace() if settings.tracing_enabled else None
+        if trace is not None:
+            trace.service_id = str(self.service.service_id)
+        try:
+            async with get_session() as session:
+                with tracing.stage("rate_limit"):
+                    decision = await ratelimit.get_rate_limiter().acquire(session, self.service)
+                if not decision.allowed:
+                    reply = models.StreamMessageOut(
+                        id=message.id, error=decision.reason, retry_after=decision.retry_after
+                    )
+                else:
+                    payload = models.ModerationRequestIn(
+                        service_id=str(self.service.service_id),
+                        content_text=message.content_text,
+                        priority=message.priority,
+                    )
+                    deadline = deadlines.Deadline(self.service.request_timeout_ms)
+                    db_request, db_result, result = await moderate_text(
+                        session, self.service, payload, deadline
+                    )
+                    if trace is not None:
+                        trace.request_id = str(db_request.request_id)
+                    reply = models.StreamMessageOut(
+                        id=message.id,
+                        request_id=str(db_request.request_id),
+                        result=_api_result(db_request, db_result, result),
+                    )
+        except deadlines.DeadlineExceeded as exc:
+            reply = models.StreamMessageOut(id=message.id, error=str(exc))
+        except Exception:  # noqa: BLE001 - one failed message must not drop the stream
+            logger.exception("Stream moderation failed for message %s", message.id)
+            reply = models.StreamMessageOut(id=message.id, error="Moderation failed")
+        finally:
+            self.pending.pop(message.id, None)
+            if trace is not None:
+                tracing.finish_trace(trace)
+        self._reply(reply)
+
+
+def _message_id(raw: str) -> Optional[str]:
+    try:
+        value = json.loads(raw).get("id")
+    except (ValueError, AttributeError):
+        return None
+    return str(value) if value is not None else None
+
+
+@router.websocket("/stream")
+async def stream_text_moderation(websocket: WebSocket) -> None:
+    api_key = websocket.headers.get(dependencies.API_KEY_HEADER_NAME, "")
+    async with get_session() as session:
+        try:
+            service = await store.validate_api_key(session, api_key)
+        except HTTPException:
+            await websocket.close(code=status.WS_1008_POLICY_VIOLATION, reason="Invalid API key")
+            return
+    await websocket.accept()
+    STREAM_CONNECTIONS.inc()
+    try:
+        await _ModerationStream(websocket, service).run()
+    finally:
+        STREAM_CONNECTIONS.inc(-1)
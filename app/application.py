@@ -4,10 +4,21 @@ from fastapi import FastAPI
 
 from app.api.routes_admin import router as admin_router
 from app.api.routes_auth import router as auth_router
+from app.api.routes_metrics import router as metrics_router
 from app.api.routes_moderation import router as moderation_router
 from app.config import settings
 from app.core import store
+from app.core.invalidation import get_invalidation_bus
+from app.core.profiling import ProfilingMiddleware
 from app.db.session import get_session, init_engine, run_migrations
+from app.services import (
+    get_degraded_mode,
+    get_model_registry,
+    get_remoderation_runner,
+    get_scheduler,
+    get_shadow_evaluator,
+    get_webhook_dispatcher,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -17,11 +28,15 @@ def create_app() -> FastAPI:
     app.include_router(auth_router)
     app.include_router(moderation_router, prefix="/api/v1")
     app.include_router(admin_router)
+    app.include_router(metrics_router)
+    app.add_middleware(ProfilingMiddleware)
 
     @app.on_event("startup")
     async def startup() -> None:
         init_engine()
         await run_migrations()
+        await get_invalidation_bus().start()
+        await get_model_registry().start()
         if settings.generate_demo_data:
             async with get_session() as session:
                 admin, service, api_key = await store.ensure_demo_data(
@@ -45,5 +60,18 @@ def create_app() -> FastAPI:
                         api_key.key_prefix,
                     )
                 logger.info("Demo admin user: %s", admin.username)
+        get_webhook_dispatcher().start()
+        get_degraded_mode().start()
+        get_shadow_evaluator().start()
+
+    @app.on_event("shutdown")
+    async def shutdown() -> None:
+        await get_invalidation_bus().stop()
+        await get_model_registry().stop()
+        await get_webhook_dispatcher().stop()
+        await get_degraded_mode().stop()
+        await get_shadow_evaluator().stop()
+        await get_remoderation_runner().stop()
+        await get_scheduler().stop()
 
     return app
@@ -0,0 +1,287 @@
+"""Command-line tools for operating the moderation service.
+
+Usage::
+
+    python -m app.cli export-history --output history.jsonl
+    python -m app.cli train-linear --input history.jsonl --output linear.npz
+    python -m app.cli calibrate-cascade --input history.jsonl --model linear.npz
+    python -m app.cli bulk-moderate --service-id <uuid> --input comments.ndjson --output results.ndjson
+    python -m app.cli what-if --auto-reject 0.9 --rule spam:0.7:FLAG_FOR_REVIEW
+    python -m app.cli remoderate --since 2024-01-01 --rate 200
+    python -m app.cli remoderate --job-id <uuid>
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import logging
+import sys
+import uuid
+from datetime import datetime
+from typing import AsyncIterator, Dict, List, Optional
+
+from app.core import models as api_models
+from app.core import store
+from app.db import models as db_models
+from app.db.session import get_session, run_migrations
+from app.services.text import TOXIC_LABELS
+
+logger = logging.getLogger(__name__)
+
+
+def history_target(record: dict) -> float:
+    """Training target for a history record: model score if stored, else the decision."""
+    scores = record.get("label_scores") or {}
+    model_scores = [scores[label] for label in TOXIC_LABELS if label in scores]
+    if model_scores:
+        return max(model_scores)
+    decision = record.get("decision")
+    if decision == api_models.ModerationDecision.REJECTED.value:
+        return 1.0
+    if decision == api_models.ModerationDecision.HUMAN_REVIEW.value:
+        return 0.5
+    return 0.0
+
+
+def read_history(path: str) -> List[dict]:
+    with open(path, encoding="utf-8") as handle:
+        return [json.loads(line) for line in handle if line.strip()]
+
+
+async def export_history(output: str, service_id: Optional[str]) -> int:
+    await run_migrations()
+    exported = 0
+    async with get_session() as session:
+        with open(output, "w", encoding="utf-8") as handle:
+            async for request, result in store.iter_labelled_history(
+                session, uuid.UUID(service_id) if service_id else None
+            ):
+                record = {
+                    "request_id": str(request.request_id),
+                    "service_id": str(request.service_id),
+                    "timestamp": request.timestamp.isoformat(),
+                    "content_text": request.content_text,
+                    "decision": result.decision,
+                    "confidence_score": result.confidence_score,
+                    "model_version": result.model_version,
+                    "label_scores": json.loads(result.label_scores or "{}"),
+                }
+                handle.write(json.dumps(record, ensure_ascii=False) + "\n")
+                exported += 1
+    return exported
+
+
+def train_linear(args: argparse.Namespace) -> None:
+    from app.services.linear import HashedNgramModel
+
+    records = read_history(args.input)
+    if not records:
+        raise SystemExit(f"No records in {args.input}")
+    model = HashedNgramModel.train(
+        [record["content_text"] for record in records],
+        [history_target(record) for record in records],
+        version=args.version,
+        n_features=2**args.hash_bits,
+        epochs=args.epochs,
+        learning_rate=args.learning_rate,
+    )
+    model.save(args.output)
+    logger.info("Trained %s on %s records, saved to %s", model.version, len(records), args.output)
+
+
+def calibrate_cascade(args: argparse.Namespace) -> None:
+    from app.services import cascade
+    from app.services.linear import HashedNgramModel
+
+    records = read_history(args.input)
+    if not records:
+        raise SystemExit(f"No records in {args.input}")
+    model = HashedNgramModel.load(args.model)
+    fast_scores = model.predict_proba([record["content_text"] for record in records])
+    agrees = cascade.fast_agreement(records, fast_scores)
+    logger.info(
+        "Linear model %s agrees with the full model on %.2f%% of %s records without escalation",
+        model.version,
+        agrees.mean() * 100,
+        len(records),
+    )
+    calibration = cascade.calibrate_band(fast_scores, agrees, args.target_agreement, grid=args.grid)
+    if calibration is None:
+        raise SystemExit(f"No band reaches agreement {args.target_agreement}")
+    print(cascade.describe(calibration))
+
+
+async def _read_chunks(handle, chunk_size: int = 65536) -> AsyncIterator[bytes]:
+    while True:
+        chunk = handle.read(chunk_size)
+        if not chunk:
+            return
+        yield chunk
+
+
+async def bulk_moderate(service_id: str, input_path: str, output_path: str) -> Dict[str, int]:
+    from app.services import bulk
+    from app.services.registry import get_model_registry
+    from app.services.scheduler import get_scheduler
+
+    await run_migrations()
+    async with get_session() as session:
+        service = await session.get(db_models.WebService, uuid.UUID(service_id))
+    if service is None:
+        raise SystemExit(f"Unknown service {service_id}")
+    # Serve the deployed registry version, as the API workers do.
+    await get_model_registry().start()
+
+    counts = {"moderated": 0, "errors": 0}
+    source = sys.stdin.buffer if input_path == "-" else open(input_path, "rb")
+    target = sys.stdout if output_path == "-" else open(output_path, "w", encoding="utf-8")
+    try:
+        async for reply in bulk.moderate_ndjson(service, _read_chunks(source)):
+            target.write(reply.model_dump_json(exclude_none=True) + "\n")
+            counts["errors" if reply.error else "moderated"] += 1
+    finally:
+        if source is not sys.stdin.buffer:
+            source.close()
+        if target is not sys.stdout:
+            target.close()
+        await get_scheduler().stop()
+        await get_model_registry().stop()
+    return counts
+
+
+async def what_if(args: argparse.Namespace) -> api_models.WhatIfReport:
+    from app.services import whatif
+
+    request = api_models.WhatIfRequest(
+        auto_reject_threshold=args.auto_reject,
+        human_review_threshold=args.human_review,
+        sentiment_review_threshold=args.sentiment_review,
+        rules=[whatif.parse_rule(rule) for rule in args.rule],
+        service_id=args.service_id,
+        since=args.since,
+        until=args.until,
+    )
+    await run_migrations()
+    async with get_session() as session:
+        return await whatif.replay(session, request)
+
+
+async def remoderate(args: argparse.Namespace) -> Optional[db_models.RemoderationJob]:
+    """Run a new re-moderation job, or resume ``--job-id``, in this process."""
+    from app.services.registry import get_model_registry
+    from app.services.remoderation import get_remoderation_runner
+    from app.services.scheduler import get_scheduler
+
+    await run_migrations()
+    registry = get_model_registry()
+    # Re-score with the deployed registry version, as the API workers would.
+    await registry.start()
+    if args.job_id:
+        job_id = uuid.UUID(args.job_id)
+    else:
+        spec = api_models.RemoderationJobCreate(
+            service_id=args.service_id,
+            since=args.since,
+            until=args.until,
+            rate_per_second=args.rate,
+            notify_webhooks=not args.no_webhooks,
+        )
+        async with get_session() as session:
+            job_id = (await store.create_remoderation_job(session, spec, registry.deployed)).job_id
+        logger.info("Created re-moderation job %s", job_id)
+    try:
+        # Ctrl-C cancels the run, which pauses the job at its last checkpoint.
+        return await get_remoderation_runner().run(job_id)
+    finally:
+        await get_scheduler().stop()
+        await registry.stop()
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="python -m app.cli", description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    export = commands.add_parser("export-history", help="dump moderated comments as JSONL")
+    export.add_argument("--output", required=True)
+    export.add_argument("--service-id")
+
+    train = commands.add_parser("train-linear", help="train the hashed n-gram model")
+    train.add_argument("--input", required=True, help="JSONL produced by export-history")
+    train.add_argument("--output", required=True, help="where to save the .npz model")
+    train.add_argument("--version", default="hashed-ngram-1")
+    train.add_argument("--hash-bits", type=int, default=18)
+    train.add_argument("--epochs", type=int, default=5)
+    train.add_argument("--learning-rate", type=float, default=0.5)
+
+    calibrate = commands.add_parser(
+        "calibrate-cascade", help="pick the cascade escalation band from labelled history"
+    )
+    calibrate.add_argument("--input", required=True, help="JSONL produced by export-history")
+    calibrate.add_argument("--model", required=True, help=".npz model produced by train-linear")
+    calibrate.add_argument("--target-agreement", type=float, default=0.98)
+    calibrate.add_argument("--grid", type=int, default=100, help="candidate thresholds (score quantiles)")
+
+    bulk = commands.add_parser("bulk-moderate", help="moderate an NDJSON file directly against the database")
+    bulk.add_argument("--service-id", required=True)
+    bulk.add_argument("--input", required=True, help="NDJSON with {id, content_text} lines, '-' for stdin")
+    bulk.add_argument("--output", default="-", help="NDJSON results, '-' for stdout")
+
+    replay = commands.add_parser(
+        "what-if", help="replay stored decisions under proposed thresholds and rules"
+    )
+    replay.add_argument("--auto-reject", type=float, help="toxicity score that rejects")
+    replay.add_argument("--human-review", type=float, help="toxicity score that sends to review")
+    replay.add_argument("--sentiment-review", type=float, help="negative sentiment that sends to review")
+    replay.add_argument(
+        "--rule",
+        action="append",
+        default=[],
+        help="LABEL:MIN_SCORE:ACTION[:PRIORITY], e.g. spam:0.7:FLAG_FOR_REVIEW; repeatable",
+    )
+    replay.add_argument("--service-id")
+    replay.add_argument("--since", type=datetime.fromisoformat)
+    replay.add_argument("--until", type=datetime.fromisoformat)
+
+    rescore = commands.add_parser(
+        "remoderate", help="re-score stored comments with the serving model, resumably"
+    )
+    rescore.add_argument("--job-id", help="resume this job from its checkpoint")
+    rescore.add_argument("--service-id")
+    rescore.add_argument("--since", type=datetime.fromisoformat)
+    rescore.add_argument("--until", type=datetime.fromisoformat)
+    rescore.add_argument("--rate", type=float, help="comments per second of a new job, 0 for no limit")
+    rescore.add_argument("--no-webhooks", action="store_true", help="do not announce changed decisions")
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s %(message)s")
+    args = build_parser().parse_args(argv)
+    if args.command == "export-history":
+        count = asyncio.run(export_history(args.output, args.service_id))
+        logger.info("Exported %s records to %s", count, args.output)
+    elif args.command == "train-linear":
+        train_linear(args)
+    elif args.command == "calibrate-cascade":
+        calibrate_cascade(args)
+    elif args.command == "bulk-moderate":
+        counts = asyncio.run(bulk_moderate(args.service_id, args.input, args.output))
+        logger.info("Moderated %s lines, %s errors", counts["moderated"], counts["errors"])
+    elif args.command == "what-if":
+        print(asyncio.run(what_if(args)).model_dump_json(indent=2))
+    elif args.command == "remoderate":
+        try:
+            job = asyncio.run(remoderate(args))
+        except KeyboardInterrupt:
+            # The job was paused at its last checkpoint; --job-id resumes it.
+            return 130
+        if job is None:
+            raise SystemExit(f"Job {args.job_id} is finished or running elsewhere")
+        print(store.map_remoderation_job_to_api(job).model_dump_json(indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
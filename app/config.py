@@ -1,8 +1,9 @@
 from __future__ import annotations
 
 from functools import lru_cache
+from typing import Optional
 
-from pydantic import Field, field_validator
+from pydantic import Field, ValidationInfo, field_validator
 from pydantic_settings import BaseSettings
 
 
@@ -23,6 +24,75 @@ class Settings(BaseSettings):
     admin_demo_email: str = Field(default="moderator@example.com")
     service_demo_name: str = Field(default="Demo Service")
     service_demo_contact: str = Field(default="demo@example.com")
+    inference_intra_op_threads: Optional[int] = Field(
+        default=None, ge=1, env="INFERENCE_INTRA_OP_THREADS"
+    )
+    inference_inter_op_threads: Optional[int] = Field(
+        default=None, ge=1, env="INFERENCE_INTER_OP_THREADS"
+    )
+    inference_cpu_affinity: Optional[str] = Field(default=None, env="INFERENCE_CPU_AFFINITY")
+    rate_limit_backend: str = Field(default="memory", env="RATE_LIMIT_BACKEND")
+    inference_batch_size: int = Field(default=8, ge=1, env="INFERENCE_BATCH_SIZE")
+    inference_concurrency: int = Field(default=1, ge=1, env="INFERENCE_CONCURRENCY")
+    classifier_backend: str = Field(default="transformers", env="CLASSIFIER_BACKEND")
+    linear_model_path: Optional[str] = Field(default=None, env="LINEAR_MODEL_PATH")
+    # Until calibrated, only confident rejections skip BERT: the fast tier has no
+    # sentiment model, so below the band it could approve what BERT sends to review.
+    cascade_lower_threshold: float = Field(default=0.0, ge=0.0, le=1.0, env="CASCADE_LOWER_THRESHOLD")
+    cascade_upper_threshold: float = Field(default=0.9, ge=0.0, le=1.0, env="CASCADE_UPPER_THRESHOLD")
+    stream_max_in_flight: int = Field(default=32, ge=1, env="STREAM_MAX_IN_FLIGHT")
+    bulk_batch_size: int = Field(default=256, ge=1, env="BULK_BATCH_SIZE")
+    bulk_max_line_bytes: int = Field(default=65536, ge=1024, env="BULK_MAX_LINE_BYTES")
+    near_duplicate_enabled: bool = Field(default=True, env="NEAR_DUPLICATE_ENABLED")
+    near_duplicate_threshold: float = Field(default=0.85, gt=0.0, le=1.0, env="NEAR_DUPLICATE_THRESHOLD")
+    near_duplicate_ttl_seconds: float = Field(default=3600.0, gt=0.0, env="NEAR_DUPLICATE_TTL_SECONDS")
+    near_duplicate_max_entries: int = Field(default=100000, ge=1, env="NEAR_DUPLICATE_MAX_ENTRIES")
+    webhooks_enabled: bool = Field(default=True, env="WEBHOOKS_ENABLED")
+    webhook_poll_interval_seconds: float = Field(default=1.0, gt=0.0, env="WEBHOOK_POLL_INTERVAL_SECONDS")
+    webhook_batch_size: int = Field(default=100, ge=1, env="WEBHOOK_BATCH_SIZE")
+    webhook_timeout_seconds: float = Field(default=10.0, gt=0.0, env="WEBHOOK_TIMEOUT_SECONDS")
+    webhook_max_connections: int = Field(default=20, ge=1, env="WEBHOOK_MAX_CONNECTIONS")
+    webhook_max_attempts: int = Field(default=12, ge=1, env="WEBHOOK_MAX_ATTEMPTS")
+    webhook_backoff_base_seconds: float = Field(default=2.0, gt=0.0, env="WEBHOOK_BACKOFF_BASE_SECONDS")
+    webhook_backoff_max_seconds: float = Field(default=900.0, gt=0.0, env="WEBHOOK_BACKOFF_MAX_SECONDS")
+    review_claim_lease_seconds: float = Field(default=600.0, gt=0.0, env="REVIEW_CLAIM_LEASE_SECONDS")
+    degraded_mode_enabled: bool = Field(default=True, env="DEGRADED_MODE_ENABLED")
+    degraded_enter_queue_depth: int = Field(default=512, ge=1, env="DEGRADED_ENTER_QUEUE_DEPTH")
+    degraded_exit_queue_depth: int = Field(default=64, ge=0, env="DEGRADED_EXIT_QUEUE_DEPTH")
+    degraded_enter_latency_ms: float = Field(default=2000.0, gt=0.0, env="DEGRADED_ENTER_LATENCY_MS")
+    degraded_exit_latency_ms: float = Field(default=500.0, gt=0.0, env="DEGRADED_EXIT_LATENCY_MS")
+    degraded_min_seconds: float = Field(default=10.0, gt=0.0, env="DEGRADED_MIN_SECONDS")
+    degraded_rescore_batch_size: int = Field(default=64, ge=1, env="DEGRADED_RESCORE_BATCH_SIZE")
+    degraded_rescore_interval_seconds: float = Field(
+        default=5.0, gt=0.0, env="DEGRADED_RESCORE_INTERVAL_SECONDS"
+    )
+    model_registry_dir: Optional[str] = Field(default=None, env="MODEL_REGISTRY_DIR")
+    model_version: Optional[str] = Field(default=None, max_length=64, env="MODEL_VERSION")
+    model_drain_timeout_seconds: float = Field(default=300.0, gt=0.0, env="MODEL_DRAIN_TIMEOUT_SECONDS")
+    shadow_model_version: Optional[str] = Field(default=None, max_length=64, env="SHADOW_MODEL_VERSION")
+    shadow_sample_rate: float = Field(default=0.05, ge=0.0, le=1.0, env="SHADOW_SAMPLE_RATE")
+    shadow_queue_size: int = Field(default=1000, ge=1, env="SHADOW_QUEUE_SIZE")
+    shadow_batch_size: int = Field(default=32, ge=1, env="SHADOW_BATCH_SIZE")
+    remoderation_batch_size: int = Field(default=256, ge=1, env="REMODERATION_BATCH_SIZE")
+    remoderation_rate_per_second: float = Field(
+        default=100.0, ge=0.0, env="REMODERATION_RATE_PER_SECOND"
+    )
+    remoderation_stale_seconds: float = Field(default=300.0, gt=0.0, env="REMODERATION_STALE_SECONDS")
+    invalidation_poll_interval_seconds: float = Field(
+        default=1.0, gt=0.0, env="INVALIDATION_POLL_INTERVAL_SECONDS"
+    )
+    invalidation_retention_seconds: float = Field(
+        default=86400.0, gt=0.0, env="INVALIDATION_RETENTION_SECONDS"
+    )
+    cache_ttl_seconds: float = Field(default=300.0, ge=0.0, env="CACHE_TTL_SECONDS")
+    cache_max_entries: int = Field(default=10000, ge=1, env="CACHE_MAX_ENTRIES")
+    metrics_enabled: bool = Field(default=True, env="METRICS_ENABLED")
+    tracing_enabled: bool = Field(default=True, env="TRACING_ENABLED")
+    tracing_log_requests: bool = Field(default=False, env="TRACING_LOG_REQUESTS")
+    tracing_slow_request_ms: float = Field(default=1000.0, ge=0, env="TRACING_SLOW_REQUEST_MS")
+    tracing_slow_sample_rate: float = Field(
+        default=1.0, ge=0, le=1, env="TRACING_SLOW_SAMPLE_RATE"
+    )
 
     @field_validator("database_url")
     def validate_dsn(cls, value: str) -> str:
@@ -33,6 +103,47 @@ class Settings(BaseSettings):
             )
         return value
 
+    @field_validator("inference_cpu_affinity")
+    def validate_cpu_affinity(cls, value: Optional[str]) -> Optional[str]:
+        if value is None or not value.strip():
+            return None
+        allowed = set("0123456789,-; ")
+        if not set(value) <= allowed:
+            raise ValueError(
+                "INFERENCE_CPU_AFFINITY must look like '0-3' or '0-3;4-7' (one CPU set per worker)"
+            )
+        for part in value.replace(";", ",").split(","):
+            start, _, end = part.strip().partition("-")
+            if end and (not start or int(start) > int(end)):
+                raise ValueError(f"INFERENCE_CPU_AFFINITY has an invalid range {part.strip()!r}")
+        return value
+
+    @field_validator("rate_limit_backend")
+    def validate_rate_limit_backend(cls, value: str) -> str:
+        if value not in ("memory", "database"):
+            raise ValueError("RATE_LIMIT_BACKEND must be either 'memory' or 'database'")
+        return value
+
+    @field_validator("degraded_exit_queue_depth")
+    def validate_degraded_exit_queue_depth(cls, value: int, info: ValidationInfo) -> int:
+        if value >= info.data.get("degraded_enter_queue_depth", value + 1):
+            raise ValueError("DEGRADED_EXIT_QUEUE_DEPTH must be below DEGRADED_ENTER_QUEUE_DEPTH")
+        return value
+
+    @field_validator("degraded_exit_latency_ms")
+    def validate_degraded_exit_latency(cls, value: float, info: ValidationInfo) -> float:
+        if value >= info.data.get("degraded_enter_latency_ms", value + 1):
+            raise ValueError("DEGRADED_EXIT_LATENCY_MS must be below DEGRADED_ENTER_LATENCY_MS")
+        return value
+
+    @field_validator("classifier_backend")
+    def validate_classifier_backend(cls, value: str) -> str:
+        if value not in ("transformers", "linear", "cascade"):
+            raise ValueError(
+                "CLASSIFIER_BACKEND must be one of 'transformers', 'linear' or 'cascade'"
+            )
+        return value
+
 
 @lru_cache()
 def get_settings() -> Settings:
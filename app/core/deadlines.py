@@ -0,0 +1,72 @@
+"""Request deadlines: how long the client is still waiting for an answer.
+
+A deadline comes from the ``X-Request-Timeout-Ms`` header or the service's
+``request_timeout_ms`` and is counted from the moment the request arrived. It travels
+with the request into the inference queue; work whose deadline has passed is dropped
+instead of being run or written. A client that disconnects expires its deadline at once.
+"""
+
+from __future__ import annotations
+
+import math
+import time
+from typing import Optional
+
+from starlette.types import Receive
+
+from app.core import metrics
+
+DEADLINE_HEADER = "X-Request-Timeout-Ms"
+
+DEADLINE_DROPPED_TOTAL = metrics.Counter(
+    "moderation_deadline_dropped_total",
+    "Work skipped because its client gave up, by pipeline stage and reason.",
+    ("stage", "reason"),
+)
+
+
+class DeadlineExceeded(Exception):
+    def __init__(self, reason: str) -> None:
+        super().__init__(f"Request deadline exceeded ({reason})")
+        self.reason = reason
+
+
+class Deadline:
+    def __init__(self, timeout_ms: Optional[float] = None) -> None:
+        self.started_at = time.perf_counter()
+        self.expires_at = math.inf
+        self.reason = "deadline"
+        if timeout_ms is not None:
+            self.set_timeout(timeout_ms)
+
+    def set_timeout(self, timeout_ms: float) -> None:
+        self.expires_at = self.started_at + timeout_ms / 1000.0
+
+    def set_default_timeout(self, timeout_ms: Optional[float]) -> None:
+        """Apply a service default unless the client sent its own timeout."""
+        if timeout_ms is not None and self.expires_at == math.inf:
+            self.set_timeout(timeout_ms)
+
+    def cancel(self) -> None:
+        self.expires_at = -math.inf
+        self.reason = "disconnect"
+
+    def expired(self) -> bool:
+        return time.perf_counter() >= self.expires_at
+
+    def exceeded(self, stage: str) -> DeadlineExceeded:
+        DEADLINE_DROPPED_TOTAL.inc(stage=stage, reason=self.reason)
+        return DeadlineExceeded(self.reason)
+
+    def check(self, stage: str) -> None:
+        if self.expired():
+            raise self.exceeded(stage)
+
+
+async def cancel_on_disconnect(receive: Receive, deadline: Deadline) -> None:
+    """Expire ``deadline`` when the client disconnects; run after the body was read."""
+    while True:
+        message = await receive()
+        if message["type"] == "http.disconnect":
+            deadline.cancel()
+            return
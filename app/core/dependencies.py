@@ -1,8 +1,11 @@
-from fastapi import Depends, Header
+from typing import Optional
+
+from fastapi import Depends, Header, HTTPException, Response, status
 from fastapi.security import APIKeyHeader
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.core import store
+from app.config import settings
+from app.core import deadlines, ratelimit, store, tracing
 from app.db.session import get_session
 
 API_KEY_HEADER_NAME = "X-API-Key"
@@ -16,11 +19,46 @@ async def get_db_session() -> AsyncSession:
         yield session
 
 
-async def get_service(
+async def trace_request():
+    if not settings.tracing_enabled:
+        yield None
+        return
+    trace = tracing.start_trace()
+    try:
+        yield trace
+    finally:
+        tracing.finish_trace(trace)
+
+
+async def request_deadline(
+    timeout_ms: Optional[int] = Header(default=None, alias=deadlines.DEADLINE_HEADER, gt=0),
+) -> deadlines.Deadline:
+    return deadlines.Deadline(timeout_ms)
+
+
+async def authenticate_service(
     api_key: str = Depends(api_key_header),
     session: AsyncSession = Depends(get_db_session),
 ):
-    service = await store.validate_api_key(session, api_key)
+    """Resolve the API key without charging the rate limiter (bulk uploads charge per line)."""
+    with tracing.stage("auth"):
+        return await store.validate_api_key(session, api_key)
+
+
+async def get_service(
+    response: Response,
+    service=Depends(authenticate_service),
+    session: AsyncSession = Depends(get_db_session),
+):
+    with tracing.stage("rate_limit"):
+        decision = await ratelimit.get_rate_limiter().acquire(session, service)
+    if not decision.allowed:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail=decision.reason,
+            headers=decision.headers(),
+        )
+    response.headers.update(decision.headers())
     return service
 
 
@@ -0,0 +1,269 @@
+"""Cluster-wide invalidation of in-process caches.
+
+Store mutations that change cached state call ``publish`` inside their own
+transaction. It adds an ``invalidationevent`` row, whose autoincrement ``version``
+orders events across workers. On PostgreSQL it also queues a ``pg_notify`` that is
+delivered when the transaction commits. Every worker runs an ``InvalidationBus``
+(started with the app) that LISTENs on PostgreSQL and polls ``version > last seen``
+every ``INVALIDATION_POLL_INTERVAL_SECONDS``: on SQLite the poll is the only channel,
+on PostgreSQL it covers a lost listener connection. An event clears every
+``LocalCache`` subscribed to its topic, so a revoked key stops authenticating on all
+workers within one poll interval; ``CACHE_TTL_SECONDS`` bounds staleness should the
+bus itself stall. Other per-worker state can ``subscribe`` to a topic the same way.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from functools import lru_cache
+from typing import Any, Callable, Dict, Hashable, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import delete, event, func, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.core import metrics
+from app.db import session as db_session
+from app.db.models import InvalidationEvent
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = "moderation_invalidation"
+
+API_KEYS = "api_keys"
+SERVICES = "services"
+CATEGORIES = "categories"
+MODELS = "models"
+# A moderator's override; the key is "<request_id> <decision> <confidence_score>".
+RESULTS = "results"
+
+# Versions are assigned at insert but become visible at commit, possibly out of order;
+# a skipped version is re-checked for this long before it is taken for a rollback.
+_GAP_GRACE_SECONDS = 60.0
+_MAX_GAPS = 1000
+_POLL_LIMIT = 1000
+_PRUNE_INTERVAL_SECONDS = 3600.0
+
+INVALIDATIONS_TOTAL = metrics.Counter(
+    "moderation_invalidations_total",
+    "Invalidation events applied to in-process caches, by topic.",
+    ("topic",),
+)
+
+_subscribers: Dict[str, List[Callable[[], None]]] = {}
+_key_subscribers: Dict[str, List[Callable[[Optional[str]], None]]] = {}
+# Versions published by this worker, already applied locally.
+_published: Set[int] = set()
+# ``Session.info`` key of the events a transaction has published but not committed yet.
+_PENDING = "invalidation_pending"
+
+
+def subscribe(topic: str, callback: Callable[[], None]) -> None:
+    """Call ``callback`` on the event loop for every event on ``topic``."""
+    _subscribers.setdefault(topic, []).append(callback)
+
+
+def subscribe_keys(topic: str, callback: Callable[[Optional[str]], None]) -> None:
+    """Like ``subscribe``, passing each event's key; ``None`` means "everything"."""
+    _key_subscribers.setdefault(topic, []).append(callback)
+
+
+class LocalCache:
+    """Per-worker map with a TTL, cleared by invalidation events for its topics."""
+
+    def __init__(self, name: str, topics: Iterable[str], ttl_seconds: float, max_entries: int) -> None:
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.generation = 0
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        for topic in topics:
+            subscribe(topic, self.clear)
+        metrics.register_cache(name, lambda: (self.hits, self.misses))
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable) -> Any:
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] > time.monotonic():
+            self.hits += 1
+            return entry[1]
+        if entry is not None:
+            del self._entries[key]
+        self.misses += 1
+        return None
+
+    def put(self, key: Hashable, value: Any, generation: int) -> None:
+        """Store ``value`` read from the database while ``generation`` was current.
+
+        An invalidation that arrived during the read bumps the generation, and the
+        possibly stale value is not stored.
+        """
+        if generation != self.generation or self.ttl_seconds <= 0:
+            return
+        self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def discard(self, key: Hashable) -> None:
+        self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        self.generation += 1
+        self._entries.clear()
+
+
+def apply(topic: str, key: Optional[str] = None) -> None:
+    INVALIDATIONS_TOTAL.inc(topic=topic)
+    for callback in _subscribers.get(topic, ()):
+        callback()
+    for key_callback in _key_subscribers.get(topic, ()):
+        key_callback(key)
+
+
+def _clear_all() -> None:
+    for topic in set(_subscribers) | set(_key_subscribers):
+        apply(topic)
+
+
+async def publish(session: AsyncSession, topic: str, key: Optional[object] = None) -> None:
+    """Record an invalidation in the caller's transaction; other workers see it on commit.
+
+    This worker's subscribers run when the transaction commits, so nothing re-reads the
+    old row into a cache after they ran; the poller skips the event later. A rollback
+    drops it.
+    """
+    row = InvalidationEvent(topic=topic, key=None if key is None else str(key))
+    session.add(row)
+    await session.flush()
+    if session.bind.dialect.name == "postgresql":
+        await session.execute(select(func.pg_notify(CHANNEL, topic)))
+    pending = session.info.get(_PENDING)
+    if pending is None:
+        pending = session.info[_PENDING] = []
+        event.listen(session.sync_session, "after_commit", _apply_pending)
+        event.listen(session.sync_session, "after_rollback", _drop_pending)
+    pending.append((row.version, topic, row.key))
+
+
+def _apply_pending(sync_session) -> None:
+    pending = sync_session.info.get(_PENDING, [])
+    events, pending[:] = list(pending), []
+    for version, topic, key in events:
+        _published.add(version)
+        apply(topic, key)
+
+
+def _drop_pending(sync_session) -> None:
+    sync_session.info.get(_PENDING, []).clear()
+
+
+class InvalidationBus:
+    def __init__(self) -> None:
+        self.version = 0
+        self._gaps: Dict[int, float] = {}
+        self._wakeup = asyncio.Event()
+        self._pruned_at = 0.0
+        self._tasks: List[asyncio.Task] = []
+
+    async def start(self) -> None:
+        if self._tasks:
+            return
+        async with db_session.get_session() as session:
+            # Caches start empty, so earlier events are irrelevant.
+            self.version = await session.scalar(
+                select(func.coalesce(func.max(InvalidationEvent.version), 0))
+            )
+        self._pruned_at = time.monotonic()
+        self._tasks.append(asyncio.create_task(self._run(), name="invalidation-poller"))
+        if db_session.engine is not None and db_session.engine.dialect.name == "postgresql":
+            self._tasks.append(asyncio.create_task(self._listen(), name="invalidation-listener"))
+
+    async def stop(self) -> None:
+        tasks, self._tasks = self._tasks, []
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(
+                    self._wakeup.wait(), timeout=settings.invalidation_poll_interval_seconds
+                )
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                if await self.poll_once() >= _POLL_LIMIT:
+                    self._wakeup.set()
+            except Exception:  # noqa: BLE001 - poll again on the next tick
+                logger.exception("Invalidation poll failed")
+
+    async def _listen(self) -> None:
+        import psycopg
+
+        assert db_session.engine is not None
+        conninfo = db_session.engine.url.set(drivername="postgresql").render_as_string(
+            hide_password=False
+        )
+        while True:
+            try:
+                async with await psycopg.AsyncConnection.connect(conninfo, autocommit=True) as conn:
+                    await conn.execute(f"LISTEN {CHANNEL}")
+                    # Catch up on whatever was published while not listening.
+                    self._wakeup.set()
+                    async for _ in conn.notifies():
+                        self._wakeup.set()
+            except Exception:  # noqa: BLE001 - the poller keeps caches correct meanwhile
+                logger.exception("Invalidation listener disconnected")
+                await asyncio.sleep(settings.invalidation_poll_interval_seconds)
+
+    async def poll_once(self) -> int:
+        """Apply events newer than the last seen version; returns how many were read."""
+        now = time.monotonic()
+        self._gaps = {version: seen for version, seen in self._gaps.items() if now - seen < _GAP_GRACE_SECONDS}
+        condition = InvalidationEvent.version > self.version
+        if self._gaps:
+            condition = or_(condition, InvalidationEvent.version.in_(list(self._gaps)))
+        async with db_session.get_session() as session:
+            rows = (
+                await session.execute(
+                    select(InvalidationEvent.version, InvalidationEvent.topic, InvalidationEvent.key)
+                    .where(condition)
+                    .order_by(InvalidationEvent.version)
+                    .limit(_POLL_LIMIT)
+                )
+            ).all()
+            if now - self._pruned_at >= _PRUNE_INTERVAL_SECONDS:
+                self._pruned_at = now
+                cutoff = datetime.utcnow() - timedelta(seconds=settings.invalidation_retention_seconds)
+                await session.execute(delete(InvalidationEvent).where(InvalidationEvent.created_at < cutoff))
+                await session.commit()
+        for version, topic, key in rows:
+            self._gaps.pop(version, None)
+            if version > self.version:
+                if version - self.version - 1 + len(self._gaps) > _MAX_GAPS:
+                    # Too many holes to track: start over from empty caches.
+                    self._gaps.clear()
+                    _clear_all()
+                else:
+                    self._gaps.update(dict.fromkeys(range(self.version + 1, version), now))
+                self.version = version
+            if version in _published:
+                _published.discard(version)
+            else:
+                apply(topic, key)
+        return len(rows)
+
+
+@lru_cache(maxsize=1)
+def get_invalidation_bus() -> InvalidationBus:
+    return InvalidationBus()
@@ -0,0 +1,244 @@
+"""Minimal Prometheus text-format metrics registry.
+
+Only what the service needs: counters, histograms, gauges and collect-time callbacks.
+Every update is a dict lookup plus a lock, cheap enough to stay on in production.
+"""
+
+from __future__ import annotations
+
+import bisect
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from typing import Awaitable, Callable, Dict, Iterable, Iterator, List, Sequence, Tuple
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+LabelValues = Tuple[str, ...]
+
+DEFAULT_BUCKETS: Tuple[float, ...] = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+
+_registry: List["_Metric"] = []
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    pairs = ",".join(f'{name}="{_escape(str(value))}"' for name, value in zip(names, values))
+    return "{" + pairs + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    type_name = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def samples(self) -> Iterator[Tuple[str, str, float]]:
+        raise NotImplementedError
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}"]
+        lines.extend(f"{name}{labels} {_format_value(value)}" for name, labels, value in self.samples())
+        return lines
+
+
+class Counter(_Metric):
+    type_name = "counter"
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        if not settings.metrics_enabled:
+            return
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def samples(self) -> Iterator[Tuple[str, str, float]]:
+        with self._lock:
+            items = list(self._values.items())
+        for key, value in items:
+            yield self.name, _format_labels(self.labelnames, key), value
+
+
+class Gauge(Counter):
+    type_name = "gauge"
+
+    def set(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+
+class Histogram(_Metric):
+    type_name = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> None:
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: [bucket counts..., +Inf count, sum]
+        self._values: Dict[LabelValues, List[float]] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        if not settings.metrics_enabled:
+            return
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [0.0] * (len(self.buckets) + 2)
+            state[index] += 1
+            state[-1] += value
+
+    @contextmanager
+    def time(self, **labels: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def samples(self) -> Iterator[Tuple[str, str, float]]:
+        with self._lock:
+            items = [(key, list(state)) for key, state in self._values.items()]
+        for key, state in items:
+            cumulative = 0.0
+            for bound, count in zip(self.buckets + (float("inf"),), state[:-1]):
+                cumulative += count
+                labels = _format_labels(
+                    self.labelnames + ("le",), key + (_format_value(float(bound)),)
+                )
+                yield f"{self.name}_bucket", labels, cumulative
+            base = _format_labels(self.labelnames, key)
+            yield f"{self.name}_sum", base, state[-1]
+            yield f"{self.name}_count", base, cumulative
+
+
+class CallbackMetric(_Metric):
+    """Values computed at scrape time, e.g. pool sizes or cache statistics."""
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str],
+        collect: Callable[[], Iterable[Tuple[LabelValues, float]]],
+        type_name: str = "gauge",
+    ) -> None:
+        super().__init__(name, documentation, labelnames)
+        self.type_name = type_name
+        self._collect = collect
+
+    def samples(self) -> Iterator[Tuple[str, str, float]]:
+        for key, value in self._collect():
+            yield self.name, _format_labels(self.labelnames, key), value
+
+
+_refreshers: List[Callable[[], Awaitable[None]]] = []
+
+
+def register_refresher(refresh: Callable[[], Awaitable[None]]) -> None:
+    """Await ``refresh`` before every scrape, for values that need I/O such as a query."""
+    _refreshers.append(refresh)
+
+
+async def refresh() -> None:
+    for refresher in list(_refreshers):
+        try:
+            await refresher()
+        except Exception:  # noqa: BLE001 - a failing source must not break the scrape
+            logger.exception("Metrics refresher %r failed", refresher)
+
+
+def render_latest() -> str:
+    lines: List[str] = []
+    for metric in _registry:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+STAGE_SECONDS = Histogram(
+    "moderation_stage_seconds",
+    "Latency of moderation pipeline stages.",
+    ("stage",),
+)
+MODEL_SECONDS = Histogram(
+    "moderation_model_seconds",
+    "Time spent per model call, split into tokenize and forward phases.",
+    ("model", "phase"),
+)
+MODEL_LOAD_SECONDS = Gauge(
+    "moderation_model_load_seconds",
+    "Time it took to load each model.",
+    ("model",),
+)
+DECISIONS_TOTAL = Counter(
+    "moderation_decisions_total",
+    "Moderation decisions by service and decision.",
+    ("service_id", "decision"),
+)
+QUEUE_WAIT_SECONDS = Histogram(
+    "moderation_queue_wait_seconds",
+    "Time requests spend in the inference queue before dispatch.",
+    ("service_id",),
+)
+
+_caches: Dict[str, Callable[[], Tuple[int, int]]] = {}
+
+
+def register_cache(name: str, stats: Callable[[], Tuple[int, int]]) -> None:
+    """Expose ``(hits, misses)`` of an in-process cache under ``name``."""
+    _caches[name] = stats
+
+
+def _cache_samples(index: int) -> Iterator[Tuple[LabelValues, float]]:
+    for name, stats in list(_caches.items()):
+        yield (name,), stats()[index]
+
+
+def _cache_ratio_samples() -> Iterator[Tuple[LabelValues, float]]:
+    for name, stats in list(_caches.items()):
+        hits, misses = stats()
+        total = hits + misses
+        yield (name,), (hits / total) if total else 0.0
+
+
+CallbackMetric(
+    "moderation_cache_hits_total", "Cache hits.", ("cache",), lambda: _cache_samples(0), "counter"
+)
+CallbackMetric(
+    "moderation_cache_misses_total", "Cache misses.", ("cache",), lambda: _cache_samples(1), "counter"
+)
+CallbackMetric("moderation_cache_hit_ratio", "Cache hit ratio.", ("cache",), _cache_ratio_samples)
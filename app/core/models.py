@@ -1,9 +1,9 @@
 from __future__ import annotations
 
 import uuid
-from datetime import datetime
+from datetime import date, datetime
 from enum import Enum
-from typing import Dict, List, Optional
+from typing import Any, Dict, List, Optional
 
 from pydantic import BaseModel, Field
 
@@ -40,6 +40,32 @@ class RuleAction(str, Enum):
     FLAG_FOR_REVIEW = "FLAG_FOR_REVIEW"
 
 
+class PriorityClass(str, Enum):
+    INTERACTIVE = "INTERACTIVE"
+    BACKFILL = "BACKFILL"
+
+
+class WebhookEventType(str, Enum):
+    MODERATION_COMPLETED = "moderation.completed"
+    MODERATION_OVERRIDDEN = "moderation.overridden"
+    MODERATION_RESCORED = "moderation.rescored"
+
+
+class RemoderationJobStatus(str, Enum):
+    PENDING = "PENDING"
+    RUNNING = "RUNNING"
+    PAUSED = "PAUSED"
+    COMPLETED = "COMPLETED"
+    FAILED = "FAILED"
+
+
+class WebhookEventStatus(str, Enum):
+    PENDING = "PENDING"
+    DELIVERED = "DELIVERED"
+    FAILED = "FAILED"
+    DISCARDED = "DISCARDED"
+
+
 class UserRole(str, Enum):
     SUPER_ADMIN = "SUPER_ADMIN"
     CONTENT_MODERATOR = "CONTENT_MODERATOR"
@@ -93,6 +119,14 @@ class ModerationRule(BaseModel):
 class ModerationRequestIn(BaseModel):
     service_id: str
     content_text: str = Field(..., min_length=1, max_length=10_000)
+    priority: PriorityClass = PriorityClass.INTERACTIVE
+    include_timings: bool = False
+
+
+class StreamMessageIn(BaseModel):
+    id: str = Field(..., min_length=1, max_length=128)
+    content_text: str = Field(..., min_length=1, max_length=10_000)
+    priority: PriorityClass = PriorityClass.INTERACTIVE
 
 
 class ModerationRequest(BaseModel):
@@ -132,9 +166,32 @@ class Statistics(BaseModel):
             self.human_review_count += 1
 
 
+class StageTiming(BaseModel):
+    name: str
+    start_ms: float
+    duration_ms: float
+    attributes: Optional[Dict[str, Any]] = None
+    children: Optional[List["StageTiming"]] = None
+
+
 class ModerationResponse(BaseModel):
     request: ModerationRequest
     result: ModerationResult
+    timings: Optional[List[StageTiming]] = None
+
+
+class BulkItemIn(BaseModel):
+    id: Optional[str] = Field(default=None, max_length=128)
+    content_text: str = Field(..., min_length=1, max_length=10_000)
+    priority: PriorityClass = PriorityClass.BACKFILL
+
+
+class StreamMessageOut(BaseModel):
+    id: Optional[str] = None
+    request_id: Optional[str] = None
+    result: Optional[ModerationResult] = None
+    error: Optional[str] = None
+    retry_after: Optional[float] = None
 
 
 class ModerationUpdate(BaseModel):
@@ -143,12 +200,75 @@ class ModerationUpdate(BaseModel):
     model_version: Optional[str] = None
 
 
+class WhatIfRule(BaseModel):
+    label: str
+    min_score: float = Field(..., ge=0.0, le=1.0)
+    action: RuleAction
+    priority: int = 100
+
+
+class WhatIfRequest(BaseModel):
+    """Proposed thresholds; ``None`` keeps the value the live pipeline uses."""
+
+    auto_reject_threshold: Optional[float] = Field(default=None, ge=0.0, le=1.0)
+    human_review_threshold: Optional[float] = Field(default=None, ge=0.0, le=1.0)
+    sentiment_review_threshold: Optional[float] = Field(default=None, ge=0.0, le=1.0)
+    rules: List[WhatIfRule] = Field(default_factory=list)
+    service_id: Optional[str] = None
+    since: Optional[datetime] = None
+    until: Optional[datetime] = None
+
+
+class WhatIfServiceReport(BaseModel):
+    service_id: str
+    total: int
+    replayed: int
+    overridden: int
+    changed: int
+    current: Dict[ModerationDecision, int]
+    proposed: Dict[ModerationDecision, int]
+
+
+class WhatIfReport(BaseModel):
+    auto_reject_threshold: float
+    human_review_threshold: float
+    sentiment_review_threshold: float
+    services: List[WhatIfServiceReport]
+
+
+class SearchHit(BaseModel):
+    request: ModerationRequest
+    result: Optional[ModerationResult] = None
+    score: float
+
+
+class ReviewItem(BaseModel):
+    request: ModerationRequest
+    result: ModerationResult
+    claimed_by: Optional[str] = None
+    claim_expires_at: Optional[datetime] = None
+
+
+class ReviewClaimRequest(BaseModel):
+    count: int = Field(default=10, ge=1, le=100)
+    service_id: Optional[str] = None
+
+
 class StatisticsResponse(BaseModel):
     totals: Statistics
     pending_requests: int
 
 
-class WebServiceBase(BaseModel):
+class ServiceLimits(BaseModel):
+    rate_limit_per_second: Optional[float] = Field(default=None, gt=0)
+    rate_limit_burst: Optional[int] = Field(default=None, ge=1)
+    daily_quota: Optional[int] = Field(default=None, ge=0)
+    scheduling_weight: float = Field(default=1.0, gt=0)
+    # Default deadline for requests that do not send ``X-Request-Timeout-Ms``.
+    request_timeout_ms: Optional[int] = Field(default=None, gt=0)
+
+
+class WebServiceBase(ServiceLimits):
     name: str
     description: Optional[str] = None
     contact_email: str
@@ -159,13 +279,38 @@ class WebServiceCreate(WebServiceBase):
     pass
 
 
-class WebService(BaseModel):
+class WebService(ServiceLimits):
     service_id: str
     name: str
     description: Optional[str]
     contact_email: str
     registration_date: datetime
     is_active: bool
+    webhook_url: Optional[str] = None
+
+
+class ServiceCategories(BaseModel):
+    """Categories a service is moderated for; empty means every enabled category."""
+
+    category_ids: List[uuid.UUID] = Field(default_factory=list)
+
+
+class WebhookConfig(BaseModel):
+    """``url`` set to ``null`` turns delivery off; the secret signs each batch."""
+
+    url: Optional[str] = Field(default=None, max_length=2048, pattern=r"^https?://")
+    secret: Optional[str] = Field(default=None, min_length=16, max_length=255)
+
+
+class ServiceUsage(BaseModel):
+    service_id: str
+    day: date
+    requests_allowed: int = 0
+    requests_throttled: int = 0
+    daily_quota: Optional[int] = None
+    quota_remaining: Optional[int] = None
+    rate_limit_per_second: Optional[float] = None
+    rate_limit_burst: Optional[int] = None
 
 
 class APIKeyResponse(BaseModel):
@@ -179,3 +324,92 @@ class APIKeyResponse(BaseModel):
 
 class APIKeyIssueResponse(APIKeyResponse):
     api_key: str
+
+
+class SchedulerQueueStats(BaseModel):
+    service_id: str
+    queue_depth: int = 0
+    queue_depth_by_priority: Dict[PriorityClass, int] = Field(default_factory=dict)
+    dispatched: int = 0
+    mean_wait_ms: float = 0.0
+    p95_wait_ms: float = 0.0
+    max_wait_ms: float = 0.0
+
+
+class ProfileMode(str, Enum):
+    SAMPLING = "sampling"
+    CPROFILE = "cprofile"
+
+
+class ProfileRequest(BaseModel):
+    """Profile the worker until ``requests`` more requests finish or ``seconds`` pass."""
+
+    mode: ProfileMode = ProfileMode.SAMPLING
+    requests: Optional[int] = Field(default=None, ge=1, le=100_000)
+    seconds: float = Field(default=30.0, gt=0, le=600)
+    sample_interval_ms: float = Field(default=5.0, ge=1, le=1000)
+    tracemalloc: bool = False
+
+
+class ModelVersion(BaseModel):
+    version: str
+    backend: str
+
+
+class ModelRegistryStatus(BaseModel):
+    """Model versions of the worker serving the call; ``None`` means ``CLASSIFIER_BACKEND``."""
+
+    active_version: Optional[str] = None
+    deployed_version: Optional[str] = None
+    loading_version: Optional[str] = None
+    draining_versions: List[str] = Field(default_factory=list)
+    last_error: Optional[str] = None
+    versions: List[ModelVersion] = Field(default_factory=list)
+
+
+class LatencyPercentiles(BaseModel):
+    p50_ms: float = 0.0
+    p95_ms: float = 0.0
+    p99_ms: float = 0.0
+
+
+class DecisionPair(BaseModel):
+    primary_decision: ModerationDecision
+    candidate_decision: ModerationDecision
+    count: int
+
+
+class ShadowReport(BaseModel):
+    candidate_version: str
+    samples: int
+    agreement: float
+    decisions: List[DecisionPair] = Field(default_factory=list)
+    primary_latency: LatencyPercentiles
+    candidate_latency: LatencyPercentiles
+
+
+class RemoderationJobCreate(BaseModel):
+    """Stored comments to re-score with the serving model; all of them by default."""
+
+    service_id: Optional[str] = None
+    since: Optional[datetime] = None
+    until: Optional[datetime] = None
+    # Comments per second; ``REMODERATION_RATE_PER_SECOND`` when unset, 0 for no limit.
+    rate_per_second: Optional[float] = Field(default=None, ge=0.0)
+    # Announce changed decisions as ``moderation.rescored`` to services with a webhook.
+    notify_webhooks: bool = True
+
+
+class RemoderationJob(RemoderationJobCreate):
+    job_id: str
+    status: RemoderationJobStatus
+    processed: int = 0
+    changed: int = 0
+    skipped: int = 0
+    cursor_timestamp: Optional[datetime] = None
+    target_version: Optional[str] = None
+    model_version: Optional[str] = None
+    last_error: Optional[str] = None
+    created_at: datetime
+    updated_at: datetime
+    finished_at: Optional[datetime] = None
@@ -0,0 +1,186 @@
+"""On-demand profiling of a live worker (``POST /admin/profile``).
+
+A session profiles this process until ``requests`` more HTTP requests have finished
+or ``seconds`` have passed, then returns a zip archive:
+
+* ``sampling`` mode samples the stacks of every thread (event loop and inference
+  workers) each ``sample_interval_ms`` and writes ``profile.collapsed``, one
+  ``frame;frame;... count`` line per stack, as read by flamegraph.pl or speedscope;
+* ``cprofile`` mode runs cProfile on the event-loop thread and writes
+  ``profile.pstats`` for ``pstats``/snakeviz;
+* with ``tracemalloc`` the archive adds ``tracemalloc.txt`` (top allocation sites)
+  and ``tracemalloc.snapshot`` (``tracemalloc.Snapshot.load``).
+
+When no session runs, ``ProfilingMiddleware`` costs one global lookup per request.
+Only one session runs per process at a time.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import io
+import json
+import marshal
+import os
+import sys
+import tempfile
+import threading
+import time
+import zipfile
+from collections import Counter
+from typing import TYPE_CHECKING, Optional
+
+from fastapi import HTTPException, status
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from app.core import models as api_models
+
+if TYPE_CHECKING:
+    import cProfile
+    import tracemalloc
+
+TRACEMALLOC_FRAMES = 16
+TRACEMALLOC_TOP = 50
+
+_active: Optional["ProfileSession"] = None
+
+
+class ProfilingMiddleware:
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        session = _active
+        if session is None or scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            session.request_finished()
+
+
+class ProfileSession:
+    def __init__(self, options: api_models.ProfileRequest) -> None:
+        self.options = options
+        self.requests = 0
+        self.samples = 0
+        self.finished = asyncio.Event()
+        self._stacks: Counter = Counter()
+        self._profile: Optional[cProfile.Profile] = None
+        self._sampler: Optional[threading.Thread] = None
+        self._stop_sampling = threading.Event()
+        self._snapshot: Optional[tracemalloc.Snapshot] = None
+        self._owns_tracemalloc = False
+        self._started_at = 0.0
+        self._duration = 0.0
+
+    def request_finished(self) -> None:
+        self.requests += 1
+        if self.options.requests is not None and self.requests >= self.options.requests:
+            self.finished.set()
+
+    def start(self) -> None:
+        # Imported here: nothing profiling-related loads until the first session.
+        import cProfile
+        import tracemalloc
+
+        self._started_at = time.perf_counter()
+        if self.options.tracemalloc and not tracemalloc.is_tracing():
+            tracemalloc.start(TRACEMALLOC_FRAMES)
+            self._owns_tracemalloc = True
+        if self.options.mode is api_models.ProfileMode.CPROFILE:
+            # Runs on the event-loop thread, so every request the loop serves is profiled.
+            self._profile = cProfile.Profile()
+            self._profile.enable()
+        else:
+            self._sampler = threading.Thread(target=self._sample, name="profiler-sampler", daemon=True)
+            self._sampler.start()
+
+    def stop(self) -> None:
+        import tracemalloc
+
+        if self._profile is not None:
+            self._profile.disable()
+        if self._sampler is not None:
+            self._stop_sampling.set()
+            self._sampler.join()
+        if self.options.tracemalloc and tracemalloc.is_tracing():
+            self._snapshot = tracemalloc.take_snapshot()
+        if self._owns_tracemalloc:
+            tracemalloc.stop()
+        self._duration = time.perf_counter() - self._started_at
+
+    def _sample(self) -> None:
+        interval = self.options.sample_interval_ms / 1000.0
+        own = threading.get_ident()
+        while not self._stop_sampling.wait(interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({code.co_filename}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                stack.append(names.get(thread_id, str(thread_id)))
+                self._stacks[";".join(reversed(stack))] += 1
+            self.samples += 1
+
+    def archive(self) -> bytes:
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as archive:
+            summary = {
+                "pid": os.getpid(),
+                "mode": self.options.mode.value,
+                "requests": self.requests,
+                "seconds": round(self._duration, 3),
+                "samples": self.samples,
+            }
+            archive.writestr("summary.json", json.dumps(summary, indent=2))
+            if self._profile is not None:
+                self._profile.create_stats()
+                # The format ``pstats.Stats(path)`` reads.
+                archive.writestr("profile.pstats", marshal.dumps(self._profile.stats))
+            else:
+                archive.writestr(
+                    "profile.collapsed",
+                    "".join(f"{stack} {count}\n" for stack, count in self._stacks.most_common()),
+                )
+            if self._snapshot is not None:
+                import tracemalloc
+
+                snapshot = self._snapshot.filter_traces(
+                    (tracemalloc.Filter(False, tracemalloc.__file__),)
+                )
+                top = snapshot.statistics("traceback")[:TRACEMALLOC_TOP]
+                lines = []
+                for stat in top:
+                    lines.append(f"{stat.size / 1024:.1f} KiB in {stat.count} blocks")
+                    lines.extend(f"    {line}" for line in stat.traceback.format())
+                archive.writestr("tracemalloc.txt", "\n".join(lines) + "\n")
+                with tempfile.TemporaryDirectory() as scratch:
+                    path = os.path.join(scratch, "tracemalloc.snapshot")
+                    snapshot.dump(path)
+                    archive.write(path, "tracemalloc.snapshot")
+        return buffer.getvalue()
+
+
+async def run(options: api_models.ProfileRequest) -> bytes:
+    """Profile until the request count or the time limit is reached; returns the zip."""
+    global _active
+    if _active is not None:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="A profile is already running")
+    session = ProfileSession(options)
+    session.start()
+    _active = session
+    try:
+        try:
+            await asyncio.wait_for(session.finished.wait(), timeout=options.seconds)
+        except asyncio.TimeoutError:
+            pass
+    finally:
+        _active = None
+        session.stop()
+    return await asyncio.to_thread(session.archive)
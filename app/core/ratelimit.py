@@ -0,0 +1,230 @@
+from __future__ import annotations
+
+import math
+import time
+import uuid
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta
+from functools import lru_cache
+from typing import Dict, Optional
+
+from sqlalchemy import select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.core import models as api_models
+from app.db import models
+
+
+@dataclass
+class RateLimitDecision:
+    allowed: bool = True
+    reason: Optional[str] = None
+    limit: Optional[int] = None
+    remaining: Optional[int] = None
+    retry_after: float = 0.0
+    quota: Optional[int] = None
+    quota_remaining: Optional[int] = None
+
+    def headers(self) -> Dict[str, str]:
+        headers: Dict[str, str] = {}
+        if self.limit is not None:
+            headers["X-RateLimit-Limit"] = str(self.limit)
+            headers["X-RateLimit-Remaining"] = str(max(self.remaining or 0, 0))
+        if self.quota is not None:
+            headers["X-Quota-Limit"] = str(self.quota)
+            headers["X-Quota-Remaining"] = str(max(self.quota_remaining or 0, 0))
+            headers["X-Quota-Reset"] = str(_seconds_until_midnight())
+        if not self.allowed:
+            headers["Retry-After"] = str(max(1, math.ceil(self.retry_after)))
+        return headers
+
+
+@dataclass
+class _Counters:
+    day: date = field(default_factory=lambda: datetime.utcnow().date())
+    allowed: int = 0
+    throttled: int = 0
+
+
+def _seconds_until_midnight() -> int:
+    now = datetime.utcnow()
+    midnight = datetime.combine(now.date() + timedelta(days=1), datetime.min.time())
+    return int((midnight - now).total_seconds())
+
+
+def _bucket_capacity(service: models.WebService) -> int:
+    if service.rate_limit_burst:
+        return service.rate_limit_burst
+    return max(1, math.ceil(service.rate_limit_per_second or 1))
+
+
+def _refill(tokens: float, elapsed: float, rate: float, capacity: int) -> float:
+    return min(float(capacity), tokens + max(elapsed, 0.0) * rate)
+
+
+def _decide(
+    service: models.WebService, tokens: Optional[float], used_today: int
+) -> RateLimitDecision:
+    """Shared admission logic: quota first, then the token bucket."""
+    decision = RateLimitDecision()
+    if service.daily_quota is not None:
+        decision.quota = service.daily_quota
+        decision.quota_remaining = service.daily_quota - used_today
+        if used_today >= service.daily_quota:
+            decision.allowed = False
+            decision.reason = "Daily quota exceeded"
+            decision.retry_after = _seconds_until_midnight()
+            return decision
+    if tokens is not None and service.rate_limit_per_second:
+        decision.limit = _bucket_capacity(service)
+        decision.remaining = int(tokens)
+        if tokens < 1.0:
+            decision.allowed = False
+            decision.reason = "Rate limit exceeded"
+            decision.retry_after = (1.0 - tokens) / service.rate_limit_per_second
+            return decision
+        decision.remaining = int(tokens - 1.0)
+    if decision.quota_remaining is not None:
+        decision.quota_remaining -= 1
+    return decision
+
+
+class InMemoryRateLimiter:
+    """Per-process token buckets and daily counters.
+
+    Limits hold per worker only: with ``N`` workers a service may get up to ``N`` times
+    its rate. Use the database backend when limits must be enforced cluster-wide.
+    """
+
+    def __init__(self) -> None:
+        self._buckets: Dict[uuid.UUID, tuple[float, float]] = {}
+        self._counters: Dict[uuid.UUID, _Counters] = {}
+
+    def _today(self, service_id: uuid.UUID) -> _Counters:
+        counters = self._counters.get(service_id)
+        today = datetime.utcnow().date()
+        if counters is None or counters.day != today:
+            counters = _Counters(day=today)
+            self._counters[service_id] = counters
+        return counters
+
+    async def acquire(
+        self, session: AsyncSession, service: models.WebService
+    ) -> RateLimitDecision:
+        counters = self._today(service.service_id)
+        tokens = None
+        now = time.monotonic()
+        if service.rate_limit_per_second:
+            capacity = _bucket_capacity(service)
+            stored, updated = self._buckets.get(service.service_id, (float(capacity), now))
+            tokens = _refill(stored, now - updated, service.rate_limit_per_second, capacity)
+
+        decision = _decide(service, tokens, counters.allowed)
+        if decision.allowed:
+            counters.allowed += 1
+            if tokens is not None:
+                tokens -= 1.0
+        else:
+            counters.throttled += 1
+        if tokens is not None:
+            self._buckets[service.service_id] = (tokens, now)
+        return decision
+
+    async def usage(self, session: AsyncSession, service_id: uuid.UUID) -> tuple[int, int]:
+        counters = self._today(service_id)
+        return counters.allowed, counters.throttled
+
+
+class DatabaseRateLimiter:
+    """Token buckets and daily counters kept in the database, shared by all workers.
+
+    Rows are locked with ``SELECT ... FOR UPDATE`` on PostgreSQL; SQLite serialises
+    writers on its own. Missing rows are created with ``INSERT ... ON CONFLICT DO
+    NOTHING``, so workers racing on the first request of a day never fail.
+    """
+
+    async def _locked(self, session: AsyncSession, model, *criteria):
+        result = await session.execute(select(model).where(*criteria).with_for_update())
+        return result.scalar_one_or_none()
+
+    async def _locked_or_created(self, session: AsyncSession, model, values: dict, *criteria):
+        row = await self._locked(session, model, *criteria)
+        if row is None:
+            dialect = postgresql if session.get_bind().dialect.name == "postgresql" else sqlite
+            await session.execute(dialect.insert(model).values(**values).on_conflict_do_nothing())
+            row = await self._locked(session, model, *criteria)
+        return row
+
+    async def acquire(
+        self, session: AsyncSession, service: models.WebService
+    ) -> RateLimitDecision:
+        now = datetime.utcnow()
+        usage = await self._locked_or_created(
+            session,
+            models.ServiceDailyUsage,
+            {"service_id": service.service_id, "day": now.date(), "request_count": 0, "throttled_count": 0},
+            models.ServiceDailyUsage.service_id == service.service_id,
+            models.ServiceDailyUsage.day == now.date(),
+        )
+
+        bucket = None
+        tokens = None
+        if service.rate_limit_per_second:
+            capacity = _bucket_capacity(service)
+            bucket = await self._locked_or_created(
+                session,
+                models.RateLimitBucket,
+                {"service_id": service.service_id, "tokens": float(capacity), "updated_at": now},
+                models.RateLimitBucket.service_id == service.service_id,
+            )
+            elapsed = (now - bucket.updated_at).total_seconds()
+            tokens = _refill(bucket.tokens, elapsed, service.rate_limit_per_second, capacity)
+
+        decision = _decide(service, tokens, usage.request_count)
+        if decision.allowed:
+            usage.request_count += 1
+            if tokens is not None:
+                tokens -= 1.0
+        else:
+            usage.throttled_count += 1
+        if bucket is not None:
+            bucket.tokens = tokens
+            bucket.updated_at = now
+        await session.commit()
+        return decision
+
+    async def usage(self, session: AsyncSession, service_id: uuid.UUID) -> tuple[int, int]:
+        usage = await session.get(
+            models.ServiceDailyUsage, (service_id, datetime.utcnow().date())
+        )
+        if usage is None:
+            return 0, 0
+        return usage.request_count, usage.throttled_count
+
+
+@lru_cache(maxsize=1)
+def get_rate_limiter():
+    if settings.rate_limit_backend == "database":
+        return DatabaseRateLimiter()
+    return InMemoryRateLimiter()
+
+
+async def get_service_usage(
+    session: AsyncSession, service: models.WebService
+) -> api_models.ServiceUsage:
+    allowed, throttled = await get_rate_limiter().usage(session, service.service_id)
+    quota_remaining = None
+    if service.daily_quota is not None:
+        quota_remaining = max(service.daily_quota - allowed, 0)
+    return api_models.ServiceUsage(
+        service_id=str(service.service_id),
+        day=datetime.utcnow().date(),
+        requests_allowed=allowed,
+        requests_throttled=throttled,
+        daily_quota=service.daily_quota,
+        quota_remaining=quota_remaining,
+        rate_limit_per_second=service.rate_limit_per_second,
+        rate_limit_burst=service.rate_limit_burst,
+    )
@@ -1,19 +1,98 @@
 from __future__ import annotations
 
+import asyncio
+import hashlib
 import json
+import re
 import uuid
-from datetime import datetime
-from typing import Iterable, Optional
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import AsyncIterator, Iterable, Optional, Sequence
 
 from fastapi import HTTPException, status
-from sqlalchemy import select
+from sqlalchemy import (
+    DateTime,
+    Uuid,
+    case,
+    column,
+    delete,
+    func,
+    insert,
+    literal,
+    literal_column,
+    or_,
+    select,
+    table,
+    tuple_,
+    update,
+)
+from sqlalchemy import inspect as sa_inspect
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.config import settings
+from app.core import invalidation
 from app.core import models as api_models
+from app.core import ratelimit
 from app.db import models
+from app.db import session as db_session
+
+
+# ``last_used`` of a cached key is written at most this often per worker.
+_LAST_USED_RESOLUTION = timedelta(minutes=1)
+
+
+@dataclass
+class _CachedKey:
+    key_id: uuid.UUID
+    expires_at: Optional[datetime]
+    service: models.WebService
+    last_used: datetime
+
+
+# Keyed by the SHA-256 of the presented key, so a hit skips the bcrypt check.
+_api_key_cache = invalidation.LocalCache(
+    "api_keys",
+    (invalidation.API_KEYS, invalidation.SERVICES),
+    settings.cache_ttl_seconds,
+    settings.cache_max_entries,
+)
+_category_cache = invalidation.LocalCache(
+    "categories", (invalidation.CATEGORIES,), settings.cache_ttl_seconds, 1
+)
+# Subscribed category ids per service; subscriptions publish on the categories topic.
+_service_category_cache = invalidation.LocalCache(
+    "service_categories",
+    (invalidation.CATEGORIES,),
+    settings.cache_ttl_seconds,
+    settings.cache_max_entries,
+)
+
+
+def _detached_service(service: models.WebService) -> models.WebService:
+    """Copy of the column values, shared across requests and bound to no session."""
+    return models.WebService(
+        **{attr.key: getattr(service, attr.key) for attr in sa_inspect(models.WebService).column_attrs}
+    )
 
 
 async def validate_api_key(session: AsyncSession, api_key: str) -> models.WebService:
+    digest = hashlib.sha256(api_key.encode("utf-8")).digest()
+    now = datetime.utcnow()
+    cached: Optional[_CachedKey] = _api_key_cache.get(digest)
+    if cached is not None:
+        if cached.expires_at is None or cached.expires_at >= now:
+            if now - cached.last_used >= _LAST_USED_RESOLUTION:
+                cached.last_used = now
+                await session.execute(
+                    update(models.APIKey)
+                    .where(models.APIKey.key_id == cached.key_id)
+                    .values(last_used=now)
+                )
+                await session.commit()
+            return cached.service
+        _api_key_cache.discard(digest)
+
+    generation = _api_key_cache.generation
     prefix = api_key[:8]
     result = await session.execute(
         select(models.APIKey).where(
@@ -23,15 +102,18 @@ async def validate_api_key(session: AsyncSession, api_key: str) -> models.WebSer
     )
     api_keys = result.scalars().all()
     for key in api_keys:
-        if key.verify(api_key):
-            if key.expires_at and key.expires_at < datetime.utcnow():
+        # bcrypt takes hundreds of milliseconds; off the event loop it does not stall other requests.
+        if await asyncio.to_thread(key.verify, api_key):
+            if key.expires_at and key.expires_at < now:
                 break
-            key.last_used = datetime.utcnow()
+            key.last_used = now
             await session.commit()
-            await session.refresh(key)
             service = await session.get(models.WebService, key.service_id)
             if service is None or not service.is_active:
                 break
+            _api_key_cache.put(
+                digest, _CachedKey(key.key_id, key.expires_at, _detached_service(service), now), generation
+            )
             return service
     raise HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
@@ -75,8 +157,8 @@ async def save_moderation_request(
         status=api_models.RequestStatus.PROCESSING.value,
     )
     session.add(request)
+    # Column defaults are set on the instance at flush and commits do not expire it.
     await session.commit()
-    await session.refresh(request)
     return request
 
 
@@ -84,6 +166,8 @@ async def save_moderation_result(
     session: AsyncSession,
     request: models.ModerationRequest,
     result: api_models.ModerationResult,
+    service: Optional[models.WebService] = None,
+    rescore_pending: bool = False,
 ) -> models.ModerationResult:
     db_result = models.ModerationResult(
         request_id=request.request_id,
@@ -92,19 +176,115 @@ async def save_moderation_result(
         model_version=result.model_version,
         processed_at=result.processed_at,
         label_scores=json.dumps(result.label_scores or {}),
+        rescore_pending=rescore_pending,
     )
     session.add(db_result)
+    if service is None:
+        service = await session.get(models.WebService, request.service_id)
+    if service is not None and service.webhook_url:
+        session.add(
+            models.WebhookEvent(
+                **_webhook_event_row(
+                    service.service_id,
+                    api_models.WebhookEventType.MODERATION_COMPLETED,
+                    request.request_id,
+                    result,
+                )
+            )
+        )
     request.status = api_models.RequestStatus.COMPLETED.value
     await session.commit()
-    await session.refresh(db_result)
-    await session.refresh(request)
     return db_result
 
 
+async def fail_moderation_request(session: AsyncSession, request: models.ModerationRequest) -> None:
+    request.status = api_models.RequestStatus.FAILED.value
+    await session.commit()
+
+
+async def save_moderation_requests(
+    session: AsyncSession,
+    service: models.WebService,
+    texts: Sequence[str],
+) -> list[uuid.UUID]:
+    """Insert a batch of requests with one executemany; returns their ids in order."""
+    now = datetime.utcnow()
+    rows = [
+        {
+            "request_id": uuid.uuid4(),
+            "service_id": service.service_id,
+            "timestamp": now,
+            "content_type": api_models.ContentType.TEXT.value,
+            "content_text": text,
+            "status": api_models.RequestStatus.PROCESSING.value,
+        }
+        for text in texts
+    ]
+    await session.execute(insert(models.ModerationRequest), rows)
+    await session.commit()
+    return [row["request_id"] for row in rows]
+
+
+async def save_moderation_results(
+    session: AsyncSession,
+    service: models.WebService,
+    request_ids: Sequence[uuid.UUID],
+    results: Sequence[api_models.ModerationResult],
+) -> list[api_models.ModerationResult]:
+    rows = [
+        {
+            "result_id": uuid.uuid4(),
+            "request_id": request_id,
+            "decision": result.decision.value,
+            "confidence_score": result.confidence_score,
+            "model_version": result.model_version,
+            "processed_at": result.processed_at,
+            "label_scores": json.dumps(result.label_scores or {}),
+        }
+        for request_id, result in zip(request_ids, results)
+    ]
+    if rows:
+        await session.execute(insert(models.ModerationResult), rows)
+        await session.execute(
+            update(models.ModerationRequest)
+            .where(models.ModerationRequest.request_id.in_(request_ids))
+            .values(status=api_models.RequestStatus.COMPLETED.value)
+        )
+        if service.webhook_url:
+            await session.execute(
+                insert(models.WebhookEvent),
+                [
+                    _webhook_event_row(
+                        service.service_id,
+                        api_models.WebhookEventType.MODERATION_COMPLETED,
+                        request_id,
+                        result,
+                    )
+                    for request_id, result in zip(request_ids, results)
+                ],
+            )
+        await session.commit()
+    return [
+        result.model_copy(update={"result_id": str(row["result_id"]), "request_id": str(row["request_id"])})
+        for row, result in zip(rows, results)
+    ]
+
+
+async def mark_requests_failed(session: AsyncSession, request_ids: Sequence[uuid.UUID]) -> None:
+    if request_ids:
+        await session.execute(
+            update(models.ModerationRequest)
+            .where(models.ModerationRequest.request_id.in_(request_ids))
+            .values(status=api_models.RequestStatus.FAILED.value)
+        )
+        await session.commit()
+
+
 async def update_moderation_result(
     session: AsyncSession,
     request_id: uuid.UUID,
     update: api_models.ModerationUpdate,
+    moderator_id: Optional[uuid.UUID] = None,
 ) -> tuple[models.ModerationRequest, models.ModerationResult]:
     request = await session.get(models.ModerationRequest, request_id)
     if request is None:
@@ -118,23 +298,725 @@ async def update_moderation_result(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Result not available yet",
         )
+    if (
+        moderator_id is not None
+        and result_obj.review_claimed_by not in (None, moderator_id)
+        and result_obj.review_claim_expires_at is not None
+        and result_obj.review_claim_expires_at > datetime.utcnow()
+    ):
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Claimed by another moderator",
+        )
     result_obj.decision = update.decision.value
+    result_obj.review_claimed_by = None
+    result_obj.review_claim_expires_at = None
+    # A moderator's decision is final: a pending degraded-mode re-score must not replace it.
+    result_obj.rescore_pending = False
+    result_obj.moderated_by = moderator_id
     if update.confidence_score is not None:
         result_obj.confidence_score = update.confidence_score
     if update.model_version is not None:
         result_obj.model_version = update.model_version
+    service = await session.get(models.WebService, request.service_id)
+    if service is not None and service.webhook_url:
+        session.add(
+            models.WebhookEvent(
+                **_webhook_event_row(
+                    service.service_id,
+                    api_models.WebhookEventType.MODERATION_OVERRIDDEN,
+                    request.request_id,
+                    map_result_to_api(result_obj),
+                )
+            )
+        )
+    await invalidation.publish(
+        session,
+        invalidation.RESULTS,
+        f"{request_id} {result_obj.decision} {result_obj.confidence_score!r}",
+    )
     await session.commit()
     await session.refresh(result_obj)
     await session.refresh(request)
     return request, result_obj
 
 
+def _webhook_event_row(
+    service_id: uuid.UUID,
+    event_type: api_models.WebhookEventType,
+    request_id: uuid.UUID,
+    result: api_models.ModerationResult,
+) -> dict:
+    now = datetime.utcnow()
+    event_id = uuid.uuid4()
+    payload = {
+        "event_id": str(event_id),
+        "type": event_type.value,
+        "service_id": str(service_id),
+        "request_id": str(request_id),
+        "decision": result.decision.value,
+        "confidence_score": result.confidence_score,
+        "model_version": result.model_version,
+        "processed_at": result.processed_at.isoformat(),
+        "label_scores": result.label_scores or {},
+    }
+    return {
+        "event_id": event_id,
+        "service_id": service_id,
+        "event_type": event_type.value,
+        "payload": json.dumps(payload),
+        "status": api_models.WebhookEventStatus.PENDING.value,
+        "attempts": 0,
+        "created_at": now,
+        "next_attempt_at": now,
+    }
+
+
+async def claim_webhook_events(
+    session: AsyncSession, limit: int, lease_seconds: float
+) -> list[tuple[models.WebhookEvent, models.WebService]]:
+    """Take up to ``limit`` due events for delivery, with their services.
+
+    Claimed events are pushed ``lease_seconds`` into the future, so other workers skip
+    them; if this worker dies they become due again when the lease runs out.
+    """
+    now = datetime.utcnow()
+    rows = (
+        await session.execute(
+            select(models.WebhookEvent, models.WebService)
+            .join(models.WebService, models.WebService.service_id == models.WebhookEvent.service_id)
+            .where(
+                models.WebhookEvent.status == api_models.WebhookEventStatus.PENDING.value,
+                models.WebhookEvent.next_attempt_at <= now,
+            )
+            .order_by(models.WebhookEvent.next_attempt_at)
+            .limit(limit)
+            .with_for_update(skip_locked=True, of=models.WebhookEvent)
+        )
+    ).all()
+    if rows:
+        await session.execute(
+            update(models.WebhookEvent)
+            .where(models.WebhookEvent.event_id.in_([event.event_id for event, _ in rows]))
+            .values(next_attempt_at=now + timedelta(seconds=lease_seconds))
+        )
+    await session.commit()
+    return [(event, service) for event, service in rows]
+
+
+async def record_webhook_attempt(
+    session: AsyncSession,
+    event_ids: Sequence[uuid.UUID],
+    outcome: api_models.WebhookEventStatus,
+    next_attempt_at: Optional[datetime] = None,
+    error: Optional[str] = None,
+) -> None:
+    if not event_ids:
+        return
+    values: dict = {"status": outcome.value, "last_error": error}
+    if outcome is api_models.WebhookEventStatus.DELIVERED:
+        values["delivered_at"] = datetime.utcnow()
+    if outcome is not api_models.WebhookEventStatus.DISCARDED:
+        values["attempts"] = models.WebhookEvent.attempts + 1
+    if next_attempt_at is not None:
+        values["next_attempt_at"] = next_attempt_at
+    await session.execute(
+        update(models.WebhookEvent).where(models.WebhookEvent.event_id.in_(event_ids)).values(**values)
+    )
+    await session.commit()
+
+
+async def list_pending_rescores(session: AsyncSession, limit: int) -> list:
+    """Oldest results decided in degraded mode that still wait for the model."""
+    rows = await session.execute(
+        select(
+            models.ModerationResult.result_id,
+            models.ModerationResult.request_id,
+            models.ModerationResult.decision,
+            models.ModerationRequest.service_id,
+            models.ModerationRequest.content_text,
+        )
+        .join(
+            models.ModerationRequest,
+            models.ModerationRequest.request_id == models.ModerationResult.request_id,
+        )
+        .where(models.ModerationResult.rescore_pending.is_(True))
+        .order_by(models.ModerationResult.processed_at)
+        .limit(limit)
+    )
+    return list(rows)
+
+
+async def apply_rescores(
+    session: AsyncSession,
+    pending: Sequence,
+    results: Sequence[api_models.ModerationResult],
+) -> int:
+    """Replace degraded-mode decisions with model ones; returns how many decisions changed.
+
+    ``pending`` rows come from ``list_pending_rescores``. A row a moderator decided in the
+    meantime no longer has ``rescore_pending`` set and is left alone. Changed decisions
+    are announced to the service's webhook.
+    """
+    service_ids = {row.service_id for row in pending}
+    webhook_services = set(
+        (
+            await session.execute(
+                select(models.WebService.service_id).where(
+                    models.WebService.service_id.in_(service_ids),
+                    models.WebService.webhook_url.is_not(None),
+                )
+            )
+        ).scalars()
+    )
+    changed = 0
+    for row, result in zip(pending, results):
+        updated = await session.execute(
+            update(models.ModerationResult)
+            .where(
+                models.ModerationResult.result_id == row.result_id,
+                models.ModerationResult.rescore_pending.is_(True),
+            )
+            .values(
+                decision=result.decision.value,
+                confidence_score=result.confidence_score,
+                model_version=result.model_version,
+                processed_at=result.processed_at,
+                label_scores=json.dumps(result.label_scores or {}),
+                rescore_pending=False,
+            )
+            .execution_options(synchronize_session=False)
+        )
+        if updated.rowcount != 1 or result.decision.value == row.decision:
+            continue
+        changed += 1
+        if row.service_id in webhook_services:
+            session.add(
+                models.WebhookEvent(
+                    **_webhook_event_row(
+                        row.service_id,
+                        api_models.WebhookEventType.MODERATION_RESCORED,
+                        row.request_id,
+                        result,
+                    )
+                )
+            )
+    await session.commit()
+    return changed
+
+
+async def create_remoderation_job(
+    session: AsyncSession,
+    spec: api_models.RemoderationJobCreate,
+    target_version: Optional[str],
+    created_by: Optional[uuid.UUID] = None,
+) -> models.RemoderationJob:
+    """A PENDING job that re-scores with registry version ``target_version`` and no other."""
+    service_id = uuid.UUID(spec.service_id) if spec.service_id else None
+    if service_id is not None and await session.get(models.WebService, service_id) is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Service not found")
+    now = datetime.utcnow()
+    job = models.RemoderationJob(
+        job_id=uuid.uuid4(),
+        status=api_models.RemoderationJobStatus.PENDING.value,
+        service_id=service_id,
+        since=spec.since,
+        until=spec.until,
+        rate_per_second=spec.rate_per_second,
+        notify_webhooks=spec.notify_webhooks,
+        processed=0,
+        changed=0,
+        skipped=0,
+        target_version=target_version,
+        created_by=created_by,
+        created_at=now,
+        updated_at=now,
+    )
+    session.add(job)
+    await session.commit()
+    return job
+
+
+async def get_remoderation_job(session: AsyncSession, job_id: uuid.UUID) -> models.RemoderationJob:
+    job = await session.get(models.RemoderationJob, job_id)
+    if job is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Job not found")
+    return job
+
+
+async def list_remoderation_jobs(session: AsyncSession) -> list[api_models.RemoderationJob]:
+    result = await session.execute(
+        select(models.RemoderationJob).order_by(models.RemoderationJob.created_at.desc())
+    )
+    return [map_remoderation_job_to_api(job) for job in result.scalars().all()]
+
+
+async def claim_remoderation_job(
+    session: AsyncSession, job_id: uuid.UUID, owner: str, stale_seconds: float
+) -> Optional[models.RemoderationJob]:
+    """Mark a job RUNNING for ``owner``; ``None`` if it finished or runs elsewhere."""
+    job_status = api_models.RemoderationJobStatus
+    now = datetime.utcnow()
+    claimed = await session.execute(
+        update(models.RemoderationJob)
+        .where(
+            models.RemoderationJob.job_id == job_id,
+            or_(
+                models.RemoderationJob.status.in_(
+                    [job_status.PENDING.value, job_status.PAUSED.value, job_status.FAILED.value]
+                ),
+                (models.RemoderationJob.status == job_status.RUNNING.value)
+                & (models.RemoderationJob.updated_at < now - timedelta(seconds=stale_seconds)),
+            ),
+        )
+        .values(status=job_status.RUNNING.value, owner=owner, updated_at=now, last_error=None)
+        .execution_options(synchronize_session=False)
+    )
+    await session.commit()
+    if claimed.rowcount != 1:
+        return None
+    return await session.get(models.RemoderationJob, job_id, populate_existing=True)
+
+
+async def finish_remoderation_job(
+    session: AsyncSession,
+    job: models.RemoderationJob,
+    job_status: api_models.RemoderationJobStatus,
+    error: Optional[str] = None,
+) -> None:
+    """Leave RUNNING unless the job was paused or taken over in the meantime."""
+    now = datetime.utcnow()
+    values = {"status": job_status.value, "owner": None, "updated_at": now, "last_error": error}
+    if job_status is api_models.RemoderationJobStatus.COMPLETED:
+        values["finished_at"] = now
+    finished = await session.execute(
+        update(models.RemoderationJob)
+        .where(
+            models.RemoderationJob.job_id == job.job_id,
+            models.RemoderationJob.status == api_models.RemoderationJobStatus.RUNNING.value,
+            models.RemoderationJob.owner == job.owner,
+        )
+        .values(**values)
+        .execution_options(synchronize_session=False)
+    )
+    await session.commit()
+    if finished.rowcount == 1:
+        for key, value in values.items():
+            setattr(job, key, value)
+
+
+async def pause_remoderation_job(session: AsyncSession, job_id: uuid.UUID) -> models.RemoderationJob:
+    """Stop a job at its next checkpoint, on whichever worker runs it."""
+    job_status = api_models.RemoderationJobStatus
+    paused = await session.execute(
+        update(models.RemoderationJob)
+        .where(
+            models.RemoderationJob.job_id == job_id,
+            models.RemoderationJob.status.in_([job_status.PENDING.value, job_status.RUNNING.value]),
+        )
+        .values(status=job_status.PAUSED.value, owner=None, updated_at=datetime.utcnow())
+        .execution_options(synchronize_session=False)
+    )
+    await session.commit()
+    job = await get_remoderation_job(session, job_id)
+    if paused.rowcount != 1:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=f"Job is {job.status}")
+    return job
+
+
+async def next_remoderation_page(session: AsyncSession, job: models.RemoderationJob, limit: int) -> list:
+    """The next comments of a job after its checkpoint, in keyset order.
+
+    Results a moderator decided are never re-scored, so they are left out here.
+    """
+    request_model, result_model = models.ModerationRequest, models.ModerationResult
+    query = (
+        select(
+            request_model.request_id,
+            request_model.timestamp,
+            request_model.service_id,
+            request_model.content_text,
+            result_model.result_id,
+            result_model.decision,
+            result_model.processed_at,
+        )
+        .join(result_model, result_model.request_id == request_model.request_id)
+        .where(result_model.moderated_by.is_(None))
+        .order_by(request_model.timestamp, request_model.request_id)
+        .limit(limit)
+    )
+    if job.cursor_timestamp is not None:
+        query = query.where(
+            tuple_(request_model.timestamp, request_model.request_id)
+            > tuple_(literal(job.cursor_timestamp, DateTime()), literal(job.cursor_request_id, Uuid()))
+        )
+    if job.service_id is not None:
+        query = query.where(request_model.service_id == job.service_id)
+    if job.since is not None:
+        query = query.where(request_model.timestamp >= job.since)
+    if job.until is not None:
+        query = query.where(request_model.timestamp < job.until)
+    return list(await session.execute(query))
+
+
+async def apply_remoderation_page(
+    session: AsyncSession,
+    job: models.RemoderationJob,
+    page: Sequence,
+    results: Sequence[api_models.ModerationResult],
+) -> bool:
+    """Store a page's new results and move the checkpoint past it in one transaction.
+
+    The replaced results are copied to ``moderationresulthistory`` first. Rows that
+    changed since the page was read (a moderator's decision, a degraded-mode re-score)
+    are skipped. Returns ``False``, writing nothing, if the job was paused or taken over.
+    """
+    now = datetime.utcnow()
+    result_model = models.ModerationResult
+    current = {
+        row.result_id: row
+        for row in await session.execute(
+            select(
+                result_model.result_id,
+                result_model.decision,
+                result_model.confidence_score,
+                result_model.model_version,
+                result_model.label_scores,
+                result_model.processed_at,
+                result_model.moderated_by,
+            )
+            .where(result_model.result_id.in_([row.result_id for row in page]))
+            .with_for_update()
+        )
+    }
+    webhook_services: set = set()
+    if job.notify_webhooks:
+        webhook_services = set(
+            (
+                await session.execute(
+                    select(models.WebService.service_id).where(
+                        models.WebService.service_id.in_({row.service_id for row in page}),
+                        models.WebService.webhook_url.is_not(None),
+                    )
+                )
+            ).scalars()
+        )
+    history, updates, events = [], [], []
+    changed = 0
+    for row, result in zip(page, results):
+        old = current.get(row.result_id)
+        if old is None or old.moderated_by is not None or old.processed_at != row.processed_at:
+            continue
+        history.append(
+            {
+                "history_id": uuid.uuid4(),
+                "result_id": old.result_id,
+                "job_id": job.job_id,
+                "decision": old.decision,
+                "confidence_score": old.confidence_score,
+                "model_version": old.model_version,
+                "label_scores": old.label_scores,
+                "processed_at": old.processed_at,
+                "replaced_at": now,
+            }
+        )
+        updates.append(
+            {
+                "result_id": old.result_id,
+                "decision": result.decision.value,
+                "confidence_score": result.confidence_score,
+                "model_version": result.model_version,
+                "processed_at": result.processed_at,
+                "label_scores": json.dumps(result.label_scores or {}),
+                "rescore_pending": False,
+            }
+        )
+        if result.decision.value == old.decision:
+            continue
+        changed += 1
+        if row.service_id in webhook_services:
+            events.append(
+                _webhook_event_row(
+                    row.service_id, api_models.WebhookEventType.MODERATION_RESCORED, row.request_id, result
+                )
+            )
+    if updates:
+        await session.execute(insert(models.ModerationResultHistory), history)
+        # Bulk UPDATE by primary key: one executemany statement for the page.
+        await session.execute(update(result_model), updates)
+    if events:
+        await session.execute(insert(models.WebhookEvent), events)
+    last = page[-1]
+    checkpoint = {
+        "cursor_timestamp": last.timestamp,
+        "cursor_request_id": last.request_id,
+        "processed": job.processed + len(updates),
+        "changed": job.changed + changed,
+        "skipped": job.skipped + len(page) - len(updates),
+        "model_version": results[-1].model_version if results else job.model_version,
+        "updated_at": now,
+    }
+    saved = await session.execute(
+        update(models.RemoderationJob)
+        .where(
+            models.RemoderationJob.job_id == job.job_id,
+            models.RemoderationJob.status == api_models.RemoderationJobStatus.RUNNING.value,
+            models.RemoderationJob.owner == job.owner,
+        )
+        .values(**checkpoint)
+        .execution_options(synchronize_session=False)
+    )
+    if saved.rowcount != 1:
+        await session.rollback()
+        return False
+    await session.commit()
+    for key, value in checkpoint.items():
+        setattr(job, key, value)
+    return True
+
+
 async def list_requests(session: AsyncSession) -> list[api_models.ModerationRequest]:
     result = await session.execute(select(models.ModerationRequest))
     requests = result.scalars().all()
     return [map_request_to_api(request) for request in requests]
 
 
+_REVIEW_QUEUE_ORDER = (
+    models.ModerationResult.confidence_score.desc(),
+    models.ModerationResult.processed_at,
+)
+
+
+def _review_queue_query(service_id: Optional[uuid.UUID]):
+    query = select(models.ModerationRequest, models.ModerationResult).join(
+        models.ModerationResult,
+        models.ModerationResult.request_id == models.ModerationRequest.request_id,
+    )
+    if service_id is not None:
+        query = query.where(models.ModerationRequest.service_id == service_id)
+    return query.order_by(*_REVIEW_QUEUE_ORDER)
+
+
+def _map_review_item(
+    request: models.ModerationRequest, result: models.ModerationResult
+) -> api_models.ReviewItem:
+    return api_models.ReviewItem(
+        request=map_request_to_api(request),
+        result=map_result_to_api(result),
+        claimed_by=str(result.review_claimed_by) if result.review_claimed_by else None,
+        claim_expires_at=result.review_claim_expires_at,
+    )
+
+
+async def list_review_queue(
+    session: AsyncSession,
+    service_id: Optional[uuid.UUID] = None,
+    limit: int = 50,
+    offset: int = 0,
+) -> list[api_models.ReviewItem]:
+    """Pending ``HUMAN_REVIEW`` results, most confident first, then oldest first."""
+    query = _review_queue_query(service_id).where(
+        models.ModerationResult.decision == api_models.ModerationDecision.HUMAN_REVIEW.value
+    )
+    rows = await session.execute(query.limit(limit).offset(offset))
+    return [_map_review_item(request, result) for request, result in rows]
+
+
+async def claim_review_items(
+    session: AsyncSession,
+    moderator_id: uuid.UUID,
+    count: int,
+    lease_seconds: float,
+    service_id: Optional[uuid.UUID] = None,
+) -> list[api_models.ReviewItem]:
+    """Atomically hand the next ``count`` unclaimed items to one moderator.
+
+    A single UPDATE takes the head of the queue; on PostgreSQL ``SKIP LOCKED`` lets
+    concurrent claims pass each other instead of queueing on the same rows. Claims
+    expire after ``lease_seconds``, returning abandoned items to the queue.
+    """
+    now = datetime.utcnow()
+    result_model = models.ModerationResult
+    candidates = select(result_model.result_id).where(
+        result_model.decision == api_models.ModerationDecision.HUMAN_REVIEW.value,
+        or_(result_model.review_claim_expires_at.is_(None), result_model.review_claim_expires_at <= now),
+    )
+    if service_id is not None:
+        candidates = candidates.join(
+            models.ModerationRequest,
+            models.ModerationRequest.request_id == result_model.request_id,
+        ).where(models.ModerationRequest.service_id == service_id)
+    candidates = (
+        candidates.order_by(*_REVIEW_QUEUE_ORDER)
+        .limit(count)
+        .with_for_update(skip_locked=True, of=result_model)
+    )
+    claimed = await session.execute(
+        update(result_model)
+        .where(result_model.result_id.in_(candidates.scalar_subquery()))
+        .values(
+            review_claimed_by=moderator_id,
+            review_claim_expires_at=now + timedelta(seconds=lease_seconds),
+        )
+        .returning(result_model.result_id)
+        .execution_options(synchronize_session=False)
+    )
+    claimed_ids = claimed.scalars().all()
+    await session.commit()
+    if not claimed_ids:
+        return []
+    rows = await session.execute(
+        _review_queue_query(None)
+        .where(result_model.result_id.in_(claimed_ids))
+        .execution_options(populate_existing=True)
+    )
+    return [_map_review_item(request, result) for request, result in rows]
+
+
+async def review_queue_stats(session: AsyncSession) -> dict[str, tuple[int, Optional[datetime]]]:
+    """``{"waiting" | "claimed": (depth, oldest processed_at)}`` of the review queue."""
+    result_model = models.ModerationResult
+    state = case(
+        (result_model.review_claim_expires_at > datetime.utcnow(), "claimed"),
+        else_="waiting",
+    )
+    rows = await session.execute(
+        select(state, func.count(), func.min(result_model.processed_at))
+        .where(result_model.decision == api_models.ModerationDecision.HUMAN_REVIEW.value)
+        .group_by(state)
+    )
+    return {name: (depth, oldest) for name, depth, oldest in rows}
+
+
+async def iter_labelled_history(
+    session: AsyncSession,
+    service_id: Optional[uuid.UUID] = None,
+    chunk_size: int = 1000,
+) -> AsyncIterator[tuple[models.ModerationRequest, models.ModerationResult]]:
+    """Stream completed requests with their results without loading the whole table."""
+    query = select(models.ModerationRequest, models.ModerationResult).join(
+        models.ModerationResult,
+        models.ModerationResult.request_id == models.ModerationRequest.request_id,
+    )
+    if service_id is not None:
+        query = query.where(models.ModerationRequest.service_id == service_id)
+    result = await session.stream(query.execution_options(yield_per=chunk_size))
+    async for request, db_result in result:
+        yield request, db_result
+
+
+_FTS5_TERM_RE = re.compile(r'"([^"]*)"|(\S+)')
+
+
+def _fts5_query(query: str) -> str:
+    """Quoted phrases and bare words, all required; FTS5 operators are taken literally."""
+    terms = [phrase or word for phrase, word in _FTS5_TERM_RE.findall(query)]
+    return " ".join('"' + term.replace('"', '""') + '"' for term in terms if term.strip())
+
+
+async def search_requests(
+    session: AsyncSession,
+    query: str,
+    service_id: Optional[uuid.UUID] = None,
+    decision: Optional[api_models.ModerationDecision] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    limit: int = 50,
+    offset: int = 0,
+) -> list[api_models.SearchHit]:
+    """Full-text search over comments, best match first.
+
+    PostgreSQL reads ``query`` as ``websearch_to_tsquery`` (quoted phrases, ``or``,
+    ``-word``); FTS5 matches every word and quoted phrase. Without either index the
+    search degrades to a substring scan ordered by recency.
+    """
+    request_model, result_model = models.ModerationRequest, models.ModerationResult
+    backend = db_session.full_text_backend
+    if backend == "postgresql":
+        config = literal_column(db_session.FULL_TEXT_CONFIG)
+        document = func.to_tsvector(config, request_model.content_text)
+        ts_query = func.websearch_to_tsquery(config, query)
+        score = func.ts_rank_cd(document, ts_query)
+        statement = (
+            select(request_model, result_model, score)
+            .select_from(request_model)
+            .where(document.op("@@")(ts_query))
+            .order_by(score.desc())
+        )
+    elif backend == "fts5":
+        match = _fts5_query(query)
+        if not match:
+            return []
+        fts = table("moderationrequest_fts", column("rowid"))
+        # bm25() is lower for better matches.
+        bm25 = func.bm25(literal_column("moderationrequest_fts"))
+        statement = (
+            select(request_model, result_model, -bm25)
+            .select_from(fts)
+            .join(request_model, literal_column("moderationrequest.rowid") == fts.c.rowid)
+            .where(literal_column("moderationrequest_fts").op("MATCH")(match))
+            .order_by(bm25)
+        )
+    else:
+        pattern = "%" + query.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+        statement = (
+            select(request_model, result_model, literal(0.0))
+            .select_from(request_model)
+            .where(request_model.content_text.ilike(pattern, escape="\\"))
+        )
+    statement = statement.outerjoin(
+        result_model, result_model.request_id == request_model.request_id
+    ).order_by(request_model.timestamp.desc(), request_model.request_id)
+    if service_id is not None:
+        statement = statement.where(request_model.service_id == service_id)
+    if decision is not None:
+        statement = statement.where(result_model.decision == decision.value)
+    if since is not None:
+        statement = statement.where(request_model.timestamp >= since)
+    if until is not None:
+        statement = statement.where(request_model.timestamp < until)
+    rows = await session.execute(statement.limit(limit).offset(offset))
+    return [
+        api_models.SearchHit(
+            request=map_request_to_api(request),
+            result=map_result_to_api(result) if result is not None else None,
+            score=float(score or 0.0),
+        )
+        for request, result, score in rows
+    ]
+
+
+async def iter_decision_scores(
+    session: AsyncSession,
+    service_id: Optional[uuid.UUID] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    chunk_size: int = 50000,
+) -> AsyncIterator[Sequence[tuple[uuid.UUID, str, Optional[str], bool]]]:
+    """Stream ``(service_id, decision, label_scores JSON, overridden)`` of stored results in chunks.
+
+    ``overridden`` is true for decisions a moderator made.
+    """
+    query = select(
+        models.ModerationRequest.service_id,
+        models.ModerationResult.decision,
+        models.ModerationResult.label_scores,
+        models.ModerationResult.moderated_by.is_not(None),
+    ).join(
+        models.ModerationResult,
+        models.ModerationResult.request_id == models.ModerationRequest.request_id,
+    )
+    if service_id is not None:
+        query = query.where(models.ModerationRequest.service_id == service_id)
+    if since is not None:
+        query = query.where(models.ModerationRequest.timestamp >= since)
+    if until is not None:
+        query = query.where(models.ModerationRequest.timestamp < until)
+    result = await session.stream(query.execution_options(yield_per=chunk_size))
+    async for chunk in result.partitions():
+        yield chunk
+
+
 async def get_request_with_result(
     session: AsyncSession, request_id: uuid.UUID
 ) -> tuple[api_models.ModerationRequest, api_models.ModerationResult]:
@@ -176,15 +1058,93 @@ async def upsert_category(
         db_category.auto_reject_threshold = category.auto_reject_threshold
         db_category.human_review_threshold = category.human_review_threshold
         db_category.is_enabled = category.is_enabled
+    await invalidation.publish(session, invalidation.CATEGORIES, category_id)
     await session.commit()
     await session.refresh(db_category)
     return map_category_to_api(db_category)
 
 
 async def list_categories(session: AsyncSession) -> list[api_models.ViolationCategory]:
+    cached = _category_cache.get(None)
+    if cached is not None:
+        return list(cached)
+    generation = _category_cache.generation
     result = await session.execute(select(models.ViolationCategory))
-    categories = result.scalars().all()
-    return [map_category_to_api(cat) for cat in categories]
+    categories = [map_category_to_api(cat) for cat in result.scalars().all()]
+    _category_cache.put(None, tuple(categories), generation)
+    return categories
+
+
+async def get_service_categories(
+    session: AsyncSession, service_id: uuid.UUID
+) -> list[api_models.ViolationCategory]:
+    if await session.get(models.WebService, service_id) is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Service not found")
+    result = await session.execute(
+        select(models.ViolationCategory)
+        .join(
+            models.ServiceCategory,
+            models.ServiceCategory.category_id == models.ViolationCategory.category_id,
+        )
+        .where(models.ServiceCategory.service_id == service_id)
+    )
+    return [map_category_to_api(category) for category in result.scalars().all()]
+
+
+async def set_service_categories(
+    session: AsyncSession, service_id: uuid.UUID, subscription: api_models.ServiceCategories
+) -> list[api_models.ViolationCategory]:
+    """Replace the categories a service subscribes to."""
+    if await session.get(models.WebService, service_id) is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Service not found")
+    category_ids = set(subscription.category_ids)
+    if category_ids:
+        known = await session.scalar(
+            select(func.count())
+            .select_from(models.ViolationCategory)
+            .where(models.ViolationCategory.category_id.in_(category_ids))
+        )
+        if known != len(category_ids):
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Unknown category")
+    await session.execute(
+        delete(models.ServiceCategory).where(models.ServiceCategory.service_id == service_id)
+    )
+    session.add_all(
+        models.ServiceCategory(service_id=service_id, category_id=category_id)
+        for category_id in category_ids
+    )
+    await invalidation.publish(session, invalidation.CATEGORIES, service_id)
+    await session.commit()
+    return await get_service_categories(session, service_id)
+
+
+async def active_category_types(
+    session: AsyncSession, service_id: uuid.UUID
+) -> Optional[frozenset[api_models.CategoryType]]:
+    """Types of the enabled categories a service subscribes to.
+
+    ``None`` when none of them is enabled: nothing is configured, so everything is
+    checked. That includes a service subscribed only to disabled categories.
+    """
+    enabled = [category for category in await list_categories(session) if category.is_enabled]
+    if not enabled:
+        return None
+    subscribed = _service_category_cache.get(service_id)
+    if subscribed is None:
+        generation = _service_category_cache.generation
+        result = await session.execute(
+            select(models.ServiceCategory.category_id).where(
+                models.ServiceCategory.service_id == service_id
+            )
+        )
+        subscribed = frozenset(str(category_id) for category_id in result.scalars())
+        _service_category_cache.put(service_id, subscribed, generation)
+    active = frozenset(
+        category.type
+        for category in enabled
+        if not subscribed or category.category_id in subscribed
+    )
+    return active or None
 
 
 async def create_rule(
@@ -264,6 +1224,11 @@ async def create_service(
         description=payload.description,
         contact_email=payload.contact_email,
         is_active=payload.is_active,
+        rate_limit_per_second=payload.rate_limit_per_second,
+        rate_limit_burst=payload.rate_limit_burst,
+        daily_quota=payload.daily_quota,
+        scheduling_weight=payload.scheduling_weight,
+        request_timeout_ms=payload.request_timeout_ms,
     )
     session.add(service)
     await session.commit()
@@ -271,6 +1236,50 @@ async def create_service(
     return map_service_to_api(service)
 
 
+async def update_service_limits(
+    session: AsyncSession, service_id: uuid.UUID, limits: api_models.ServiceLimits
+) -> api_models.WebService:
+    service = await session.get(models.WebService, service_id)
+    if service is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Service not found")
+    # A partial update: limits the caller left out keep their values; ``null`` clears one.
+    for name, value in limits.model_dump(exclude_unset=True).items():
+        setattr(service, name, value)
+    await invalidation.publish(session, invalidation.SERVICES, service_id)
+    await session.commit()
+    await session.refresh(service)
+    return map_service_to_api(service)
+
+
+async def update_service_webhook(
+    session: AsyncSession, service_id: uuid.UUID, config: api_models.WebhookConfig
+) -> api_models.WebService:
+    service = await session.get(models.WebService, service_id)
+    if service is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Service not found")
+    service.webhook_url = config.url
+    service.webhook_secret = config.secret if config.url else None
+    await invalidation.publish(session, invalidation.SERVICES, service_id)
+    await session.commit()
+    await session.refresh(service)
+    return map_service_to_api(service)
+
+
+async def get_service_usage(
+    session: AsyncSession, service_id: uuid.UUID
+) -> api_models.ServiceUsage:
+    service = await session.get(models.WebService, service_id)
+    if service is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Service not found")
+    return await ratelimit.get_service_usage(session, service)
+
+
+async def list_service_usage(session: AsyncSession) -> list[api_models.ServiceUsage]:
+    result = await session.execute(select(models.WebService))
+    services = result.scalars().all()
+    return [await ratelimit.get_service_usage(session, service) for service in services]
+
+
 async def issue_api_key(
     session: AsyncSession, service_id: uuid.UUID, expires_at: Optional[datetime] = None
 ) -> api_models.APIKeyIssueResponse:
@@ -307,6 +1316,7 @@ async def set_api_key_status(
     if api_key is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Key not found")
     api_key.is_active = is_active
+    await invalidation.publish(session, invalidation.API_KEYS, key_id)
     await session.commit()
     await session.refresh(api_key)
     return map_api_key_to_api(api_key)
@@ -360,6 +1370,93 @@ async def create_admin_session(
     return api_models.AdminToken(token=session_obj.token, expires_at=session_obj.expires_at)
 
 
+async def save_shadow_results(session: AsyncSession, rows: Sequence[dict]) -> None:
+    await session.execute(insert(models.ShadowResult), list(rows))
+    await session.commit()
+
+
+def _latency_percentiles(values: list) -> api_models.LatencyPercentiles:
+    values = sorted(values)
+    if not values:
+        return api_models.LatencyPercentiles()
+
+    def pick(share: float) -> float:
+        return values[min(len(values) - 1, int(len(values) * share))]
+
+    return api_models.LatencyPercentiles(p50_ms=pick(0.5), p95_ms=pick(0.95), p99_ms=pick(0.99))
+
+
+async def shadow_reports(
+    session: AsyncSession, since: datetime, candidate_version: Optional[str] = None
+) -> list[api_models.ShadowReport]:
+    """Agreement and latency of each candidate model over shadow results since ``since``."""
+    shadow = models.ShadowResult
+    conditions = [shadow.created_at >= since]
+    if candidate_version is not None:
+        conditions.append(shadow.candidate_version == candidate_version)
+    pairs = await session.execute(
+        select(shadow.candidate_version, shadow.primary_decision, shadow.candidate_decision, func.count())
+        .where(*conditions)
+        .group_by(shadow.candidate_version, shadow.primary_decision, shadow.candidate_decision)
+    )
+    decisions: dict = {}
+    for version, primary, candidate, count in pairs:
+        decisions.setdefault(version, []).append(
+            api_models.DecisionPair(
+                primary_decision=api_models.ModerationDecision(primary),
+                candidate_decision=api_models.ModerationDecision(candidate),
+                count=count,
+            )
+        )
+    latencies: dict = {}
+    rows = await session.execute(
+        select(shadow.candidate_version, shadow.primary_latency_ms, shadow.candidate_latency_ms).where(*conditions)
+    )
+    for version, primary_ms, candidate_ms in rows:
+        primary_values, candidate_values = latencies.setdefault(version, ([], []))
+        primary_values.append(primary_ms)
+        candidate_values.append(candidate_ms)
+
+    reports = []
+    for version in sorted(decisions):
+        version_pairs = sorted(decisions[version], key=lambda pair: -pair.count)
+        samples = sum(pair.count for pair in version_pairs)
+        agreed = sum(pair.count for pair in version_pairs if pair.primary_decision == pair.candidate_decision)
+        primary_values, candidate_values = latencies.get(version, ([], []))
+        reports.append(
+            api_models.ShadowReport(
+                candidate_version=version,
+                samples=samples,
+                agreement=agreed / samples if samples else 0.0,
+                decisions=version_pairs,
+                primary_latency=_latency_percentiles(primary_values),
+                candidate_latency=_latency_percentiles(candidate_values),
+            )
+        )
+    return reports
+
+
+MODEL_DEPLOYMENT = "active"
+
+
+async def get_model_deployment(session: AsyncSession) -> Optional[models.ModelDeployment]:
+    return await session.get(models.ModelDeployment, MODEL_DEPLOYMENT)
+
+
+async def set_model_deployment(session: AsyncSession, version: str) -> int:
+    """Point every worker at ``version``; returns the new deployment revision."""
+    deployment = await session.get(models.ModelDeployment, MODEL_DEPLOYMENT)
+    if deployment is None:
+        deployment = models.ModelDeployment(name=MODEL_DEPLOYMENT, version=version, revision=0)
+        session.add(deployment)
+    deployment.version = version
+    deployment.revision += 1
+    deployment.updated_at = datetime.utcnow()
+    await invalidation.publish(session, invalidation.MODELS, version)
+    await session.commit()
+    return deployment.revision
+
+
 async def ensure_demo_data(
     session: AsyncSession,
     *,
@@ -369,72 +1466,90 @@ async def ensure_demo_data(
     service_name: str,
     service_contact: str,
 ) -> tuple[api_models.AdminUser, api_models.WebService, api_models.APIKeyIssueResponse]:
-    admin_result = await session.execute(
-        select(models.AdminUser).where(models.AdminUser.username == admin_username)
-    )
-    admin = admin_result.scalar_one_or_none()
+    """Create whatever demo objects are missing: three lookups and at most one commit."""
+    admin = (
+        await session.execute(select(models.AdminUser).where(models.AdminUser.username == admin_username))
+    ).scalar_one_or_none()
+    service_row = (
+        await session.execute(
+            select(models.WebService, models.APIKey)
+            .outerjoin(models.APIKey, models.APIKey.service_id == models.WebService.service_id)
+            .where(models.WebService.name == service_name)
+            .limit(1)
+        )
+    ).first()
+    category_row = (
+        await session.execute(
+            select(models.ViolationCategory, models.ModerationRule)
+            .outerjoin(
+                models.ModerationRule,
+                models.ModerationRule.category_id == models.ViolationCategory.category_id,
+            )
+            .where(models.ViolationCategory.type == api_models.CategoryType.TOXICITY.value)
+            .limit(1)
+        )
+    ).first()
+    service, api_key = service_row if service_row is not None else (None, None)
+    category, rule = category_row if category_row is not None else (None, None)
+
+    created = []
     if admin is None:
         admin = models.AdminUser(
+            user_id=models.uuid_pk(),
             username=admin_username,
             email=admin_email,
             password_hash=models.AdminUser.hash_password(admin_password),
             role=api_models.UserRole.SUPER_ADMIN.value,
+            is_active=True,
         )
-        session.add(admin)
-        await session.commit()
-        await session.refresh(admin)
-
-    service_result = await session.execute(
-        select(models.WebService).where(models.WebService.name == service_name)
-    )
-    service = service_result.scalar_one_or_none()
+        created.append(admin)
     if service is None:
         service = models.WebService(
+            service_id=models.uuid_pk(),
             name=service_name,
             contact_email=service_contact,
             description="Demo service for moderation",
+            registration_date=datetime.utcnow(),
+            is_active=True,
+            scheduling_weight=1.0,
         )
-        session.add(service)
-        await session.commit()
-        await session.refresh(service)
-
-    key_result = await session.execute(
-        select(models.APIKey).where(models.APIKey.service_id == service.service_id)
-    )
-    api_key = key_result.scalar_one_or_none()
-    key_response = None
+        created.append(service)
+    plain_key = ""
     if api_key is None:
-        key_response = await issue_api_key(session, service.service_id)
-    else:
-        key_payload = map_api_key_to_api(api_key)
-        key_response = api_models.APIKeyIssueResponse(api_key="", **key_payload.dict())
-
-    category_result = await session.execute(
-        select(models.ViolationCategory).where(models.ViolationCategory.type == api_models.CategoryType.TOXICITY.value)
-    )
-    category = category_result.scalar_one_or_none()
+        plain_key = models.APIKey.generate_plain_key()
+        key_hash, prefix = models.APIKey.hash_key(plain_key)
+        api_key = models.APIKey(
+            key_id=models.uuid_pk(),
+            service_id=service.service_id,
+            key_hash=key_hash,
+            key_prefix=prefix,
+            created_at=datetime.utcnow(),
+            is_active=True,
+        )
+        created.append(api_key)
     if category is None:
         category = models.ViolationCategory(
+            category_id=models.uuid_pk(),
             type=api_models.CategoryType.TOXICITY.value,
             name="Toxic language",
             description="Auto-generated category for toxic language detection",
         )
-        session.add(category)
-        await session.commit()
-        await session.refresh(category)
-
-    rule_result = await session.execute(select(models.ModerationRule).where(models.ModerationRule.category_id == category.category_id))
-    rule = rule_result.scalar_one_or_none()
+        created.append(category)
     if rule is None:
-        rule = models.ModerationRule(
-            category_id=category.category_id,
-            action=api_models.RuleAction.FLAG_FOR_REVIEW.value,
-            priority=10,
-            conditions="contains:toxic",
+        created.append(
+            models.ModerationRule(
+                category_id=category.category_id,
+                action=api_models.RuleAction.FLAG_FOR_REVIEW.value,
+                priority=10,
+                conditions="contains:toxic",
+            )
         )
-        session.add(rule)
+    if created:
+        session.add_all(created)
         await session.commit()
 
+    key_payload = map_api_key_to_api(api_key)
+    key_response = api_models.APIKeyIssueResponse(api_key=plain_key, **key_payload.dict())
     return map_admin_to_api(admin), map_service_to_api(service), key_response
 
 
@@ -450,6 +1565,28 @@ def map_category_to_api(category: models.ViolationCategory) -> api_models.Violat
     )
 
 
+def map_remoderation_job_to_api(job: models.RemoderationJob) -> api_models.RemoderationJob:
+    return api_models.RemoderationJob(
+        job_id=str(job.job_id),
+        status=api_models.RemoderationJobStatus(job.status),
+        service_id=str(job.service_id) if job.service_id else None,
+        since=job.since,
+        until=job.until,
+        rate_per_second=job.rate_per_second,
+        notify_webhooks=job.notify_webhooks,
+        processed=job.processed,
+        changed=job.changed,
+        skipped=job.skipped,
+        cursor_timestamp=job.cursor_timestamp,
+        target_version=job.target_version,
+        model_version=job.model_version,
+        last_error=job.last_error,
+        created_at=job.created_at,
+        updated_at=job.updated_at,
+        finished_at=job.finished_at,
+    )
+
+
 def map_rule_to_api(rule: models.ModerationRule) -> api_models.ModerationRule:
     conditions = rule.conditions.split(";") if rule.conditions else []
     return api_models.ModerationRule(
@@ -493,6 +1630,12 @@ def map_service_to_api(service: models.WebService) -> api_models.WebService:
         contact_email=service.contact_email,
         registration_date=service.registration_date,
         is_active=service.is_active,
+        rate_limit_per_second=service.rate_limit_per_second,
+        rate_limit_burst=service.rate_limit_burst,
+        daily_quota=service.daily_quota,
+        scheduling_weight=service.scheduling_weight or 1.0,
+        request_timeout_ms=service.request_timeout_ms,
+        webhook_url=service.webhook_url,
     )
 
 
@@ -0,0 +1,149 @@
+"""Request-scoped span trees for the moderation pipeline.
+
+A trace lives in a context variable, so code that runs inside a traced request can
+open spans without passing the trace around. Outside a trace ``stage`` only feeds the
+metrics histograms.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import random
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterator, List, Optional
+
+from app.config import settings
+from app.core import metrics
+from app.core import models as api_models
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class Span:
+    name: str
+    start: float = field(default_factory=time.perf_counter)
+    end: Optional[float] = None
+    attributes: Dict[str, Any] = field(default_factory=dict)
+    children: List["Span"] = field(default_factory=list)
+
+    @property
+    def duration_ms(self) -> float:
+        end = self.end if self.end is not None else time.perf_counter()
+        return (end - self.start) * 1000.0
+
+    def to_api(self, origin: float) -> api_models.StageTiming:
+        return api_models.StageTiming(
+            name=self.name,
+            start_ms=round((self.start - origin) * 1000.0, 3),
+            duration_ms=round(self.duration_ms, 3),
+            attributes=self.attributes or None,
+            children=[child.to_api(origin) for child in self.children] or None,
+        )
+
+
+@dataclass
+class Trace:
+    root: Span = field(default_factory=lambda: Span("request"))
+    request_id: Optional[str] = None
+    service_id: Optional[str] = None
+
+    def timings(self) -> List[api_models.StageTiming]:
+        return [child.to_api(self.root.start) for child in self.root.children]
+
+    def server_timing(self) -> str:
+        entries = [f"{span.name};dur={span.duration_ms:.1f}" for span in self.root.children]
+        entries.append(f"total;dur={self.root.duration_ms:.1f}")
+        return ", ".join(entries)
+
+    def to_log(self) -> Dict[str, Any]:
+        return {
+            "request_id": self.request_id,
+            "service_id": self.service_id,
+            "duration_ms": round(self.root.duration_ms, 3),
+            "spans": [timing.model_dump(exclude_none=True) for timing in self.timings()],
+        }
+
+
+_current_span: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+
+
+def start_trace() -> Trace:
+    trace = Trace()
+    _current_span.set(trace.root)
+    return trace
+
+
+def current_span() -> Optional[Span]:
+    return _current_span.get()
+
+
+def activate_span(span: Span) -> None:
+    """Make ``span`` the parent for spans opened in the current context."""
+    _current_span.set(span)
+
+
+def batch_view(batch: Span, index: int) -> Span:
+    """Copy of a shared batch span keeping only the per-item spans of ``index``."""
+    children = [
+        child
+        for child in batch.children
+        if child.name != "item" or child.attributes.get("index") == index
+    ]
+    return Span(batch.name, batch.start, batch.end, dict(batch.attributes), children)
+
+
+def finish_trace(trace: Trace) -> None:
+    trace.root.end = time.perf_counter()
+    _current_span.set(None)
+    duration_ms = trace.root.duration_ms
+    if (
+        duration_ms >= settings.tracing_slow_request_ms
+        and random.random() < settings.tracing_slow_sample_rate
+    ):
+        logger.warning(json.dumps({"event": "slow_request", **trace.to_log()}))
+    elif settings.tracing_log_requests:
+        logger.info(json.dumps({"event": "request_trace", **trace.to_log()}))
+
+
+@contextmanager
+def span(name: str, **attributes: Any) -> Iterator[Optional[Span]]:
+    parent = _current_span.get()
+    if parent is None:
+        yield None
+        return
+    child = Span(name, attributes=attributes)
+    parent.children.append(child)
+    token = _current_span.set(child)
+    try:
+        yield child
+    finally:
+        child.end = time.perf_counter()
+        _current_span.reset(token)
+
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    """Time a pipeline stage for both ``/metrics`` and the active trace."""
+    started = time.perf_counter()
+    with span(name):
+        try:
+            yield
+        finally:
+            metrics.STAGE_SECONDS.observe(time.perf_counter() - started, stage=name)
+
+
+@contextmanager
+def model_phase(model_id: str, phase: str) -> Iterator[None]:
+    started = time.perf_counter()
+    with span(f"{phase}:{model_id}"):
+        try:
+            yield
+        finally:
+            metrics.MODEL_SECONDS.observe(
+                time.perf_counter() - started, model=model_id, phase=phase
+            )
@@ -2,15 +2,20 @@ from __future__ import annotations
 
 import secrets
 import uuid
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
+from functools import lru_cache
 from typing import List, Optional
 
-from passlib.context import CryptContext
-from sqlalchemy import Boolean, DateTime, Float, ForeignKey, String, Text, Uuid
+from sqlalchemy import BigInteger, Boolean, Date, DateTime, Float, ForeignKey, Index, Integer, String, Text, Uuid
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, relationship
 
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+@lru_cache(maxsize=1)
+def pwd_context():
+    # Imported on first use: passlib and its bcrypt backend add ~20 ms to every start.
+    from passlib.context import CryptContext
+
+    return CryptContext(schemes=["bcrypt"], deprecated="auto")
 
 
 class Base(DeclarativeBase):
@@ -30,6 +35,13 @@ class WebService(Base):
     contact_email: Mapped[str] = mapped_column(String(255))
     registration_date: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
     is_active: Mapped[bool] = mapped_column(Boolean, default=True)
+    rate_limit_per_second: Mapped[Optional[float]] = mapped_column(Float, nullable=True)
+    rate_limit_burst: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
+    daily_quota: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
+    scheduling_weight: Mapped[float] = mapped_column(Float, default=1.0)
+    request_timeout_ms: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
+    webhook_url: Mapped[Optional[str]] = mapped_column(String(2048), nullable=True)
+    webhook_secret: Mapped[Optional[str]] = mapped_column(String(255), nullable=True)
 
     api_keys: Mapped[List["APIKey"]] = relationship(
         "APIKey", back_populates="service", cascade="all, delete-orphan"
@@ -59,11 +71,11 @@ class APIKey(Base):
 
     @staticmethod
     def hash_key(plain_key: str) -> tuple[str, str]:
-        key_hash = pwd_context.hash(plain_key)
+        key_hash = pwd_context().hash(plain_key)
         return key_hash, plain_key[:8]
 
     def verify(self, plain_key: str) -> bool:
-        return pwd_context.verify(plain_key, self.key_hash)
+        return pwd_context().verify(plain_key, self.key_hash)
 
 
 class AdminUser(Base):
@@ -83,10 +95,10 @@ class AdminUser(Base):
 
     @staticmethod
     def hash_password(password: str) -> str:
-        return pwd_context.hash(password)
+        return pwd_context().hash(password)
 
     def verify_password(self, password: str) -> bool:
-        return pwd_context.verify(password, self.password_hash)
+        return pwd_context().verify(password, self.password_hash)
 
 
 class AdminSession(Base):
@@ -121,6 +133,19 @@ class ViolationCategory(Base):
     )
 
 
+class ServiceCategory(Base):
+    """A category a service subscribed to; a service without rows gets every enabled one."""
+
+    __tablename__ = "servicecategory"
+
+    service_id: Mapped[uuid.UUID] = mapped_column(
+        Uuid, ForeignKey("webservice.service_id"), primary_key=True
+    )
+    category_id: Mapped[uuid.UUID] = mapped_column(
+        Uuid, ForeignKey("violationcategory.category_id"), primary_key=True
+    )
+
+
 class ModerationRule(Base):
     __tablename__ = "moderationrule"
 
@@ -160,5 +185,180 @@ class ModerationResult(Base):
     processed_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
     model_version: Mapped[str] = mapped_column(String(64))
     label_scores: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    review_claimed_by: Mapped[Optional[uuid.UUID]] = mapped_column(
+        Uuid, ForeignKey("adminuser.user_id"), nullable=True
+    )
+    review_claim_expires_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
+    # Decided without the model in degraded mode; cleared by the re-score or a moderator.
+    rescore_pending: Mapped[bool] = mapped_column(Boolean, default=False)
+    # Set when a moderator decided; re-moderation jobs leave such results alone.
+    moderated_by: Mapped[Optional[uuid.UUID]] = mapped_column(
+        Uuid, ForeignKey("adminuser.user_id"), nullable=True
+    )
 
     request: Mapped[ModerationRequest] = relationship("ModerationRequest", back_populates="result")
+
+
+# The review queue: only HUMAN_REVIEW results, in the order moderators take them.
+Index(
+    "ix_moderationresult_review_queue",
+    ModerationResult.confidence_score.desc(),
+    ModerationResult.processed_at,
+    postgresql_where=ModerationResult.decision == "HUMAN_REVIEW",
+    sqlite_where=ModerationResult.decision == "HUMAN_REVIEW",
+)
+Index(
+    "ix_moderationresult_rescore",
+    ModerationResult.processed_at,
+    postgresql_where=ModerationResult.rescore_pending.is_(True),
+    sqlite_where=ModerationResult.rescore_pending.is_(True),
+)
+
+
+class RateLimitBucket(Base):
+    __tablename__ = "ratelimitbucket"
+
+    service_id: Mapped[uuid.UUID] = mapped_column(
+        Uuid, ForeignKey("webservice.service_id"), primary_key=True
+    )
+    tokens: Mapped[float] = mapped_column(Float)
+    updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+
+
+class ServiceDailyUsage(Base):
+    __tablename__ = "servicedailyusage"
+
+    service_id: Mapped[uuid.UUID] = mapped_column(
+        Uuid, ForeignKey("webservice.service_id"), primary_key=True
+    )
+    day: Mapped[date] = mapped_column(Date, primary_key=True)
+    request_count: Mapped[int] = mapped_column(Integer, default=0)
+    throttled_count: Mapped[int] = mapped_column(Integer, default=0)
+
+
+class WebhookEvent(Base):
+    """Outbox row, committed in the same transaction as the decision it announces."""
+
+    __tablename__ = "webhookevent"
+    __table_args__ = (Index("ix_webhookevent_due", "status", "next_attempt_at"),)
+
+    event_id: Mapped[uuid.UUID] = mapped_column(Uuid, primary_key=True, default=uuid_pk)
+    service_id: Mapped[uuid.UUID] = mapped_column(Uuid, ForeignKey("webservice.service_id"), index=True)
+    event_type: Mapped[str] = mapped_column(String(64))
+    payload: Mapped[str] = mapped_column(Text)
+    status: Mapped[str] = mapped_column(String(16), default="PENDING")
+    attempts: Mapped[int] = mapped_column(Integer, default=0)
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+    next_attempt_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+    delivered_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
+    last_error: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+
+
+class ShadowResult(Base):
+    """A candidate model's decision on a sampled live comment, next to the served one."""
+
+    __tablename__ = "shadowresult"
+    __table_args__ = (Index("ix_shadowresult_candidate", "candidate_version", "created_at"),)
+
+    shadow_id: Mapped[uuid.UUID] = mapped_column(Uuid, primary_key=True, default=uuid_pk)
+    request_id: Mapped[uuid.UUID] = mapped_column(Uuid, ForeignKey("moderationrequest.request_id"), index=True)
+    primary_version: Mapped[str] = mapped_column(String(255))
+    candidate_version: Mapped[str] = mapped_column(String(255))
+    primary_decision: Mapped[str] = mapped_column(String(32))
+    candidate_decision: Mapped[str] = mapped_column(String(32))
+    primary_confidence: Mapped[float] = mapped_column(Float)
+    candidate_confidence: Mapped[float] = mapped_column(Float)
+    candidate_scores: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    # Model time per comment: batch duration divided by batch size.
+    primary_latency_ms: Mapped[float] = mapped_column(Float)
+    candidate_latency_ms: Mapped[float] = mapped_column(Float)
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+
+
+class InvalidationEvent(Base):
+    """A change that in-process caches must drop; ``version`` orders events cluster-wide."""
+
+    __tablename__ = "invalidationevent"
+
+    version: Mapped[int] = mapped_column(
+        BigInteger().with_variant(Integer, "sqlite"), primary_key=True, autoincrement=True
+    )
+    topic: Mapped[str] = mapped_column(String(64))
+    key: Mapped[Optional[str]] = mapped_column(String(255), nullable=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, index=True)
+
+
+class ModelDeployment(Base):
+    """The registry model version every worker should serve."""
+
+    __tablename__ = "modeldeployment"
+
+    name: Mapped[str] = mapped_column(String(64), primary_key=True)
+    version: Mapped[str] = mapped_column(String(255))
+    # Grows with every deployment, so workers can ignore reads older than one they applied.
+    revision: Mapped[int] = mapped_column(Integer, default=0)
+    updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+
+
+class RemoderationJob(Base):
+    """A re-score of stored comments and its checkpoint: the last comment it committed."""
+
+    __tablename__ = "remoderationjob"
+
+    job_id: Mapped[uuid.UUID] = mapped_column(Uuid, primary_key=True, default=uuid_pk)
+    status: Mapped[str] = mapped_column(String(16), index=True)
+    service_id: Mapped[Optional[uuid.UUID]] = mapped_column(
+        Uuid, ForeignKey("webservice.service_id"), nullable=True
+    )
+    since: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
+    until: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
+    rate_per_second: Mapped[Optional[float]] = mapped_column(Float, nullable=True)
+    notify_webhooks: Mapped[bool] = mapped_column(Boolean, default=True)
+    # Keyset position over (moderationrequest.timestamp, request_id).
+    cursor_timestamp: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
+    cursor_request_id: Mapped[Optional[uuid.UUID]] = mapped_column(Uuid, nullable=True)
+    processed: Mapped[int] = mapped_column(Integer, default=0)
+    changed: Mapped[int] = mapped_column(Integer, default=0)
+    skipped: Mapped[int] = mapped_column(Integer, default=0)
+    model_version: Mapped[Optional[str]] = mapped_column(String(255), nullable=True)
+    # Registry version the job re-scores with; ``None`` for the ``CLASSIFIER_BACKEND`` models.
+    target_version: Mapped[Optional[str]] = mapped_column(String(64), nullable=True)
+    # Claim token of the runner; a RUNNING job whose ``updated_at`` went stale can be taken over.
+    owner: Mapped[Optional[str]] = mapped_column(String(64), nullable=True)
+    last_error: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    created_by: Mapped[Optional[uuid.UUID]] = mapped_column(
+        Uuid, ForeignKey("adminuser.user_id"), nullable=True
+    )
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+    updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+    finished_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
+
+
+class ModerationResultHistory(Base):
+    """A result as it was before a re-moderation job replaced it."""
+
+    __tablename__ = "moderationresulthistory"
+
+    history_id: Mapped[uuid.UUID] = mapped_column(Uuid, primary_key=True, default=uuid_pk)
+    result_id: Mapped[uuid.UUID] = mapped_column(
+        Uuid, ForeignKey("moderationresult.result_id"), index=True
+    )
+    job_id: Mapped[Optional[uuid.UUID]] = mapped_column(
+        Uuid, ForeignKey("remoderationjob.job_id"), nullable=True, index=True
+    )
+    decision: Mapped[str] = mapped_column(String(32))
+    confidence_score: Mapped[float] = mapped_column(Float)
+    model_version: Mapped[str] = mapped_column(String(64))
+    label_scores: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    processed_at: Mapped[datetime] = mapped_column(DateTime)
+    replaced_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+
+
+class SchemaState(Base):
+    """Fingerprint of the schema last applied, so unchanged starts skip DDL."""
+
+    __tablename__ = "schemastate"
+
+    fingerprint: Mapped[str] = mapped_column(String(64), primary_key=True)
+    full_text_backend: Mapped[Optional[str]] = mapped_column(String(16), nullable=True)
+    applied_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
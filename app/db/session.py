@@ -1,19 +1,29 @@
 from __future__ import annotations
+import hashlib
 import logging
 from contextlib import asynccontextmanager
 from typing import AsyncGenerator
 
+from sqlalchemy import delete, insert, inspect, literal, select
+from sqlalchemy.engine import Connection, Dialect
 from sqlalchemy.exc import OperationalError
+from sqlalchemy.schema import CreateIndex, CreateTable
 from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
 
 from app.config import settings
-from app.db.models import Base
+from app.core import metrics
+from app.db.models import Base, SchemaState
 
 logger = logging.getLogger(__name__)
 
 engine: AsyncEngine | None = None
 SessionLocal: async_sessionmaker[AsyncSession] | None = None
 current_database_url: str = settings.database_url
+# Text search configuration of the PostgreSQL index; queries must use the same expression.
+FULL_TEXT_CONFIG = "'simple'::regconfig"
+full_text_backend: str | None = None
+# Part of the schema fingerprint: bump when DDL outside the metadata changes.
+_EXTRA_DDL_VERSION = "full-text-1"
 
 
 def init_engine(database_url: str | None = None) -> AsyncEngine:
@@ -40,11 +50,123 @@ async def get_session() -> AsyncGenerator[AsyncSession, None]:
         yield session
 
 
+def _add_missing_columns(connection: Connection) -> None:
+    """Bring tables created by an older release up to the current models.
+
+    ``create_all`` never alters existing tables, so columns added later are created
+    here with ``ALTER TABLE ... ADD COLUMN``, together with any indexes they need.
+    """
+    inspector = inspect(connection)
+    dialect = connection.dialect
+    preparer = dialect.identifier_preparer
+    for table in Base.metadata.sorted_tables:
+        existing = {column["name"] for column in inspector.get_columns(table.name)}
+        missing = [column for column in table.columns if column.name not in existing]
+        for column in missing:
+            statement = (
+                f"ALTER TABLE {preparer.format_table(table)} "
+                f"ADD COLUMN {preparer.format_column(column)} {column.type.compile(dialect=dialect)}"
+            )
+            if column.default is not None and column.default.is_scalar:
+                default = literal(column.default.arg, column.type).compile(
+                    dialect=dialect, compile_kwargs={"literal_binds": True}
+                )
+                statement += f" DEFAULT {default}"
+            logger.info("Adding column %s.%s", table.name, column.name)
+            connection.exec_driver_sql(statement)
+        if missing:
+            for index in table.indexes:
+                index.create(connection, checkfirst=True)
+
+
+def _create_full_text_index(connection: Connection) -> str | None:
+    """Index ``moderationrequest.content_text`` for ``store.search_requests``.
+
+    PostgreSQL gets a GIN index over ``to_tsvector``; SQLite an external-content FTS5
+    table kept in sync by triggers. Returns the backend in use, ``None`` without one.
+    """
+    dialect = connection.dialect.name
+    if dialect == "postgresql":
+        connection.exec_driver_sql(
+            f"CREATE INDEX IF NOT EXISTS ix_moderationrequest_content_fts ON moderationrequest "
+            f"USING gin (to_tsvector({FULL_TEXT_CONFIG}, content_text))"
+        )
+        return "postgresql"
+    if dialect != "sqlite":
+        return None
+    exists = connection.exec_driver_sql(
+        "SELECT 1 FROM sqlite_master WHERE name = 'moderationrequest_fts'"
+    ).first()
+    try:
+        connection.exec_driver_sql(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS moderationrequest_fts USING fts5("
+            "content_text, content='moderationrequest', content_rowid='rowid')"
+        )
+    except OperationalError as exc:
+        logger.warning("SQLite without FTS5 (%s): search falls back to LIKE", exc)
+        return None
+    connection.exec_driver_sql(
+        "CREATE TRIGGER IF NOT EXISTS moderationrequest_fts_ai AFTER INSERT ON moderationrequest BEGIN "
+        "INSERT INTO moderationrequest_fts(rowid, content_text) VALUES (new.rowid, new.content_text); END"
+    )
+    connection.exec_driver_sql(
+        "CREATE TRIGGER IF NOT EXISTS moderationrequest_fts_ad AFTER DELETE ON moderationrequest BEGIN "
+        "INSERT INTO moderationrequest_fts(moderationrequest_fts, rowid, content_text) "
+        "VALUES ('delete', old.rowid, old.content_text); END"
+    )
+    connection.exec_driver_sql(
+        "CREATE TRIGGER IF NOT EXISTS moderationrequest_fts_au AFTER UPDATE OF content_text ON moderationrequest BEGIN "
+        "INSERT INTO moderationrequest_fts(moderationrequest_fts, rowid, content_text) "
+        "VALUES ('delete', old.rowid, old.content_text); "
+        "INSERT INTO moderationrequest_fts(rowid, content_text) VALUES (new.rowid, new.content_text); END"
+    )
+    if exists is None:
+        # Comments stored before the index existed.
+        connection.exec_driver_sql(
+            "INSERT INTO moderationrequest_fts(moderationrequest_fts) VALUES ('rebuild')"
+        )
+    return "fts5"
+
+
+def schema_fingerprint(dialect: Dialect) -> str:
+    digest = hashlib.sha256(_EXTRA_DDL_VERSION.encode("utf-8"))
+    for table in Base.metadata.sorted_tables:
+        digest.update(str(CreateTable(table).compile(dialect=dialect)).encode("utf-8"))
+        for index in sorted(table.indexes, key=lambda index: index.name or ""):
+            digest.update(str(CreateIndex(index).compile(dialect=dialect)).encode("utf-8"))
+    return digest.hexdigest()
+
+
+def _create_schema(connection: Connection) -> None:
+    """Apply the schema unless the stored fingerprint says it is already current.
+
+    A current schema costs two queries instead of the per-table inspection done by
+    ``create_all`` and ``_add_missing_columns``.
+    """
+    global full_text_backend
+    fingerprint = schema_fingerprint(connection.dialect)
+    if inspect(connection).has_table(SchemaState.__tablename__):
+        state = connection.execute(
+            select(SchemaState.fingerprint, SchemaState.full_text_backend)
+        ).first()
+        if state is not None and state.fingerprint == fingerprint:
+            full_text_backend = state.full_text_backend
+            return
+    logger.info("Applying database schema %s", fingerprint[:12])
+    Base.metadata.create_all(connection)
+    _add_missing_columns(connection)
+    full_text_backend = _create_full_text_index(connection)
+    connection.execute(delete(SchemaState))
+    connection.execute(
+        insert(SchemaState).values(fingerprint=fingerprint, full_text_backend=full_text_backend)
+    )
+
+
 async def run_migrations() -> None:
     database_engine = init_engine()
     try:
         async with database_engine.begin() as conn:
-            await conn.run_sync(Base.metadata.create_all)
+            await conn.run_sync(_create_schema)
     except OperationalError as exc:
         if not settings.allow_sqlite_fallback:
             logger.error(
@@ -60,4 +182,22 @@ async def run_migrations() -> None:
         )
         fallback_engine = init_engine(settings.sqlite_fallback_url)
         async with fallback_engine.begin() as conn:
-            await conn.run_sync(Base.metadata.create_all)
+            await conn.run_sync(_create_schema)
+
+
+def _pool_samples():
+    if engine is None:
+        return
+    pool = engine.pool
+    for name in ("size", "checkedin", "checkedout", "overflow"):
+        reader = getattr(pool, name, None)
+        if callable(reader):
+            yield (name,), reader()
+
+
+metrics.CallbackMetric(
+    "moderation_db_pool_connections",
+    "Database connection pool state.",
+    ("state",),
+    _pool_samples,
+)
@@ -1,5 +1,29 @@
 """Service layer for moderation logic."""
 
-from .text import evaluate_text
+from .classifiers import get_classifier, register_backend
+from .dedup import get_duplicate_index
+from .degraded import get_degraded_mode
+from .registry import get_model_registry
+from .remoderation import get_remoderation_runner
+from .review import refresh_queue_metrics
+from .scheduler import get_scheduler
+from .shadow import get_shadow_evaluator
+from .text import detectors_for, evaluate_lexical, evaluate_text, evaluate_texts
+from .webhooks import get_webhook_dispatcher
 
-__all__ = ["evaluate_text"]
+__all__ = [
+    "detectors_for",
+    "evaluate_lexical",
+    "evaluate_text",
+    "evaluate_texts",
+    "get_classifier",
+    "get_degraded_mode",
+    "get_duplicate_index",
+    "get_model_registry",
+    "get_remoderation_runner",
+    "get_scheduler",
+    "get_shadow_evaluator",
+    "get_webhook_dispatcher",
+    "refresh_queue_metrics",
+    "register_backend",
+]
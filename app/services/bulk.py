@@ -0,0 +1,204 @@
+"""Streaming NDJSON bulk moderation.
+
+Input is consumed chunk by chunk and split into lines without holding the whole body.
+Each valid line is charged to the service's rate limiter and quota like a single
+request. Over the rate limit the stream waits for the next token, so an upload is paced at
+the service's rate; only lines past the daily quota get an error reply. Every ``BULK_BATCH_SIZE`` admitted lines
+become one executemany insert of requests, one round through the inference scheduler
+(as backfill, so live traffic keeps priority) and one executemany insert of results.
+Memory is bounded by one batch plus one partial line.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+from typing import AsyncIterator, List, Optional, Tuple
+
+from pydantic import ValidationError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.core import metrics, models, ratelimit, store, tracing
+from app.db import models as db_models
+from app.db.session import get_session
+from app.services import text as text_service
+from app.services.dedup import get_duplicate_index
+from app.services.scheduler import get_scheduler
+
+logger = logging.getLogger(__name__)
+
+BULK_ITEMS_TOTAL = metrics.Counter(
+    "moderation_bulk_items_total",
+    "Lines processed by bulk NDJSON moderation.",
+    ("outcome",),
+)
+
+
+class LineTooLong(ValueError):
+    pass
+
+
+def describe_validation_error(exc: ValidationError) -> str:
+    error = exc.errors()[0]
+    location = ".".join(str(part) for part in error.get("loc", ()))
+    return f"{location}: {error['msg']}" if location else error["msg"]
+
+
+async def iter_lines(chunks: AsyncIterator[bytes], max_line_bytes: int) -> AsyncIterator[bytes]:
+    buffer = bytearray()
+    async for chunk in chunks:
+        buffer.extend(chunk)
+        start = 0
+        while True:
+            newline = buffer.find(b"\n", start)
+            if newline < 0:
+                break
+            yield bytes(buffer[start:newline])
+            start = newline + 1
+        del buffer[:start]
+        if len(buffer) > max_line_bytes:
+            raise LineTooLong(f"Line exceeds {max_line_bytes} bytes")
+    if buffer.strip():
+        yield bytes(buffer)
+
+
+async def _admit(
+    limiter, session: AsyncSession, service: db_models.WebService
+) -> ratelimit.RateLimitDecision:
+    """Take a token for one line, waiting ``retry_after`` while the bucket is empty.
+
+    Only an exhausted daily quota is refused: it does not refill before midnight.
+    """
+    while True:
+        decision = await limiter.acquire(session, service)
+        if decision.allowed or (decision.quota_remaining is not None and decision.quota_remaining <= 0):
+            return decision
+        await asyncio.sleep(decision.retry_after)
+
+
+async def _moderate_batch(
+    service: db_models.WebService, batch: List[Tuple[str, models.BulkItemIn]]
+) -> List[models.StreamMessageOut]:
+    async with get_session() as session:
+        with tracing.stage("db_write"):
+            request_ids = await store.save_moderation_requests(
+                session, service, [item.content_text for _, item in batch]
+            )
+
+        service_key = str(service.service_id)
+        index = get_duplicate_index() if settings.near_duplicate_enabled else None
+        results: List[Optional[models.ModerationResult]] = [None] * len(batch)
+        if index is not None:
+            with tracing.stage("near_duplicate"):
+                results = [index.lookup(service_key, item.content_text) for _, item in batch]
+        scheduler = get_scheduler()
+        detectors = text_service.detectors_for(
+            await store.active_category_types(session, service.service_id)
+        )
+        missing = [position for position, result in enumerate(results) if result is None]
+        with tracing.stage("inference"):
+            outcomes = await asyncio.gather(
+                *(
+                    scheduler.submit(
+                        service.service_id,
+                        batch[position][1].content_text,
+                        priority=batch[position][1].priority,
+                        weight=service.scheduling_weight or 1.0,
+                        detectors=detectors,
+                    )
+                    for position in missing
+                ),
+                return_exceptions=True,
+            )
+
+        failed = []
+        for position, outcome in zip(missing, outcomes):
+            if isinstance(outcome, BaseException):
+                logger.error("Bulk inference failed", exc_info=outcome)
+                failed.append(position)
+                continue
+            results[position] = outcome
+            if index is not None:
+                index.add(service_key, str(request_ids[position]), batch[position][1].content_text, outcome)
+
+        done = [position for position, result in enumerate(results) if result is not None]
+        with tracing.stage("db_result_write"):
+            saved = await store.save_moderation_results(
+                session,
+                service,
+                [request_ids[position] for position in done],
+                [results[position] for position in done],
+            )
+            await store.mark_requests_failed(session, [request_ids[position] for position in failed])
+
+    replies: List[Optional[models.StreamMessageOut]] = [None] * len(batch)
+    for position, result in zip(done, saved):
+        metrics.DECISIONS_TOTAL.inc(service_id=service_key, decision=result.decision.value)
+        replies[position] = models.StreamMessageOut(
+            id=batch[position][0], request_id=result.request_id, result=result
+        )
+    for position in failed:
+        replies[position] = models.StreamMessageOut(
+            id=batch[position][0], request_id=str(request_ids[position]), error="Moderation failed"
+        )
+    BULK_ITEMS_TOTAL.inc(len(done), outcome="moderated")
+    BULK_ITEMS_TOTAL.inc(len(failed), outcome="failed")
+    return replies  # type: ignore[return-value]
+
+
+async def moderate_ndjson(
+    service: db_models.WebService,
+    chunks: AsyncIterator[bytes],
+    batch_size: Optional[int] = None,
+) -> AsyncIterator[models.StreamMessageOut]:
+    """Moderate an NDJSON stream of ``BulkItemIn`` lines, yielding one reply per line.
+
+    Lines without an ``id`` are identified by their 1-based line number.
+    """
+    batch_size = batch_size or settings.bulk_batch_size
+    limiter = ratelimit.get_rate_limiter()
+    batch: List[Tuple[str, models.BulkItemIn]] = []
+    line_number = 0
+    try:
+        async with get_session() as session:
+            async for line in iter_lines(chunks, settings.bulk_max_line_bytes):
+                line_number += 1
+                if not line.strip():
+                    continue
+                try:
+                    item = models.BulkItemIn.model_validate_json(line)
+                except ValidationError as exc:
+                    BULK_ITEMS_TOTAL.inc(outcome="invalid")
+                    yield models.StreamMessageOut(
+                        id=_line_id(line, line_number), error=describe_validation_error(exc)
+                    )
+                    continue
+                item_id = item.id or str(line_number)
+                with tracing.stage("rate_limit"):
+                    decision = await _admit(limiter, session, service)
+                if not decision.allowed:
+                    BULK_ITEMS_TOTAL.inc(outcome="quota_exceeded")
+                    yield models.StreamMessageOut(
+                        id=item_id, error=decision.reason, retry_after=decision.retry_after
+                    )
+                    continue
+                batch.append((item_id, item))
+                if len(batch) >= batch_size:
+                    for reply in await _moderate_batch(service, batch):
+                        yield reply
+                    batch = []
+    except LineTooLong as exc:
+        yield models.StreamMessageOut(id=str(line_number + 1), error=str(exc))
+    if batch:
+        for reply in await _moderate_batch(service, batch):
+            yield reply
+
+
+def _line_id(line: bytes, line_number: int) -> str:
+    try:
+        value = json.loads(line).get("id")
+    except (ValueError, AttributeError):
+        value = None
+    return str(value) if value is not None else str(line_number)
@@ -0,0 +1,185 @@
+"""Two-tier cascade: the linear model decides confident comments, BERT the rest.
+
+Every comment is scored by the hashed n-gram model first. Scores inside
+``[CASCADE_LOWER_THRESHOLD, CASCADE_UPPER_THRESHOLD)`` are escalated to the
+transformers backend; everything else keeps the cheap decision. ``calibrate_band``
+picks the band offline from labelled history for a target agreement with the full model.
+
+The fast tier has no sentiment model, so the negative-sentiment rule of ``_decide``
+never fires for comments it decides. The default band therefore only lets confident
+rejections skip BERT; widen it with ``calibrate-cascade``, which measures agreement
+against full-model decisions including that rule.
+"""
+
+from __future__ import annotations
+
+import json
+import threading
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from app.config import settings
+from app.core import metrics, models, tracing
+from app.services import text as text_service
+from app.services.classifiers import LinearClassifier, TextClassifier, evaluate_with, get_classifier
+
+CASCADE_TOTAL = metrics.Counter(
+    "moderation_cascade_total",
+    "Comments decided by the fast tier or escalated to the full model.",
+    ("outcome",),
+)
+_outcome_totals = {"fast": 0, "escalated": 0}
+_outcome_lock = threading.Lock()
+
+
+def _count(outcome: str, amount: int) -> None:
+    CASCADE_TOTAL.inc(amount, outcome=outcome)
+    with _outcome_lock:
+        _outcome_totals[outcome] += amount
+
+
+class CascadeClassifier:
+    def __init__(
+        self,
+        fast: Optional[LinearClassifier] = None,
+        full: Optional[TextClassifier] = None,
+        lower: Optional[float] = None,
+        upper: Optional[float] = None,
+    ) -> None:
+        self.fast: LinearClassifier = fast or get_classifier("linear")  # type: ignore[assignment]
+        self.full = full or get_classifier("transformers")
+        self.lower = settings.cascade_lower_threshold if lower is None else lower
+        self.upper = settings.cascade_upper_threshold if upper is None else upper
+        self.model_version = f"cascade:{self.fast.model_version}>{self.full.model_version}"
+
+    def evaluate(
+        self, texts: List[str], detectors: text_service.BatchDetectors = None
+    ) -> List[models.ModerationResult]:
+        results: List[Optional[models.ModerationResult]] = [None] * len(texts)
+        scored = text_service.items_needing(detectors, text_service.TOXICITY_DETECTOR, len(texts))
+        fast_scores = dict(zip(scored, self.fast.score([texts[index] for index in scored])))
+        escalated: List[int] = []
+        for index, text in enumerate(texts):
+            score = fast_scores.get(index)
+            if score is not None and self.lower <= score < self.upper:
+                escalated.append(index)
+                continue
+            with tracing.span("item", index=index):
+                results[index] = text_service._build_result(
+                    text,
+                    {} if score is None else {"toxic": score},
+                    None,
+                    model_version=self.fast.model_version,
+                    detectors=detectors[index] if detectors is not None else None,
+                )
+        _count("fast", len(texts) - len(escalated))
+
+        if escalated:
+            _count("escalated", len(escalated))
+            with tracing.span("escalation", size=len(escalated)):
+                full_results = evaluate_with(
+                    self.full,
+                    [texts[index] for index in escalated],
+                    [detectors[index] for index in escalated] if detectors is not None else None,
+                )
+            for index, result in zip(escalated, full_results):
+                result.label_scores["cascade_fast_score"] = fast_scores[index]
+                results[index] = result
+        return results  # type: ignore[return-value]
+
+
+def _cascade_escalation_ratio():
+    with _outcome_lock:
+        escalated = _outcome_totals["escalated"]
+        total = escalated + _outcome_totals["fast"]
+    yield (), (escalated / total) if total else 0.0
+
+
+metrics.CallbackMetric(
+    "moderation_cascade_escalation_ratio",
+    "Share of comments escalated to the full model since start.",
+    (),
+    _cascade_escalation_ratio,
+)
+
+
+@dataclass
+class CascadeCalibration:
+    lower: float
+    upper: float
+    escalation_rate: float
+    agreement: float
+
+
+def reference_decision(record: dict) -> str:
+    """Full-model decision of a history record, recomputed from its stored scores."""
+    scores: Dict[str, float] = dict(record.get("label_scores") or {})
+    if any(label in scores for label in text_service.TOXIC_LABELS):
+        keyword = scores.get("keyword_heuristic", text_service._keyword_score(record["content_text"]))
+        decision, _ = text_service._decide(scores, keyword, scores.get("sentiment_negative", 0.0))
+        return decision.value
+    return record["decision"]
+
+
+def fast_agreement(records: Sequence[dict], fast_scores: Sequence[float]) -> np.ndarray:
+    agrees = np.empty(len(records), dtype=bool)
+    for index, (record, score) in enumerate(zip(records, fast_scores)):
+        text = record["content_text"]
+        decision, _ = text_service._decide(
+            {"toxic": float(score)}, text_service._keyword_score(text), 0.0
+        )
+        agrees[index] = decision.value == reference_decision(record)
+    return agrees
+
+
+def calibrate_band(
+    fast_scores: np.ndarray, agrees: np.ndarray, target_agreement: float, grid: int = 100
+) -> Optional[CascadeCalibration]:
+    """Narrowest escalation band whose overall agreement reaches ``target_agreement``.
+
+    Escalated comments count as agreeing (the full model decides them). Scores are
+    sorted once, so each candidate band costs O(1) through cumulative sums.
+    """
+    order = np.argsort(fast_scores, kind="stable")
+    scores = fast_scores[order]
+    disagree = np.concatenate([[0], np.cumsum(~agrees[order])])
+    total = len(scores)
+    if not total:
+        return None
+    candidates = np.unique(np.concatenate([[0.0], np.quantile(scores, np.linspace(0, 1, grid + 1)), [1.0 + 1e-9]]))
+    positions = np.searchsorted(scores, candidates, side="left")
+    total_disagree = disagree[-1]
+
+    best: Optional[CascadeCalibration] = None
+    for low_index, low_position in enumerate(positions):
+        high_positions = positions[low_index:]
+        escalated = high_positions - low_position
+        disagree_in_band = disagree[high_positions] - disagree[low_position]
+        agreement = 1.0 - (total_disagree - disagree_in_band) / total
+        feasible = np.nonzero(agreement >= target_agreement)[0]
+        if not feasible.size:
+            continue
+        choice = feasible[np.argmin(escalated[feasible])]
+        rate = escalated[choice] / total
+        if best is None or rate < best.escalation_rate:
+            best = CascadeCalibration(
+                lower=float(candidates[low_index]),
+                upper=float(min(candidates[low_index + choice], 1.0 + 1e-9)),
+                escalation_rate=float(rate),
+                agreement=float(agreement[choice]),
+            )
+    return best
+
+
+def describe(calibration: CascadeCalibration) -> str:
+    return json.dumps(
+        {
+            "CASCADE_LOWER_THRESHOLD": round(calibration.lower, 6),
+            "CASCADE_UPPER_THRESHOLD": round(calibration.upper, 6),
+            "escalation_rate": round(calibration.escalation_rate, 4),
+            "agreement": round(calibration.agreement, 4),
+        },
+        indent=2,
+    )
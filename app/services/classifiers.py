@@ -0,0 +1,150 @@
+"""Registry of text classification backends.
+
+``CLASSIFIER_BACKEND`` selects the backend used by the inference scheduler:
+
+* ``transformers`` – toxic-bert plus SST-2 sentiment (``app.services.text``);
+* ``linear`` – lexicon plus a hashed n-gram logistic regression (``app.services.linear``),
+  deterministic, offline and orders of magnitude cheaper;
+* ``cascade`` – ``linear`` first, ``transformers`` only for uncertain scores
+  (``app.services.cascade``).
+
+Extra backends (e.g. test doubles) can be added with ``register_backend``.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+from functools import lru_cache
+from typing import Callable, Dict, List, Optional, Protocol
+
+from app.config import settings
+from app.core import models, tracing
+from app.services import text as text_service
+
+logger = logging.getLogger(__name__)
+
+
+class TextClassifier(Protocol):
+    model_version: str
+
+    def evaluate(
+        self, texts: List[str], detectors: text_service.BatchDetectors = None
+    ) -> List[models.ModerationResult]:
+        ...
+
+
+def evaluate_with(
+    classifier: TextClassifier, texts: List[str], detectors: text_service.BatchDetectors = None
+) -> List[models.ModerationResult]:
+    """``classifier.evaluate``, passing ``detectors`` only when a comment skips one.
+
+    Backends registered without a ``detectors`` parameter keep serving services that
+    need every detector.
+    """
+    if detectors is None or all(wanted is None for wanted in detectors):
+        return classifier.evaluate(texts)
+    return classifier.evaluate(texts, detectors)
+
+
+class TransformersClassifier:
+    def __init__(self, model_dir: Optional[str] = None, model_version: Optional[str] = None) -> None:
+        """Hub models loaded on first use, or ``toxicity/`` and ``sentiment/`` of ``model_dir`` now."""
+        self.model_version = model_version or text_service.TOXICITY_MODEL_ID
+        self._toxicity = self._sentiment = None
+        if model_dir is not None:
+            self._toxicity = text_service.load_toxicity_pipeline(
+                os.path.join(model_dir, "toxicity"), f"{self.model_version}/toxicity"
+            )
+            self._sentiment = text_service.load_sentiment_pipeline(
+                os.path.join(model_dir, "sentiment"), f"{self.model_version}/sentiment"
+            )
+
+    def evaluate(
+        self, texts: List[str], detectors: text_service.BatchDetectors = None
+    ) -> List[models.ModerationResult]:
+        return text_service.evaluate_texts(
+            texts, self._toxicity, self._sentiment, self.model_version, detectors
+        )
+
+
+class LinearClassifier:
+    def __init__(self, model_path: Optional[str] = None) -> None:
+        from app.services.linear import HashedNgramModel
+
+        if model_path:
+            self.model = HashedNgramModel.load(model_path)
+        else:
+            logger.warning("LINEAR_MODEL_PATH is not set, using the untrained lexicon-only model")
+            self.model = HashedNgramModel.untrained()
+        self.model_version = self.model.version
+
+    def score(self, texts: List[str]) -> List[float]:
+        with tracing.model_phase(self.model_version, "forward"):
+            return self.model.predict_proba(texts).tolist()
+
+    def evaluate(
+        self, texts: List[str], detectors: text_service.BatchDetectors = None
+    ) -> List[models.ModerationResult]:
+        # The n-gram model stands in for the toxicity detector; there is no sentiment.
+        scores: List[Dict[str, float]] = [{} for _ in texts]
+        needing = text_service.items_needing(detectors, text_service.TOXICITY_DETECTOR, len(texts))
+        if needing:
+            for index, probability in zip(needing, self.score([texts[index] for index in needing])):
+                scores[index] = {"toxic": probability}
+        results = []
+        for index, text in enumerate(texts):
+            with tracing.span("item", index=index):
+                results.append(
+                    text_service._build_result(
+                        text,
+                        scores[index],
+                        None,
+                        model_version=self.model_version,
+                        detectors=detectors[index] if detectors is not None else None,
+                    )
+                )
+        return results
+
+
+def _cascade_classifier() -> TextClassifier:
+    from app.services.cascade import CascadeClassifier
+
+    return CascadeClassifier()
+
+
+_backends: Dict[str, Callable[[], TextClassifier]] = {
+    "transformers": TransformersClassifier,
+    "linear": lambda: LinearClassifier(settings.linear_model_path),
+    "cascade": _cascade_classifier,
+}
+
+
+def register_backend(name: str, factory: Callable[[], TextClassifier]) -> None:
+    _backends[name] = factory
+    _load_classifier.cache_clear()
+
+
+def available_backends() -> List[str]:
+    return sorted(_backends)
+
+
+@lru_cache(maxsize=None)
+def _load_classifier(name: str) -> TextClassifier:
+    factory = _backends.get(name)
+    if factory is None:
+        raise RuntimeError(
+            f"Unknown classifier backend {name!r}; available: {', '.join(available_backends())}"
+        )
+    return factory()
+
+
+def get_classifier(name: Optional[str] = None) -> TextClassifier:
+    return _load_classifier(name or settings.classifier_backend)
+
+
+def release_classifiers() -> None:
+    """Drop the cached backends and default hub pipelines; they load again on next use."""
+    _load_classifier.cache_clear()
+    text_service._get_toxicity_classifier.cache_clear()
+    text_service._get_sentiment_classifier.cache_clear()
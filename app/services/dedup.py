@@ -0,0 +1,197 @@
+"""Near-duplicate index: reuse recent decisions for lightly edited copies of a comment.
+
+Comments are normalised (case, punctuation and emoji dropped), split into character
+shingles and summarised by a MinHash signature. Signatures are split into LSH bands, so a
+lookup only compares against comments of the same service that share at least one band.
+A candidate whose estimated Jaccard similarity reaches ``NEAR_DUPLICATE_THRESHOLD``
+donates its decision. Entries expire after ``NEAR_DUPLICATE_TTL_SECONDS`` and the index
+never holds more than ``NEAR_DUPLICATE_MAX_ENTRIES`` signatures. Comments that
+normalise to fewer than ``SHINGLE_SIZE`` characters (emoji or punctuation only, "ok")
+carry too little text to compare and always go through inference.
+"""
+
+from __future__ import annotations
+
+import re
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime
+from functools import lru_cache
+from typing import Dict, List, Optional, Set, Tuple
+
+import numpy as np
+
+from app.config import settings
+from app.core import invalidation, metrics, models
+
+NUM_PERMUTATIONS = 64
+NUM_BANDS = 16
+SHINGLE_SIZE = 5
+# Long comments are summarised by their head; spam variations live there anyway.
+MAX_SHINGLED_CHARS = 4000
+
+_ROWS_PER_BAND = NUM_PERMUTATIONS // NUM_BANDS
+_NOISE_RE = re.compile(r"[\W_]+", re.UNICODE)
+_random = np.random.default_rng(0x5EED)
+_MULTIPLIERS = _random.integers(1, 2**32, NUM_PERMUTATIONS, dtype=np.uint64) | np.uint64(1)
+_OFFSETS = _random.integers(0, 2**32, NUM_PERMUTATIONS, dtype=np.uint64)
+_MASK = np.uint64(0xFFFFFFFF)
+
+
+def normalize(text: str) -> str:
+    return _NOISE_RE.sub(" ", text[:MAX_SHINGLED_CHARS].lower()).strip()
+
+
+def signature(text: str) -> Optional[np.ndarray]:
+    normalized = normalize(text)
+    if len(normalized) < SHINGLE_SIZE:
+        return None
+    shingles = [
+        normalized[index:index + SHINGLE_SIZE]
+        for index in range(len(normalized) - SHINGLE_SIZE + 1)
+    ]
+    hashes = np.fromiter(
+        {zlib.crc32(shingle.encode("utf-8")) for shingle in shingles}, dtype=np.uint64
+    )
+    permuted = (hashes[:, None] * _MULTIPLIERS + _OFFSETS) & _MASK
+    return permuted.min(axis=0).astype(np.uint32)
+
+
+def _band_keys(service_id: str, sig: np.ndarray) -> List[Tuple[str, int, bytes]]:
+    return [
+        (service_id, band, sig[band * _ROWS_PER_BAND:(band + 1) * _ROWS_PER_BAND].tobytes())
+        for band in range(NUM_BANDS)
+    ]
+
+
+@dataclass
+class _Entry:
+    service_id: str
+    signature: np.ndarray
+    keys: List[Tuple[str, int, bytes]]
+    result: models.ModerationResult
+    expires_at: float
+
+
+class NearDuplicateIndex:
+    def __init__(self, threshold: float, ttl_seconds: float, max_entries: int) -> None:
+        self.threshold = threshold
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        # Insertion order is expiry order because every entry gets the same TTL.
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._buckets: Dict[Tuple[str, int, bytes], Set[str]] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def lookup(self, service_id: str, text: str) -> Optional[models.ModerationResult]:
+        """Decision of the most similar recent comment, or ``None`` on a miss."""
+        sig = signature(text)
+        if sig is None:
+            return None
+        with self._lock:
+            self._evict(time.monotonic())
+            candidates: Set[str] = set()
+            for key in _band_keys(service_id, sig):
+                candidates.update(self._buckets.get(key, ()))
+            best: Optional[_Entry] = None
+            best_similarity = 0.0
+            for request_id in candidates:
+                entry = self._entries[request_id]
+                similarity = float(np.count_nonzero(entry.signature == sig)) / NUM_PERMUTATIONS
+                if similarity > best_similarity:
+                    best, best_similarity = entry, similarity
+            if best is None or best_similarity < self.threshold:
+                self.misses += 1
+                return None
+            self.hits += 1
+            source = best.result
+        label_scores = dict(source.label_scores or {})
+        label_scores["near_duplicate_similarity"] = best_similarity
+        return source.model_copy(
+            update={"processed_at": datetime.utcnow(), "label_scores": label_scores}
+        )
+
+    def add(self, service_id: str, request_id: str, text: str, result: models.ModerationResult) -> None:
+        sig = signature(text)
+        if sig is None:
+            return
+        keys = _band_keys(service_id, sig)
+        with self._lock:
+            now = time.monotonic()
+            self._entries[request_id] = _Entry(
+                service_id, sig, keys, result, now + self.ttl_seconds
+            )
+            for key in keys:
+                self._buckets.setdefault(key, set()).add(request_id)
+            self._evict(now)
+
+    def apply_override(self, request_id: str, decision: str, confidence_score: float) -> None:
+        """Keep a moderator's correction so later copies inherit it."""
+        with self._lock:
+            entry = self._entries.get(request_id)
+            if entry is not None:
+                entry.result = entry.result.model_copy(
+                    update={
+                        "decision": models.ModerationDecision(decision),
+                        "confidence_score": confidence_score,
+                    }
+                )
+
+    def _apply_override_event(self, key: Optional[str]) -> None:
+        if key is None:
+            self.clear()
+            return
+        request_id, decision, confidence_score = key.split(" ")
+        self.apply_override(request_id, decision, float(confidence_score))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._buckets.clear()
+
+    def _evict(self, now: float) -> None:
+        while self._entries:
+            request_id, entry = next(iter(self._entries.items()))
+            if len(self._entries) <= self.max_entries and entry.expires_at > now:
+                break
+            del self._entries[request_id]
+            for key in entry.keys:
+                bucket = self._buckets.get(key)
+                if bucket is not None:
+                    bucket.discard(request_id)
+                    if not bucket:
+                        del self._buckets[key]
+
+
+@lru_cache(maxsize=1)
+def get_duplicate_index() -> NearDuplicateIndex:
+    index = NearDuplicateIndex(
+        threshold=settings.near_duplicate_threshold,
+        ttl_seconds=settings.near_duplicate_ttl_seconds,
+        max_entries=settings.near_duplicate_max_entries,
+    )
+    # Decisions made under other categories or by another model must not be reused.
+    invalidation.subscribe(invalidation.CATEGORIES, index.clear)
+    invalidation.subscribe(invalidation.MODELS, index.clear)
+    # The comment may have been decided on any worker.
+    invalidation.subscribe_keys(invalidation.RESULTS, index._apply_override_event)
+    return index
+
+
+metrics.register_cache(
+    "near_duplicate", lambda: (get_duplicate_index().hits, get_duplicate_index().misses)
+)
+metrics.CallbackMetric(
+    "moderation_near_duplicate_entries",
+    "Comment signatures held by the near-duplicate index.",
+    (),
+    lambda: [((), float(len(get_duplicate_index())))],
+)
@@ -0,0 +1,151 @@
+"""Degraded mode: lexical-only decisions while inference is saturated or failing.
+
+The mode is entered when the inference queue reaches ``DEGRADED_ENTER_QUEUE_DEPTH``,
+the smoothed enqueue-to-result latency reaches ``DEGRADED_ENTER_LATENCY_MS``, or a
+batch fails (e.g. a model that does not load). While it is on, ``/moderation/text``
+decides with ``text.evaluate_lexical`` instead of queueing; those results carry
+``LEXICAL_MODEL_VERSION`` and ``rescore_pending``. The mode stays on for at least
+``DEGRADED_MIN_SECONDS`` and is left only once depth and latency are back under the
+lower ``DEGRADED_EXIT_*`` thresholds, so it does not flap around a single limit.
+Outside the mode a background task re-scores pending results with the full model at
+backfill priority, which also serves as the probe that the backend has recovered.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from functools import lru_cache
+from typing import Optional
+
+from app.config import settings
+from app.core import metrics, models, store
+from app.db.session import get_session
+from app.services import text as text_service
+from app.services.scheduler import get_scheduler
+
+logger = logging.getLogger(__name__)
+
+DEGRADED_MODE = metrics.Gauge(
+    "moderation_degraded_mode", "1 while requests are decided without the model."
+)
+DEGRADED_TRANSITIONS_TOTAL = metrics.Counter(
+    "moderation_degraded_transitions_total",
+    "Degraded mode entries by trigger, and exits.",
+    ("transition",),
+)
+DEGRADED_DECISIONS_TOTAL = metrics.Counter(
+    "moderation_degraded_decisions_total",
+    "Requests decided by the lexical fallback.",
+)
+RESCORED_TOTAL = metrics.Counter(
+    "moderation_rescored_total",
+    "Degraded-mode results re-scored by the model, by whether the decision changed.",
+    ("outcome",),
+)
+
+
+class DegradedMode:
+    def __init__(self) -> None:
+        self.active = False
+        self.entered_at = 0.0
+        self._task: Optional[asyncio.Task] = None
+
+    def check(self) -> bool:
+        """Update the mode from the scheduler's load signals; ``True`` while degraded."""
+        if not settings.degraded_mode_enabled:
+            return False
+        scheduler = get_scheduler()
+        now = time.perf_counter()
+        window = settings.degraded_min_seconds
+        latency_ms = None
+        if scheduler.latency_ewma is not None and now - scheduler.latency_observed_at <= window:
+            latency_ms = scheduler.latency_ewma * 1000.0
+        failing = scheduler.last_failure_at is not None and now - scheduler.last_failure_at <= window
+        depth = scheduler.queue_depth
+
+        if not self.active:
+            if failing:
+                self._enter(now, "inference_error")
+            elif depth >= settings.degraded_enter_queue_depth:
+                self._enter(now, "queue_depth")
+            elif latency_ms is not None and latency_ms >= settings.degraded_enter_latency_ms:
+                self._enter(now, "latency")
+        elif (
+            now - self.entered_at >= window
+            and not failing
+            and depth <= settings.degraded_exit_queue_depth
+            and (latency_ms is None or latency_ms <= settings.degraded_exit_latency_ms)
+        ):
+            self.active = False
+            DEGRADED_MODE.set(0)
+            DEGRADED_TRANSITIONS_TOTAL.inc(transition="exit")
+            logger.warning("Leaving degraded mode after %.1fs", now - self.entered_at)
+        return self.active
+
+    def decide(self, text: str) -> models.ModerationResult:
+        DEGRADED_DECISIONS_TOTAL.inc()
+        return text_service.evaluate_lexical(text)
+
+    def _enter(self, now: float, reason: str) -> None:
+        self.active = True
+        self.entered_at = now
+        DEGRADED_MODE.set(1)
+        DEGRADED_TRANSITIONS_TOTAL.inc(transition=reason)
+        logger.warning("Entering degraded mode: %s", reason)
+
+    def start(self) -> None:
+        if not settings.degraded_mode_enabled or self._task is not None:
+            return
+        self._task = asyncio.create_task(self._run(), name="degraded-rescore")
+
+    async def stop(self) -> None:
+        task, self._task = self._task, None
+        if task is not None:
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                rescored = 0 if self.check() else await self.rescore_once()
+            except Exception:  # noqa: BLE001 - retry on the next tick
+                logger.exception("Degraded-mode re-score failed")
+                rescored = 0
+            # A full batch means more are pending: continue without sleeping.
+            if rescored < settings.degraded_rescore_batch_size:
+                await asyncio.sleep(settings.degraded_rescore_interval_seconds)
+
+    async def rescore_once(self) -> int:
+        """Re-score one batch of pending results; returns how many were processed."""
+        async with get_session() as session:
+            pending = await store.list_pending_rescores(session, settings.degraded_rescore_batch_size)
+            detectors = {
+                service_id: text_service.detectors_for(await store.active_category_types(session, service_id))
+                for service_id in {row.service_id for row in pending}
+            }
+        if not pending:
+            return 0
+        scheduler = get_scheduler()
+        results = await asyncio.gather(
+            *(
+                scheduler.submit(
+                    row.service_id,
+                    row.content_text,
+                    priority=models.PriorityClass.BACKFILL,
+                    detectors=detectors[row.service_id],
+                )
+                for row in pending
+            )
+        )
+        async with get_session() as session:
+            changed = await store.apply_rescores(session, pending, results)
+        RESCORED_TOTAL.inc(changed, outcome="changed")
+        RESCORED_TOTAL.inc(len(pending) - changed, outcome="unchanged")
+        return len(pending)
+
+
+@lru_cache(maxsize=1)
+def get_degraded_mode() -> DegradedMode:
+    return DegradedMode()
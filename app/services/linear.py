@@ -0,0 +1,118 @@
+"""Hashed n-gram logistic regression: a cheap, deterministic toxicity scorer.
+
+Features are word unigrams/bigrams and character 3/4-grams of the normalised text,
+hashed with CRC32 (stable across processes, unlike ``hash``) into a fixed-size weight
+vector. Training is plain SGD over soft targets, usually the toxic-bert scores stored
+in ``ModerationResult.label_scores``, so the model learns to imitate the full pipeline.
+"""
+
+from __future__ import annotations
+
+import re
+import zlib
+from typing import Iterable, List, Sequence
+
+import numpy as np
+
+DEFAULT_N_FEATURES = 2**18
+# An untrained model scores everything as clearly benign and leaves decisions to the lexicon.
+UNTRAINED_BIAS = -4.0
+
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+_SPACE_RE = re.compile(r"\s+")
+
+
+def normalize(text: str) -> str:
+    return _SPACE_RE.sub(" ", text.lower()).strip()
+
+
+def hashed_features(text: str, n_features: int) -> np.ndarray:
+    normalized = normalize(text)
+    tokens = _WORD_RE.findall(normalized)
+    grams: List[str] = list(tokens)
+    grams.extend(f"{left} {right}" for left, right in zip(tokens, tokens[1:]))
+    padded = f" {normalized} "
+    for size in (3, 4):
+        grams.extend(padded[index:index + size] for index in range(len(padded) - size + 1))
+    mask = n_features - 1
+    return np.fromiter(
+        (zlib.crc32(gram.encode("utf-8")) & mask for gram in grams),
+        dtype=np.int64,
+        count=len(grams),
+    )
+
+
+def _sigmoid(values: np.ndarray) -> np.ndarray:
+    return 1.0 / (1.0 + np.exp(-np.clip(values, -30.0, 30.0)))
+
+
+class HashedNgramModel:
+    def __init__(self, weights: np.ndarray, bias: float, version: str) -> None:
+        if weights.size & (weights.size - 1):
+            raise ValueError("Number of hashed features must be a power of two")
+        self.weights = weights.astype(np.float32, copy=False)
+        self.bias = float(bias)
+        self.version = version
+
+    @classmethod
+    def untrained(cls, n_features: int = DEFAULT_N_FEATURES) -> "HashedNgramModel":
+        return cls(np.zeros(n_features, dtype=np.float32), UNTRAINED_BIAS, "hashed-ngram-untrained")
+
+    @classmethod
+    def load(cls, path: str) -> "HashedNgramModel":
+        with np.load(path, allow_pickle=False) as data:
+            return cls(data["weights"], float(data["bias"]), str(data["version"]))
+
+    def save(self, path: str) -> None:
+        with open(path, "wb") as handle:
+            np.savez_compressed(
+                handle, weights=self.weights, bias=np.float64(self.bias), version=np.str_(self.version)
+            )
+
+    def _margin(self, features: np.ndarray) -> float:
+        if not features.size:
+            return self.bias
+        return float(self.weights[features].sum()) / np.sqrt(features.size) + self.bias
+
+    def predict_proba(self, texts: Sequence[str]) -> np.ndarray:
+        n_features = self.weights.size
+        margins = np.fromiter(
+            (self._margin(hashed_features(text, n_features)) for text in texts),
+            dtype=np.float64,
+            count=len(texts),
+        )
+        return _sigmoid(margins)
+
+    @classmethod
+    def train(
+        cls,
+        texts: Sequence[str],
+        targets: Iterable[float],
+        *,
+        version: str,
+        n_features: int = DEFAULT_N_FEATURES,
+        epochs: int = 5,
+        learning_rate: float = 0.5,
+        l2: float = 1e-6,
+        seed: int = 0,
+    ) -> "HashedNgramModel":
+        """Fit with SGD on log-loss; ``targets`` are probabilities in ``[0, 1]``."""
+        labels = np.asarray(list(targets), dtype=np.float64)
+        if len(labels) != len(texts):
+            raise ValueError("texts and targets must have the same length")
+        features = [hashed_features(text, n_features) for text in texts]
+        weights = np.zeros(n_features, dtype=np.float64)
+        bias = float(np.log((labels.mean() + 1e-3) / (1.0 - labels.mean() + 1e-3))) if len(labels) else 0.0
+        rng = np.random.default_rng(seed)
+        for epoch in range(epochs):
+            step = learning_rate / (1.0 + epoch)
+            for index in rng.permutation(len(labels)):
+                row = features[index]
+                if not row.size:
+                    continue
+                scale = 1.0 / np.sqrt(row.size)
+                margin = weights[row].sum() * scale + bias
+                gradient = float(_sigmoid(np.asarray(margin))) - labels[index]
+                np.add.at(weights, row, -step * (gradient * scale + l2 * weights[row]))
+                bias -= step * gradient
+        return cls(weights.astype(np.float32), bias, version)
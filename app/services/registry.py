@@ -0,0 +1,314 @@
+"""Versioned models from ``MODEL_REGISTRY_DIR`` with hot swap.
+
+Every subdirectory of ``MODEL_REGISTRY_DIR`` is one version, named after the directory:
+``toxicity/`` and ``sentiment/`` (``save_pretrained`` output) for the transformers
+pipeline, or ``linear.npz`` for the hashed n-gram model. A deployment is loaded and warmed
+up in a background thread of the worker that received it while the old version keeps
+serving, then the reference the next batch picks up is swapped. Only then is it stored
+in ``modeldeployment`` and announced on the ``models`` invalidation topic, and every
+other worker swaps the same way. The
+old version is released once the batches already running on it have finished. Results
+carry the directory name as ``model_version``, so names longer than
+``MAX_VERSION_LENGTH`` are not versions. Until a version is deployed (or with
+``MODEL_VERSION`` unset) the ``CLASSIFIER_BACKEND`` models serve, as before.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import gc
+import logging
+import os
+import threading
+import time
+from functools import lru_cache
+from typing import List, Optional, Set
+
+from app.config import settings
+from app.core import invalidation, metrics, models, store
+from app.db.session import get_session
+from app.services import text as text_service
+from app.services.classifiers import (
+    LinearClassifier,
+    TextClassifier,
+    TransformersClassifier,
+    evaluate_with,
+    get_classifier,
+    release_classifiers,
+)
+from app.services.dedup import get_duplicate_index
+
+logger = logging.getLogger(__name__)
+
+# Run through a freshly loaded version before it takes traffic: the first calls of a
+# pipeline allocate buffers and pick kernels.
+_WARMUP_TEXTS = (
+    "Thanks for the article, it was really helpful.",
+    "You are an idiot and nobody wants to read your garbage.",
+    "Is there a version of this guide for older releases?",
+)
+_DRAIN_POLL_SECONDS = 0.05
+# ``ModerationResult.model_version`` is ``String(64)``.
+MAX_VERSION_LENGTH = 64
+
+MODEL_SWAPS_TOTAL = metrics.Counter(
+    "moderation_model_swaps_total",
+    "Model version activations on this worker, by outcome.",
+    ("outcome",),
+)
+
+
+def backend_of(path: str) -> Optional[str]:
+    if len(os.path.basename(path)) > MAX_VERSION_LENGTH:
+        return None
+    if os.path.isfile(os.path.join(path, "linear.npz")):
+        return "linear"
+    if os.path.isdir(os.path.join(path, "toxicity")):
+        return "transformers"
+    return None
+
+
+def load_version(version: str) -> TextClassifier:
+    """Load and warm up a registry version; blocks for as long as that takes."""
+    root = settings.model_registry_dir
+    path = os.path.join(root, version) if root and os.path.basename(version) == version else None
+    backend = backend_of(path) if path else None
+    if backend == "linear":
+        classifier: TextClassifier = LinearClassifier(os.path.join(path, "linear.npz"))
+        classifier.model_version = version
+    elif backend == "transformers":
+        classifier = TransformersClassifier(path, version)
+    else:
+        raise RuntimeError(f"Model version {version!r} not found in MODEL_REGISTRY_DIR={root!r}")
+    started = time.perf_counter()
+    classifier.evaluate(list(_WARMUP_TEXTS))
+    logger.info("Model version %s loaded, warm-up took %.3fs", version, time.perf_counter() - started)
+    return classifier
+
+
+class _LoadedModel:
+    def __init__(self, version: str, classifier: TextClassifier) -> None:
+        self.version = version
+        self.classifier: Optional[TextClassifier] = classifier
+        # Batches running on this version; guarded by ``ModelRegistry._lock``.
+        self.in_flight = 0
+
+
+class ModelRegistry:
+    def __init__(self) -> None:
+        self.deployed: Optional[str] = settings.model_version
+        self.loading: Optional[str] = None
+        self.last_error: Optional[str] = None
+        self._active: Optional[_LoadedModel] = None
+        self._served_default = False
+        self._draining: List[_LoadedModel] = []
+        self._lock = threading.Lock()
+        # Serialises the first-batch load without blocking ``_lock`` while it runs.
+        self._load_lock = threading.Lock()
+        self._revision = 0
+        self._swap_lock = asyncio.Lock()
+        self._sync_task: Optional[asyncio.Task] = None
+        self._resync = False
+        self._tasks: Set[asyncio.Task] = set()
+        invalidation.subscribe(invalidation.MODELS, self.request_sync)
+
+    def versions(self) -> List[models.ModelVersion]:
+        root = settings.model_registry_dir
+        if not root or not os.path.isdir(root):
+            return []
+        found = []
+        for name in sorted(os.listdir(root)):
+            backend = backend_of(os.path.join(root, name))
+            if backend is not None:
+                found.append(models.ModelVersion(version=name, backend=backend))
+        return found
+
+    def status(self) -> models.ModelRegistryStatus:
+        active = self._active
+        return models.ModelRegistryStatus(
+            active_version=active.version if active is not None else None,
+            deployed_version=self.deployed,
+            loading_version=self.loading,
+            draining_versions=[model.version for model in self._draining],
+            last_error=self.last_error,
+            versions=self.versions(),
+        )
+
+    def _load(self, version: str) -> _LoadedModel:
+        return _LoadedModel(version, load_version(version))
+
+    def evaluate(
+        self, texts: List[str], detectors: text_service.BatchDetectors = None
+    ) -> List[models.ModerationResult]:
+        """Classify a batch with the active version; runs in the scheduler's threads."""
+        if self._active is None and self.deployed is not None and not self._served_default:
+            self._load_in_place()
+        with self._lock:
+            model = self._active
+            if model is None:
+                self._served_default = True
+            else:
+                model.in_flight += 1
+        if model is None:
+            return evaluate_with(get_classifier(), texts, detectors)
+        try:
+            return evaluate_with(model.classifier, texts, detectors)
+        finally:
+            with self._lock:
+                model.in_flight -= 1
+
+    def _load_in_place(self) -> None:
+        """First batch of this worker: load the deployed version here, as the default backend does.
+
+        A worker already serving the default backend swaps in the background instead.
+        """
+        with self._load_lock:
+            with self._lock:
+                version = self.deployed
+                if self._active is not None or version is None or self._served_default:
+                    return
+            model = self._load(version)
+            with self._lock:
+                if self._active is None:
+                    self._active = model
+
+    async def start(self) -> None:
+        async with get_session() as session:
+            deployment = await store.get_model_deployment(session)
+        if deployment is not None:
+            self.deployed, self._revision = deployment.version, deployment.revision
+
+    async def stop(self) -> None:
+        tasks = list(self._tasks)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def _spawn(self, coroutine, name: str) -> asyncio.Task:
+        task = asyncio.create_task(coroutine, name=name)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+
+    def deploy(self, version: str) -> bool:
+        """Load ``version`` here, then record it so every worker follows; ``False`` while busy."""
+        if self.loading is not None:
+            return False
+        self.loading = version
+        self._spawn(self._deploy(version), f"model-deploy-{version}")
+        return True
+
+    async def _deploy(self, version: str) -> None:
+        # A version that does not load here is never recorded, so restarts cannot pick it up.
+        if not await self._swap(version):
+            return
+        try:
+            async with get_session() as session:
+                revision = await store.set_model_deployment(session, version)
+        except Exception as exc:  # noqa: BLE001 - reported through ``status``
+            logger.exception("Could not record the deployment of model version %s", version)
+            self.last_error = f"{version}: {exc}"
+            return
+        self.deployed = version
+        self._revision = max(self._revision, revision)
+
+    def request_sync(self) -> None:
+        """Follow ``modeldeployment``; called for every ``models`` invalidation."""
+        if self._sync_task is not None and not self._sync_task.done():
+            self._resync = True
+            return
+        self._sync_task = self._spawn(self._sync(), "model-registry-sync")
+
+    async def _sync(self) -> None:
+        while True:
+            self._resync = False
+            try:
+                async with get_session() as session:
+                    deployment = await store.get_model_deployment(session)
+            except Exception:  # noqa: BLE001 - the next invalidation retries
+                logger.exception("Could not read the deployed model version")
+                return
+            # Revisions only grow: an older row is a read from before the latest commit.
+            if deployment is not None and deployment.revision > self._revision:
+                self.deployed, self._revision = deployment.version, deployment.revision
+                active = self._active
+                # A worker that has not classified anything yet loads on its first batch.
+                if (active is not None and active.version != deployment.version) or (
+                    active is None and self._served_default
+                ):
+                    await self._swap(deployment.version)
+            if not self._resync:
+                return
+
+    async def _swap(self, version: str) -> bool:
+        async with self._swap_lock:
+            if self._active is not None and self._active.version == version:
+                self.loading = None
+                return True
+            self.loading = version
+            try:
+                model = await asyncio.to_thread(self._load, version)
+            except Exception as exc:  # noqa: BLE001 - keep serving the current version
+                logger.exception("Could not load model version %s", version)
+                self.last_error = f"{version}: {exc}"
+                MODEL_SWAPS_TOTAL.inc(outcome="failed")
+                return False
+            finally:
+                self.loading = None
+            with self._lock:
+                old, self._active = self._active, model
+        # Decisions of the previous model must not be reused as near-duplicates.
+        get_duplicate_index().clear()
+        self.last_error = None
+        MODEL_SWAPS_TOTAL.inc(outcome="activated")
+        logger.info("Serving model version %s", version)
+        if old is not None:
+            self._draining.append(old)
+            self._spawn(self._drain(old), f"model-drain-{old.version}")
+        elif self._served_default:
+            # Batches still on the default backend keep their own references.
+            release_classifiers()
+            await asyncio.to_thread(gc.collect)
+            logger.info("Released the %s backend", settings.classifier_backend)
+        return True
+
+    async def _drain(self, model: _LoadedModel) -> None:
+        deadline = time.monotonic() + settings.model_drain_timeout_seconds
+        while model.in_flight and time.monotonic() < deadline:
+            await asyncio.sleep(_DRAIN_POLL_SECONDS)
+        if model.in_flight:
+            logger.warning(
+                "Model version %s still runs %d batches after %.0fs; releasing it",
+                model.version,
+                model.in_flight,
+                settings.model_drain_timeout_seconds,
+            )
+        self._draining.remove(model)
+        model.classifier = None
+        await asyncio.to_thread(gc.collect)
+        logger.info("Released model version %s", model.version)
+
+
+@lru_cache(maxsize=1)
+def get_model_registry() -> ModelRegistry:
+    return ModelRegistry()
+
+
+def evaluate(
+    texts: List[str], detectors: text_service.BatchDetectors = None
+) -> List[models.ModerationResult]:
+    return get_model_registry().evaluate(texts, detectors)
+
+
+def _active_samples():
+    active = get_model_registry()._active
+    if active is not None:
+        yield (active.version,), 1.0
+
+
+metrics.CallbackMetric(
+    "moderation_model_active",
+    "1 for the registry model version serving this worker.",
+    ("version",),
+    _active_samples,
+)
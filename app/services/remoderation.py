@@ -0,0 +1,172 @@
+"""Re-moderation jobs: re-score stored comments after a model upgrade.
+
+A job walks the comments that have a result, in ``(timestamp, request_id)`` keyset
+order, ``REMODERATION_BATCH_SIZE`` at a time. Each page goes through the inference
+scheduler at backfill priority, so live traffic is always served first. The new results
+replace the old ones in one bulk update, the old ones are copied to
+``moderationresulthistory``, and the job's checkpoint moves past the page, all in one
+transaction. A job stopped at any point resumes after its last committed page.
+``rate_per_second`` (``REMODERATION_RATE_PER_SECOND`` by default) caps its pace.
+Results a moderator decided are never touched. A job re-scores with the model version
+deployed when it was created; it fails if another one gets deployed before it finishes.
+
+Jobs run in the process that started them: an API worker (``POST
+/admin/remoderation-jobs``) or ``python -m app.cli remoderate``. Pausing marks the job
+in the database, and its runner stops at the next checkpoint. A RUNNING job whose
+checkpoint is older than ``REMODERATION_STALE_SECONDS`` is taken to be orphaned and can
+be resumed anywhere.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+import uuid
+from functools import lru_cache
+from typing import Dict, Optional
+
+from app.config import settings
+from app.core import metrics, models, store
+from app.db import models as db_models
+from app.db.session import get_session
+from app.services import text as text_service
+from app.services.dedup import get_duplicate_index
+from app.services.degraded import get_degraded_mode
+from app.services.registry import get_model_registry
+from app.services.scheduler import get_scheduler
+
+logger = logging.getLogger(__name__)
+
+_SWAP_POLL_SECONDS = 1.0
+
+REMODERATED_TOTAL = metrics.Counter(
+    "moderation_remoderated_total",
+    "Stored comments handled by re-moderation jobs, by outcome.",
+    ("outcome",),
+)
+
+
+class RemoderationRunner:
+    def __init__(self) -> None:
+        self._tasks: Dict[uuid.UUID, asyncio.Task] = {}
+
+    def launch(self, job_id: uuid.UUID) -> None:
+        """Run a job in the background of this process."""
+        if job_id in self._tasks:
+            return
+        task = asyncio.create_task(self.run(job_id), name=f"remoderation-{job_id}")
+        self._tasks[job_id] = task
+        task.add_done_callback(lambda _: self._tasks.pop(job_id, None))
+
+    async def stop(self) -> None:
+        """Pause the jobs running here; they resume from their checkpoints."""
+        tasks = list(self._tasks.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def run(self, job_id: uuid.UUID) -> Optional[db_models.RemoderationJob]:
+        """Run a job to the end or until it is paused; ``None`` if it could not be claimed."""
+        async with get_session() as session:
+            job = await store.claim_remoderation_job(
+                session, job_id, uuid.uuid4().hex, settings.remoderation_stale_seconds
+            )
+        if job is None:
+            return None
+        # Stored decisions are about to change under the index.
+        get_duplicate_index().clear()
+        logger.info("Re-moderation job %s started after %s", job_id, job.cursor_timestamp or "the beginning")
+        outcome, error = models.RemoderationJobStatus.COMPLETED, None
+        try:
+            while True:
+                more = await self._run_page(job)
+                if more is None:
+                    break
+                if not more:
+                    # Paused from elsewhere: the job row already says so.
+                    outcome = models.RemoderationJobStatus.PAUSED
+                    break
+        except asyncio.CancelledError:
+            outcome = models.RemoderationJobStatus.PAUSED
+            raise
+        except Exception as exc:  # noqa: BLE001 - recorded on the job, which can be resumed
+            logger.exception("Re-moderation job %s failed", job_id)
+            outcome, error = models.RemoderationJobStatus.FAILED, str(exc)
+        finally:
+            async with get_session() as session:
+                await store.finish_remoderation_job(session, job, outcome, error)
+            logger.info(
+                "Re-moderation job %s %s: %s re-scored, %s changed, %s skipped",
+                job_id,
+                outcome.value.lower(),
+                job.processed,
+                job.changed,
+                job.skipped,
+            )
+        return job
+
+    async def _run_page(self, job: db_models.RemoderationJob) -> Optional[bool]:
+        """Re-score one page: ``None`` when none is left, ``False`` if the job was paused."""
+        started = time.monotonic()
+        async with get_session() as session:
+            deployment = await store.get_model_deployment(session)
+            page = await store.next_remoderation_page(session, job, settings.remoderation_batch_size)
+            if not page:
+                return None
+            detectors = {
+                service_id: text_service.detectors_for(
+                    await store.active_category_types(session, service_id)
+                )
+                for service_id in {row.service_id for row in page}
+            }
+        await self._check_model(job, deployment.version if deployment is not None else settings.model_version)
+        # The model is struggling with live traffic already: wait instead of piling on.
+        while get_degraded_mode().check():
+            await asyncio.sleep(settings.degraded_rescore_interval_seconds)
+        scheduler = get_scheduler()
+        results = await asyncio.gather(
+            *(
+                scheduler.submit(
+                    row.service_id,
+                    row.content_text,
+                    priority=models.PriorityClass.BACKFILL,
+                    detectors=detectors[row.service_id],
+                )
+                for row in page
+            )
+        )
+        processed, changed, skipped = job.processed, job.changed, job.skipped
+        async with get_session() as session:
+            if not await store.apply_remoderation_page(session, job, page, results):
+                return False
+        changed = job.changed - changed
+        REMODERATED_TOTAL.inc(changed, outcome="changed")
+        REMODERATED_TOTAL.inc(job.processed - processed - changed, outcome="unchanged")
+        REMODERATED_TOTAL.inc(job.skipped - skipped, outcome="skipped")
+
+        rate = job.rate_per_second if job.rate_per_second is not None else settings.remoderation_rate_per_second
+        if rate > 0:
+            await asyncio.sleep(max(0.0, len(page) / rate - (time.monotonic() - started)))
+        return True
+
+    async def _check_model(self, job: db_models.RemoderationJob, deployed: Optional[str]) -> None:
+        """Fail unless this worker serves the version the job was created for."""
+        registry = get_model_registry()
+        while registry.loading is not None:
+            await asyncio.sleep(_SWAP_POLL_SECONDS)
+        serving = {deployed, registry.deployed}
+        # Until its first batch a worker has no active version; it then loads the deployed one.
+        active = registry.status().active_version
+        if active is not None:
+            serving.add(active)
+        if serving != {job.target_version}:
+            raise RuntimeError(
+                f"The job re-scores with {job.target_version or settings.classifier_backend!r}, "
+                f"but {deployed or settings.classifier_backend!r} is deployed now"
+            )
+
+
+@lru_cache(maxsize=1)
+def get_remoderation_runner() -> RemoderationRunner:
+    return RemoderationRunner()
@@ -0,0 +1,32 @@
+"""Review-queue gauges, refreshed from the database on every scrape."""
+
+from __future__ import annotations
+
+from datetime import datetime
+
+from app.core import metrics, store
+from app.db.session import get_session
+
+REVIEW_QUEUE_DEPTH = metrics.Gauge(
+    "moderation_review_queue_depth",
+    "HUMAN_REVIEW results waiting for or claimed by a moderator.",
+    ("state",),
+)
+REVIEW_QUEUE_OLDEST_SECONDS = metrics.Gauge(
+    "moderation_review_queue_oldest_seconds",
+    "Age of the oldest HUMAN_REVIEW result in each queue state.",
+    ("state",),
+)
+
+
+async def refresh_queue_metrics() -> None:
+    async with get_session() as session:
+        stats = await store.review_queue_stats(session)
+    now = datetime.utcnow()
+    for state in ("waiting", "claimed"):
+        depth, oldest = stats.get(state, (0, None))
+        REVIEW_QUEUE_DEPTH.set(depth, state=state)
+        REVIEW_QUEUE_OLDEST_SECONDS.set((now - oldest).total_seconds() if oldest else 0.0, state=state)
+
+
+metrics.register_refresher(refresh_queue_metrics)
@@ -0,0 +1,124 @@
+from __future__ import annotations
+
+import logging
+import os
+import tempfile
+from typing import List, Optional, Set
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+_configured = False
+# Keeps the per-worker affinity slot locked for the lifetime of the process.
+_affinity_slot_fd: Optional[int] = None
+
+
+def parse_cpu_sets(spec: str) -> List[Set[int]]:
+    """Parse ``"0-3;4-7"`` into one CPU set per worker slot."""
+    cpu_sets: List[Set[int]] = []
+    for group in spec.split(";"):
+        cpus: Set[int] = set()
+        for part in group.split(","):
+            part = part.strip()
+            if not part:
+                continue
+            if "-" in part:
+                start, end = part.split("-", 1)
+                cpus.update(range(int(start), int(end) + 1))
+            else:
+                cpus.add(int(part))
+        if cpus:
+            cpu_sets.append(cpus)
+    return cpu_sets
+
+
+def _claim_affinity_slot(slots: int) -> int:
+    global _affinity_slot_fd
+    try:
+        import fcntl
+    except ImportError:  # pragma: no cover - non-POSIX platforms
+        return os.getpid() % slots
+
+    lock_dir = tempfile.gettempdir()
+    for index in range(slots):
+        path = os.path.join(lock_dir, f"comment-moderation-cpu-slot-{index}.lock")
+        fd = os.open(path, os.O_CREAT | os.O_RDWR, 0o600)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            os.close(fd)
+            continue
+        _affinity_slot_fd = fd
+        return index
+    logger.warning("All %s CPU affinity slots are taken, sharing one by pid", slots)
+    return os.getpid() % slots
+
+
+def pin_to_cpus(cpus: Set[int]) -> bool:
+    if not hasattr(os, "sched_setaffinity"):
+        logger.warning("CPU affinity is not supported on this platform, ignoring")
+        return False
+    os.sched_setaffinity(0, cpus)
+    return True
+
+
+def apply_cpu_affinity(spec: str) -> Optional[Set[int]]:
+    """Pin the current worker to its CPU set.
+
+    With several sets each worker claims the first free slot through a lock file, so
+    uvicorn/gunicorn workers spread over disjoint cores without knowing their index.
+    """
+    cpu_sets = parse_cpu_sets(spec)
+    if not cpu_sets:
+        return None
+    index = _claim_affinity_slot(len(cpu_sets)) if len(cpu_sets) > 1 else 0
+    cpus = cpu_sets[index]
+    if not pin_to_cpus(cpus):
+        return None
+    logger.info("Worker %s pinned to CPUs %s (slot %s)", os.getpid(), sorted(cpus), index)
+    return cpus
+
+
+def configure_inference_runtime(
+    intra_op_threads: Optional[int] = None,
+    inter_op_threads: Optional[int] = None,
+    cpu_affinity: Optional[str] = None,
+) -> None:
+    """Apply threading and affinity settings once, before any model is loaded."""
+    global _configured
+    if _configured:
+        return
+    _configured = True
+
+    intra_op_threads = intra_op_threads or settings.inference_intra_op_threads
+    inter_op_threads = inter_op_threads or settings.inference_inter_op_threads
+    cpu_affinity = cpu_affinity or settings.inference_cpu_affinity
+
+    if cpu_affinity:
+        cpus = apply_cpu_affinity(cpu_affinity)
+        if cpus and intra_op_threads is None:
+            intra_op_threads = len(cpus)
+
+    if intra_op_threads is not None:
+        # OpenMP/MKL read these once at torch import time.
+        os.environ.setdefault("OMP_NUM_THREADS", str(intra_op_threads))
+        os.environ.setdefault("MKL_NUM_THREADS", str(intra_op_threads))
+
+    try:
+        import torch
+    except ImportError:
+        return
+
+    if intra_op_threads is not None:
+        torch.set_num_threads(intra_op_threads)
+    if inter_op_threads is not None:
+        try:
+            torch.set_num_interop_threads(inter_op_threads)
+        except RuntimeError as exc:
+            logger.warning("Could not set inter-op threads to %s: %s", inter_op_threads, exc)
+    logger.info(
+        "Inference runtime: intra-op threads=%s, inter-op threads=%s",
+        torch.get_num_threads(),
+        torch.get_num_interop_threads(),
+    )
@@ -0,0 +1,315 @@
+from __future__ import annotations
+
+import asyncio
+import contextvars
+import functools
+import heapq
+import itertools
+import logging
+import time
+import uuid
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Callable, Deque, Dict, FrozenSet, List, Optional
+
+from app.config import settings
+from app.core import deadlines, metrics, models, tracing
+from app.services import registry
+
+logger = logging.getLogger(__name__)
+
+# Lower rank is served first; backfill only runs when no interactive work is queued.
+PRIORITY_RANK: Dict[models.PriorityClass, int] = {
+    models.PriorityClass.INTERACTIVE: 0,
+    models.PriorityClass.BACKFILL: 1,
+}
+
+
+@dataclass(order=True)
+class _QueuedItem:
+    rank: int
+    finish_tag: float
+    sequence: int
+    start_tag: float = field(compare=False)
+    service_id: uuid.UUID = field(compare=False)
+    priority: models.PriorityClass = field(compare=False)
+    text: str = field(compare=False)
+    future: asyncio.Future = field(compare=False)
+    enqueued_at: float = field(compare=False)
+    span: Optional[tracing.Span] = field(compare=False, default=None)
+    deadline: Optional[deadlines.Deadline] = field(compare=False, default=None)
+    request_id: Optional[uuid.UUID] = field(compare=False, default=None)
+    # Detectors the service's active categories need; ``None`` runs all of them.
+    detectors: Optional[FrozenSet[str]] = field(compare=False, default=None)
+
+
+@dataclass
+class _ServiceQueueStats:
+    queued: Dict[models.PriorityClass, int] = field(
+        default_factory=lambda: {priority: 0 for priority in models.PriorityClass}
+    )
+    dispatched: int = 0
+    wait_total: float = 0.0
+    wait_max: float = 0.0
+    recent_waits: Deque[float] = field(default_factory=lambda: deque(maxlen=1024))
+
+    def record_wait(self, wait: float) -> None:
+        self.dispatched += 1
+        self.wait_total += wait
+        self.wait_max = max(self.wait_max, wait)
+        self.recent_waits.append(wait)
+
+
+# Called after every successful batch with its items, their results and the model time
+# per item in seconds; runs on the event loop, so it must not block.
+BatchObserver = Callable[[List[_QueuedItem], List[models.ModerationResult], float], None]
+
+# Weight of the newest batch in ``InferenceScheduler.latency_ewma``.
+_LATENCY_SMOOTHING = 0.2
+
+
+def _cost(text: str) -> float:
+    # Roughly proportional to the number of tokens the models will see.
+    return 1.0 + len(text) / 1000.0
+
+
+class InferenceScheduler:
+    """Weighted fair queueing in front of the classifier.
+
+    Every service gets its own virtual queue: an item's finish tag advances by
+    ``cost / weight`` from the later of the global virtual time and the service's
+    previous finish tag, so a busy tenant only delays itself. Dispatch pops the lowest
+    ``(priority, finish tag)`` items into a batch and runs it in a worker thread.
+    """
+
+    def __init__(
+        self,
+        evaluate: Callable[[List[str]], List[models.ModerationResult]] = registry.evaluate,
+        batch_size: Optional[int] = None,
+        concurrency: Optional[int] = None,
+    ) -> None:
+        self._evaluate = evaluate
+        self._batch_size = batch_size or settings.inference_batch_size
+        self._concurrency = concurrency or settings.inference_concurrency
+        self._heap: List[_QueuedItem] = []
+        self._sequence = itertools.count()
+        self._virtual_time = 0.0
+        self._last_finish: Dict[uuid.UUID, float] = {}
+        self._stats: Dict[uuid.UUID, _ServiceQueueStats] = {}
+        self._wakeup: Optional[asyncio.Event] = None
+        self._workers: List[asyncio.Task] = []
+        self._executor: Optional[ThreadPoolExecutor] = None
+        # Load signals read by ``degraded``: seconds from enqueue to result, smoothed over
+        # recent batches, when that was last updated, and when a batch last failed.
+        self.latency_ewma: Optional[float] = None
+        self.latency_observed_at = 0.0
+        self.last_failure_at: Optional[float] = None
+        self._observers: List[BatchObserver] = []
+
+    def add_observer(self, observer: BatchObserver) -> None:
+        self._observers.append(observer)
+
+    def remove_observer(self, observer: BatchObserver) -> None:
+        if observer in self._observers:
+            self._observers.remove(observer)
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self._heap)
+
+    def _ensure_started(self) -> None:
+        if self._workers:
+            return
+        self._wakeup = asyncio.Event()
+        self._executor = ThreadPoolExecutor(
+            max_workers=self._concurrency, thread_name_prefix="inference"
+        )
+        self._workers = [
+            asyncio.create_task(self._worker(), name=f"inference-worker-{index}")
+            for index in range(self._concurrency)
+        ]
+
+    async def stop(self) -> None:
+        for task in self._workers:
+            task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+        for item in self._heap:
+            if not item.future.done():
+                item.future.cancel()
+        self._heap.clear()
+
+    async def submit(
+        self,
+        service_id: uuid.UUID,
+        text: str,
+        priority: models.PriorityClass = models.PriorityClass.INTERACTIVE,
+        weight: float = 1.0,
+        deadline: Optional[deadlines.Deadline] = None,
+        request_id: Optional[uuid.UUID] = None,
+        detectors: Optional[FrozenSet[str]] = None,
+    ) -> models.ModerationResult:
+        self._ensure_started()
+        start_tag = max(self._virtual_time, self._last_finish.get(service_id, 0.0))
+        finish_tag = start_tag + _cost(text) / max(weight, 1e-6)
+        self._last_finish[service_id] = finish_tag
+
+        item = _QueuedItem(
+            rank=PRIORITY_RANK[priority],
+            finish_tag=finish_tag,
+            sequence=next(self._sequence),
+            start_tag=start_tag,
+            service_id=service_id,
+            priority=priority,
+            text=text,
+            future=asyncio.get_running_loop().create_future(),
+            enqueued_at=time.perf_counter(),
+            span=tracing.current_span(),
+            deadline=deadline,
+            request_id=request_id,
+            detectors=detectors,
+        )
+        heapq.heappush(self._heap, item)
+        self._service_stats(service_id).queued[priority] += 1
+        assert self._wakeup is not None
+        self._wakeup.set()
+        return await item.future
+
+    def _service_stats(self, service_id: uuid.UUID) -> _ServiceQueueStats:
+        stats = self._stats.get(service_id)
+        if stats is None:
+            stats = self._stats[service_id] = _ServiceQueueStats()
+        return stats
+
+    async def _next_batch(self) -> List[_QueuedItem]:
+        assert self._wakeup is not None
+        while not self._heap:
+            self._wakeup.clear()
+            await self._wakeup.wait()
+
+        batch: List[_QueuedItem] = []
+        now = time.perf_counter()
+        while self._heap and len(batch) < self._batch_size:
+            item = heapq.heappop(self._heap)
+            stats = self._service_stats(item.service_id)
+            stats.queued[item.priority] -= 1
+            if item.future.done():
+                # The caller went away while the item was queued.
+                deadlines.DEADLINE_DROPPED_TOTAL.inc(stage="queue", reason="cancelled")
+                continue
+            if item.deadline is not None and item.deadline.expired():
+                item.future.set_exception(item.deadline.exceeded("queue"))
+                continue
+            self._virtual_time = max(self._virtual_time, item.start_tag)
+            stats.record_wait(now - item.enqueued_at)
+            if item.span is not None:
+                item.span.children.append(
+                    tracing.Span("queue_wait", start=item.enqueued_at, end=now)
+                )
+            metrics.QUEUE_WAIT_SECONDS.observe(
+                now - item.enqueued_at, service_id=str(item.service_id)
+            )
+            batch.append(item)
+        if not self._heap:
+            # Nothing is queued, so the tags carry no history worth keeping.
+            self._last_finish.clear()
+            self._virtual_time = 0.0
+        return batch
+
+    async def _worker(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._next_batch()
+            if not batch:
+                continue
+            texts = [item.text for item in batch]
+            evaluate = self._evaluate
+            if any(item.detectors is not None for item in batch):
+                evaluate = functools.partial(evaluate, detectors=[item.detectors for item in batch])
+            batch_span = tracing.Span("batch", attributes={"size": len(batch)})
+            context = contextvars.copy_context()
+            context.run(tracing.activate_span, batch_span)
+            try:
+                results = await loop.run_in_executor(
+                    self._executor, context.run, evaluate, texts
+                )
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:  # noqa: BLE001 - failure is reported to every caller
+                logger.exception("Inference batch of %s items failed", len(batch))
+                self.last_failure_at = time.perf_counter()
+                for item in batch:
+                    if not item.future.done():
+                        item.future.set_exception(exc)
+                continue
+            finally:
+                batch_span.end = time.perf_counter()
+            if self._observers:
+                per_item = (batch_span.end - batch_span.start) / len(batch)
+                for observer in self._observers:
+                    try:
+                        observer(batch, results, per_item)
+                    except Exception:  # noqa: BLE001 - an observer must not stop inference
+                        logger.exception("Batch observer %r failed", observer)
+            latency = batch_span.end - min(item.enqueued_at for item in batch)
+            stale = batch_span.end - self.latency_observed_at > settings.degraded_min_seconds
+            if self.latency_ewma is None or stale:
+                self.latency_ewma = latency
+            else:
+                self.latency_ewma += _LATENCY_SMOOTHING * (latency - self.latency_ewma)
+            self.latency_observed_at = batch_span.end
+            for index, (item, result) in enumerate(zip(batch, results)):
+                if item.span is not None:
+                    item.span.children.append(tracing.batch_view(batch_span, index))
+                if not item.future.done():
+                    item.future.set_result(result)
+
+    def snapshot(self) -> List[models.SchedulerQueueStats]:
+        snapshot = []
+        for service_id, stats in self._stats.items():
+            waits = sorted(stats.recent_waits)
+            p95 = waits[min(len(waits) - 1, int(len(waits) * 0.95))] if waits else 0.0
+            snapshot.append(
+                models.SchedulerQueueStats(
+                    service_id=str(service_id),
+                    queue_depth=sum(stats.queued.values()),
+                    queue_depth_by_priority=dict(stats.queued),
+                    dispatched=stats.dispatched,
+                    mean_wait_ms=(stats.wait_total / stats.dispatched * 1000.0)
+                    if stats.dispatched
+                    else 0.0,
+                    p95_wait_ms=p95 * 1000.0,
+                    max_wait_ms=stats.wait_max * 1000.0,
+                )
+            )
+        return snapshot
+
+
+_scheduler: Optional[InferenceScheduler] = None
+
+
+def get_scheduler() -> InferenceScheduler:
+    global _scheduler
+    if _scheduler is None:
+        _scheduler = InferenceScheduler()
+    return _scheduler
+
+
+def _queue_depth_samples():
+    if _scheduler is None:
+        return
+    for stats in _scheduler.snapshot():
+        for priority, depth in stats.queue_depth_by_priority.items():
+            yield (stats.service_id, priority.value), depth
+
+
+metrics.CallbackMetric(
+    "moderation_queue_depth",
+    "Requests waiting in the inference queue.",
+    ("service_id", "priority"),
+    _queue_depth_samples,
+)
@@ -0,0 +1,174 @@
+"""Shadow evaluation of a candidate model on sampled live traffic.
+
+With ``SHADOW_MODEL_VERSION`` set to a registry version, the scheduler hands every
+finished interactive batch to ``ShadowEvaluator.offer``. It samples
+``SHADOW_SAMPLE_RATE`` of the comments into a queue of at most ``SHADOW_QUEUE_SIZE``
+items; when the queue is full, samples are dropped rather than slowing the live path.
+A background task classifies queued comments with the candidate in batches of
+``SHADOW_BATCH_SIZE`` on its own low-priority thread. It only runs while the inference
+queue is empty. The candidate's decision, scores and model time per comment are stored
+in ``shadowresult`` next to the served ones. ``GET /admin/shadow/report`` summarises them.
+Responses never wait for the candidate and never use its decisions.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import os
+import random
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import FrozenSet, List, Optional, Tuple
+
+from app.config import settings
+from app.core import metrics, models, store
+from app.db.session import get_session
+from app.services.classifiers import TextClassifier, evaluate_with
+from app.services.registry import load_version
+from app.services.scheduler import get_scheduler
+
+logger = logging.getLogger(__name__)
+
+# How long the shadow task waits before checking again whether live work is queued.
+_YIELD_SECONDS = 0.05
+_SHADOW_NICENESS = 10
+
+SHADOW_TOTAL = metrics.Counter(
+    "moderation_shadow_total",
+    "Comments sampled for shadow evaluation, by outcome.",
+    ("outcome",),
+)
+
+
+@dataclass
+class _ShadowItem:
+    request_id: uuid.UUID
+    text: str
+    result: models.ModerationResult
+    latency_seconds: float
+    detectors: Optional[FrozenSet[str]]
+
+
+def _lower_thread_priority() -> None:
+    # Linux applies niceness per thread; elsewhere yielding to the live queue has to do.
+    try:
+        os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), _SHADOW_NICENESS)
+    except (AttributeError, OSError):
+        pass
+
+
+class ShadowEvaluator:
+    def __init__(self) -> None:
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._classifier: Optional[TextClassifier] = None
+        self._random = random.Random()
+
+    @property
+    def queue_depth(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    def start(self) -> None:
+        if not settings.shadow_model_version or self._task is not None:
+            return
+        self._queue = asyncio.Queue(maxsize=settings.shadow_queue_size)
+        self._executor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="shadow", initializer=_lower_thread_priority
+        )
+        get_scheduler().add_observer(self.offer)
+        self._task = asyncio.create_task(self._run(), name="shadow-evaluator")
+
+    async def stop(self) -> None:
+        get_scheduler().remove_observer(self.offer)
+        task, self._task = self._task, None
+        if task is not None:
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def offer(self, batch: list, results: List[models.ModerationResult], per_item_seconds: float) -> None:
+        assert self._queue is not None
+        for item, result in zip(batch, results):
+            if item.request_id is None or item.priority is not models.PriorityClass.INTERACTIVE:
+                continue
+            if self._random.random() >= settings.shadow_sample_rate:
+                continue
+            try:
+                self._queue.put_nowait(
+                    _ShadowItem(item.request_id, item.text, result, per_item_seconds, item.detectors)
+                )
+            except asyncio.QueueFull:
+                SHADOW_TOTAL.inc(outcome="dropped")
+            else:
+                SHADOW_TOTAL.inc(outcome="queued")
+
+    def _evaluate(self, items: List[_ShadowItem]) -> Tuple[List[models.ModerationResult], float]:
+        if self._classifier is None:
+            self._classifier = load_version(settings.shadow_model_version)
+        started = time.perf_counter()
+        # The candidate runs the same detectors the served model ran.
+        results = evaluate_with(
+            self._classifier, [item.text for item in items], [item.detectors for item in items]
+        )
+        return results, time.perf_counter() - started
+
+    async def _run(self) -> None:
+        assert self._queue is not None
+        loop = asyncio.get_running_loop()
+        scheduler = get_scheduler()
+        while True:
+            items = [await self._queue.get()]
+            while len(items) < settings.shadow_batch_size and not self._queue.empty():
+                items.append(self._queue.get_nowait())
+            while scheduler.queue_depth:
+                await asyncio.sleep(_YIELD_SECONDS)
+            try:
+                results, seconds = await loop.run_in_executor(self._executor, self._evaluate, items)
+                async with get_session() as session:
+                    rows = [
+                        self._row(item, result, seconds / len(items))
+                        for item, result in zip(items, results)
+                    ]
+                    await store.save_shadow_results(session, rows)
+            except Exception:  # noqa: BLE001 - shadow failures never reach live traffic
+                logger.exception("Shadow evaluation of %d comments failed", len(items))
+                SHADOW_TOTAL.inc(len(items), outcome="failed")
+                continue
+            SHADOW_TOTAL.inc(len(items), outcome="recorded")
+
+    @staticmethod
+    def _row(item: _ShadowItem, candidate: models.ModerationResult, candidate_seconds: float) -> dict:
+        return {
+            "request_id": item.request_id,
+            "primary_version": item.result.model_version,
+            "candidate_version": candidate.model_version,
+            "primary_decision": item.result.decision.value,
+            "candidate_decision": candidate.decision.value,
+            "primary_confidence": item.result.confidence_score,
+            "candidate_confidence": candidate.confidence_score,
+            "candidate_scores": json.dumps(candidate.label_scores or {}),
+            "primary_latency_ms": item.latency_seconds * 1000.0,
+            "candidate_latency_ms": candidate_seconds * 1000.0,
+        }
+
+
+@lru_cache(maxsize=1)
+def get_shadow_evaluator() -> ShadowEvaluator:
+    return ShadowEvaluator()
+
+
+metrics.CallbackMetric(
+    "moderation_shadow_queue_depth",
+    "Sampled comments waiting for the shadow model.",
+    (),
+    lambda: [((), float(get_shadow_evaluator().queue_depth))],
+)
@@ -1,9 +1,16 @@
 from __future__ import annotations
 
+import importlib.util
+import time
 from functools import lru_cache
-from typing import Dict, Iterable, List
+from typing import Dict, FrozenSet, Iterable, List, Optional, Sequence
 
-from app.core import models
+from app.core import metrics, models, tracing
+from app.services.runtime import configure_inference_runtime
+
+TOXICITY_MODEL_ID = "unitary/toxic-bert"
+SENTIMENT_MODEL_ID = "distilbert-base-uncased-finetuned-sst-2-english"
+LEXICAL_MODEL_VERSION = "lexical-degraded-1"
 
 # Keyword heuristics help catch obvious abusive phrasing without retraining the model.
 TOXIC_KEYWORDS: Dict[str, float] = {
@@ -24,40 +31,125 @@ TOXIC_LABELS: Iterable[str] = (
     "identity_hate",
 )
 
+# Decision thresholds of ``_decide``; ``whatif`` replays history under other values.
+REJECT_THRESHOLD = 0.85
+REVIEW_THRESHOLD = 0.55
+SENTIMENT_REVIEW_THRESHOLD = 0.8
 
-@lru_cache(maxsize=1)
-def _get_toxicity_classifier():
-    try:
-        from transformers import pipeline
-    except ImportError as exc:  # pragma: no cover - informative failure path
+TOXICITY_DETECTOR = "toxicity"
+SENTIMENT_DETECTOR = "sentiment"
+KEYWORD_DETECTOR = "keywords"
+ALL_DETECTORS: FrozenSet[str] = frozenset({TOXICITY_DETECTOR, SENTIMENT_DETECTOR, KEYWORD_DETECTOR})
+
+# Signals each violation category is decided on. A comment only goes through the
+# detectors its service's enabled, subscribed categories need; a model no comment of a
+# batch needs is not run (or loaded) at all.
+CATEGORY_DETECTORS: Dict[models.CategoryType, FrozenSet[str]] = {
+    models.CategoryType.TOXICITY: ALL_DETECTORS,
+    models.CategoryType.HATE_SPEECH: frozenset({TOXICITY_DETECTOR, KEYWORD_DETECTOR}),
+    models.CategoryType.NSFW: frozenset({TOXICITY_DETECTOR}),
+    models.CategoryType.ILLEGAL_CONTENT: frozenset({TOXICITY_DETECTOR, KEYWORD_DETECTOR}),
+    models.CategoryType.SPAM: frozenset({KEYWORD_DETECTOR}),
+}
+
+# Detectors per comment of a batch; ``None`` (for the batch or one comment) means all.
+BatchDetectors = Optional[Sequence[Optional[FrozenSet[str]]]]
+
+DETECTOR_SKIPPED_TOTAL = metrics.Counter(
+    "moderation_detector_skipped_total",
+    "Comments a model did not run on because no active category needs it.",
+    ("detector",),
+)
+
+
+def detectors_for(categories: Optional[Iterable[models.CategoryType]]) -> Optional[FrozenSet[str]]:
+    """Detectors the active categories of a service need; ``None`` stands for all."""
+    if categories is None:
+        return None
+    needed = frozenset().union(*(CATEGORY_DETECTORS[category] for category in categories))
+    return None if needed == ALL_DETECTORS else needed
+
+
+def items_needing(detectors: BatchDetectors, detector: str, count: int) -> List[int]:
+    """Positions of the comments of a batch that ``detector`` has to run on."""
+    if detectors is None:
+        return list(range(count))
+    needing = [index for index, wanted in enumerate(detectors) if wanted is None or detector in wanted]
+    if len(needing) < count:
+        DETECTOR_SKIPPED_TOTAL.inc(count - len(needing), detector=detector)
+    return needing
+
+
+def _instrument_pipeline(pipe, model_id: str):
+    """Time tokenization and the forward pass separately for ``/metrics``."""
+    preprocess, forward = pipe.preprocess, pipe._forward
+
+    def timed_preprocess(*args, **kwargs):
+        with tracing.model_phase(model_id, "tokenize"):
+            return preprocess(*args, **kwargs)
+
+    def timed_forward(*args, **kwargs):
+        with tracing.model_phase(model_id, "forward"):
+            return forward(*args, **kwargs)
+
+    pipe.preprocess = timed_preprocess
+    pipe._forward = timed_forward
+    return pipe
+
+
+def _load_pipeline(model_id: str, name: Optional[str] = None, **kwargs):
+    from transformers import pipeline
+
+    name = name or model_id
+    started = time.perf_counter()
+    pipe = pipeline(model=model_id, **kwargs)
+    metrics.MODEL_LOAD_SECONDS.set(time.perf_counter() - started, model=name)
+    return _instrument_pipeline(pipe, name)
+
+
+def _require_transformers(purpose: str) -> None:
+    configure_inference_runtime()
+    if importlib.util.find_spec("transformers") is None:  # pragma: no cover - informative failure path
         raise RuntimeError(
-            "Package 'transformers' is required for ML-based moderation. "
+            f"Package 'transformers' is required for {purpose}. "
             "Install it with `pip install transformers torch`."
-        ) from exc
+        )
+
 
-    return pipeline(
-        "text-classification",
-        model="unitary/toxic-bert",
-        tokenizer="unitary/toxic-bert",
+def load_toxicity_pipeline(model_id: str = TOXICITY_MODEL_ID, name: Optional[str] = None):
+    """Toxicity pipeline from a hub id or a local ``save_pretrained`` directory."""
+    _require_transformers("ML-based moderation")
+    return _load_pipeline(
+        model_id,
+        name,
+        task="text-classification",
+        tokenizer=model_id,
         truncation=True,
         return_all_scores=True,
     )
 
 
+def load_sentiment_pipeline(model_id: str = SENTIMENT_MODEL_ID, name: Optional[str] = None):
+    _require_transformers("sentiment-based moderation")
+    return _load_pipeline(model_id, name, task="sentiment-analysis")
+
+
+@lru_cache(maxsize=1)
+def _get_toxicity_classifier():
+    return load_toxicity_pipeline()
+
+
 @lru_cache(maxsize=1)
 def _get_sentiment_classifier():
-    try:
-        from transformers import pipeline
-    except ImportError as exc:  # pragma: no cover - informative failure path
-        raise RuntimeError(
-            "Package 'transformers' is required for sentiment-based moderation. "
-            "Install it with `pip install transformers torch`."
-        ) from exc
+    return load_sentiment_pipeline()
 
-    return pipeline(
-        "sentiment-analysis",
-        model="distilbert-base-uncased-finetuned-sst-2-english",
-    )
+
+metrics.register_cache(
+    "toxicity_classifier", lambda: tuple(_get_toxicity_classifier.cache_info()[:2])
+)
+metrics.register_cache(
+    "sentiment_classifier", lambda: tuple(_get_sentiment_classifier.cache_info()[:2])
+)
 
 
 def _aggregate_scores(raw_scores: List[Dict[str, float]]) -> Dict[str, float]:
@@ -73,47 +165,120 @@ def _keyword_score(text: str) -> float:
     return score
 
 
-def _negative_sentiment_score(text: str) -> float:
-    sentiment_classifier = _get_sentiment_classifier()
-    sentiment = sentiment_classifier(text)[0]
-    if sentiment["label"].upper() == "NEGATIVE":
-        return float(sentiment["score"])
-    return 0.0
+def _negative_sentiment_scores(texts: List[str], sentiment_classifier=None) -> List[float]:
+    sentiment_classifier = sentiment_classifier or _get_sentiment_classifier()
+    sentiments = sentiment_classifier(texts, batch_size=len(texts))
+    return [
+        float(sentiment["score"]) if sentiment["label"].upper() == "NEGATIVE" else 0.0
+        for sentiment in sentiments
+    ]
 
 
-def evaluate_text(text: str) -> models.ModerationResult:
-    """Classify text toxicity using ML model plus lexical and sentiment heuristics."""
-    classifier = _get_toxicity_classifier()
-    outputs = classifier(text)
-    scores = _aggregate_scores(outputs[0])
+def _build_result(
+    text: str,
+    scores: Dict[str, float],
+    sentiment_score: Optional[float],
+    model_version: str = TOXICITY_MODEL_ID,
+    detectors: Optional[FrozenSet[str]] = None,
+) -> models.ModerationResult:
+    """Apply the heuristics and decision rules; ``sentiment_score`` is None without a sentiment model."""
+    keyword_score = 0.0
+    if detectors is None or KEYWORD_DETECTOR in detectors:
+        with tracing.stage("heuristic"):
+            keyword_score = _keyword_score(text)
+        scores["keyword_heuristic"] = keyword_score
+    if sentiment_score is not None and (detectors is None or SENTIMENT_DETECTOR in detectors):
+        scores["sentiment_negative"] = sentiment_score
 
-    keyword_score = _keyword_score(text)
-    scores["keyword_heuristic"] = keyword_score
+    with tracing.stage("rules"):
+        decision, confidence = _decide(scores, keyword_score, sentiment_score or 0.0)
+
+    return models.ModerationResult(
+        request_id="",
+        decision=decision,
+        confidence_score=confidence,
+        model_version=model_version,
+        label_scores=scores,
+    )
 
-    sentiment_score = _negative_sentiment_score(text)
-    scores["sentiment_negative"] = sentiment_score
 
+def _decide(
+    scores: Dict[str, float], keyword_score: float, sentiment_score: float
+) -> tuple[models.ModerationDecision, float]:
     toxicity_signal = max(
         [scores.get(label, 0.0) for label in TOXIC_LABELS] + [keyword_score]
     )
 
-    if toxicity_signal >= 0.85:
+    if toxicity_signal >= REJECT_THRESHOLD:
         decision = models.ModerationDecision.REJECTED
         confidence = toxicity_signal
-    elif toxicity_signal >= 0.55:
+    elif toxicity_signal >= REVIEW_THRESHOLD:
         decision = models.ModerationDecision.HUMAN_REVIEW
         confidence = toxicity_signal
-    elif sentiment_score >= 0.8:
+    elif sentiment_score >= SENTIMENT_REVIEW_THRESHOLD:
         decision = models.ModerationDecision.HUMAN_REVIEW
         confidence = sentiment_score
     else:
         decision = models.ModerationDecision.APPROVED
         confidence = max(toxicity_signal, sentiment_score)
+    return decision, confidence
 
-    return models.ModerationResult(
-        request_id="",
-        decision=decision,
-        confidence_score=confidence,
-        model_version="unitary/toxic-bert",
-        label_scores=scores,
-    )
+
+def evaluate_texts(
+    texts: List[str],
+    toxicity_classifier=None,
+    sentiment_classifier=None,
+    model_version: str = TOXICITY_MODEL_ID,
+    detectors: BatchDetectors = None,
+) -> List[models.ModerationResult]:
+    """Classify a batch of texts with one forward pass per model.
+
+    Each model only sees the comments whose ``detectors`` include it. Without explicit
+    pipelines the default hub models are loaded on first use.
+    """
+    if not texts:
+        return []
+    toxicity_scores: List[Dict[str, float]] = [{} for _ in texts]
+    sentiment_scores = [0.0] * len(texts)
+    needing = items_needing(detectors, TOXICITY_DETECTOR, len(texts))
+    if needing:
+        classifier = toxicity_classifier or _get_toxicity_classifier()
+        outputs = classifier([texts[index] for index in needing], batch_size=len(needing))
+        for index, raw_scores in zip(needing, outputs):
+            toxicity_scores[index] = _aggregate_scores(raw_scores)
+    needing = items_needing(detectors, SENTIMENT_DETECTOR, len(texts))
+    if needing:
+        scores = _negative_sentiment_scores([texts[index] for index in needing], sentiment_classifier)
+        for index, score in zip(needing, scores):
+            sentiment_scores[index] = score
+    results = []
+    for index, text in enumerate(texts):
+        with tracing.span("item", index=index):
+            results.append(
+                _build_result(
+                    text,
+                    toxicity_scores[index],
+                    sentiment_scores[index],
+                    model_version,
+                    detectors[index] if detectors is not None else None,
+                )
+            )
+    return results
+
+
+def evaluate_lexical(text: str) -> models.ModerationResult:
+    """Keyword heuristic and decision rules only: the degraded-mode fallback.
+
+    Only a decisive keyword rejects outright; any weaker keyword hit is too uncertain
+    without the model and goes to human review.
+    """
+    result = _build_result(text, {}, None, model_version=LEXICAL_MODEL_VERSION)
+    keyword_score = result.label_scores["keyword_heuristic"]
+    if keyword_score > 0.0 and result.decision is models.ModerationDecision.APPROVED:
+        result.decision = models.ModerationDecision.HUMAN_REVIEW
+    return result
+
+
+def evaluate_text(text: str) -> models.ModerationResult:
+    """Classify text toxicity using ML model plus lexical and sentiment heuristics."""
+    return evaluate_texts([text])[0]
@@ -0,0 +1,176 @@
+"""Webhook delivery from the durable outbox.
+
+Completed decisions and moderator overrides are written to ``webhookevent`` in the same
+transaction as the result (see ``store``), so an event exists exactly when its decision
+does and the request path never waits for a subscriber. A background task claims due
+events, coalesces them per endpoint into batches of ``WEBHOOK_BATCH_SIZE`` and POSTs
+them over one pooled HTTP client. A failed batch is retried with exponential backoff
+and jitter until ``WEBHOOK_MAX_ATTEMPTS``. Claims hold a lease (``SKIP LOCKED`` on
+PostgreSQL), so every worker can run a dispatcher; delivery is at-least-once and
+receivers deduplicate on ``event_id``.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import hmac
+import logging
+import random
+import time
+from datetime import datetime, timedelta
+from functools import lru_cache
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
+
+from app.config import settings
+from app.core import metrics, store
+from app.core.models import WebhookEventStatus
+from app.db import models as db_models
+from app.db.session import get_session
+
+if TYPE_CHECKING:
+    import httpx
+
+logger = logging.getLogger(__name__)
+
+SIGNATURE_HEADER = "X-Moderation-Signature"
+# Endpoint batches claimed per poll.
+_CLAIM_BATCHES = 8
+
+WEBHOOK_EVENTS_TOTAL = metrics.Counter(
+    "moderation_webhook_events_total",
+    "Webhook events by delivery outcome.",
+    ("outcome",),
+)
+WEBHOOK_DELIVERY_SECONDS = metrics.Histogram(
+    "moderation_webhook_delivery_seconds",
+    "Duration of webhook batch POSTs.",
+)
+
+
+def sign(secret: str, body: bytes) -> str:
+    return "sha256=" + hmac.new(secret.encode("utf-8"), body, hashlib.sha256).hexdigest()
+
+
+def backoff_seconds(attempts: int) -> float:
+    delay = min(
+        settings.webhook_backoff_base_seconds * 2 ** (attempts - 1),
+        settings.webhook_backoff_max_seconds,
+    )
+    return delay * random.uniform(0.5, 1.0)
+
+
+class WebhookDispatcher:
+    def __init__(self) -> None:
+        self._task: Optional[asyncio.Task] = None
+        self._client: Optional[httpx.AsyncClient] = None
+
+    def start(self) -> None:
+        if not settings.webhooks_enabled or self._task is not None:
+            return
+        self._task = asyncio.create_task(self._run(), name="webhook-dispatcher")
+
+    def _http_client(self) -> "httpx.AsyncClient":
+        # Created on the first delivery: httpx and its transports add ~200 ms to startup.
+        if self._client is None:
+            import httpx
+
+            self._client = httpx.AsyncClient(
+                timeout=settings.webhook_timeout_seconds,
+                limits=httpx.Limits(
+                    max_connections=settings.webhook_max_connections,
+                    max_keepalive_connections=settings.webhook_max_connections,
+                ),
+            )
+        return self._client
+
+    async def stop(self) -> None:
+        task, self._task = self._task, None
+        if task is not None:
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                claimed = await self.dispatch_once()
+            except Exception:  # noqa: BLE001 - keep dispatching after a database hiccup
+                logger.exception("Webhook dispatch failed")
+                claimed = 0
+            # A full claim means more events are due: go again without sleeping.
+            if claimed < settings.webhook_batch_size * _CLAIM_BATCHES:
+                await asyncio.sleep(settings.webhook_poll_interval_seconds)
+
+    async def dispatch_once(self) -> int:
+        """Deliver one round of due events; returns how many were claimed."""
+        batch_size = settings.webhook_batch_size
+        # Every claimed batch may wait for a pooled connection before its own timeout.
+        lease = settings.webhook_timeout_seconds * (_CLAIM_BATCHES + 2)
+        async with get_session() as session:
+            claimed = await store.claim_webhook_events(session, batch_size * _CLAIM_BATCHES, lease)
+        endpoints: Dict[Tuple[Optional[str], Optional[str]], List[db_models.WebhookEvent]] = {}
+        for event, service in claimed:
+            endpoints.setdefault((service.webhook_url, service.webhook_secret), []).append(event)
+        await asyncio.gather(
+            *(
+                self._deliver(url, secret, events[start:start + batch_size])
+                for (url, secret), events in endpoints.items()
+                for start in range(0, len(events), batch_size)
+            )
+        )
+        return len(claimed)
+
+    async def _deliver(
+        self, url: Optional[str], secret: Optional[str], events: List[db_models.WebhookEvent]
+    ) -> None:
+        event_ids = [event.event_id for event in events]
+        if not url:
+            # The webhook was removed after these events were queued.
+            async with get_session() as session:
+                await store.record_webhook_attempt(session, event_ids, WebhookEventStatus.DISCARDED)
+            WEBHOOK_EVENTS_TOTAL.inc(len(events), outcome="discarded")
+            return
+
+        client = self._http_client()
+        body = ('{"events":[' + ",".join(event.payload for event in events) + "]}").encode("utf-8")
+        headers = {"Content-Type": "application/json"}
+        if secret:
+            headers[SIGNATURE_HEADER] = sign(secret, body)
+        started = time.perf_counter()
+        try:
+            response = await client.post(url, content=body, headers=headers)
+            error = None if response.is_success else f"HTTP {response.status_code}"
+        except Exception as exc:  # noqa: BLE001 - a failed attempt, retried like any other
+            error = f"{type(exc).__name__}: {exc}"
+        WEBHOOK_DELIVERY_SECONDS.observe(time.perf_counter() - started)
+
+        async with get_session() as session:
+            if error is None:
+                await store.record_webhook_attempt(session, event_ids, WebhookEventStatus.DELIVERED)
+                WEBHOOK_EVENTS_TOTAL.inc(len(events), outcome="delivered")
+                return
+            logger.warning("Webhook delivery of %d events to %s failed: %s", len(events), url, error)
+            by_attempts: Dict[int, List[db_models.WebhookEvent]] = {}
+            for event in events:
+                by_attempts.setdefault(event.attempts + 1, []).append(event)
+            for attempts, group in by_attempts.items():
+                group_ids = [event.event_id for event in group]
+                if attempts >= settings.webhook_max_attempts:
+                    await store.record_webhook_attempt(
+                        session, group_ids, WebhookEventStatus.FAILED, error=error
+                    )
+                    WEBHOOK_EVENTS_TOTAL.inc(len(group), outcome="failed")
+                else:
+                    retry_at = datetime.utcnow() + timedelta(seconds=backoff_seconds(attempts))
+                    await store.record_webhook_attempt(
+                        session, group_ids, WebhookEventStatus.PENDING, retry_at, error
+                    )
+                    WEBHOOK_EVENTS_TOTAL.inc(len(group), outcome="retried")
+
+
+@lru_cache(maxsize=1)
+def get_webhook_dispatcher() -> WebhookDispatcher:
+    return WebhookDispatcher()
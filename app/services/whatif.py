@@ -0,0 +1,151 @@
+"""What-if replay: the decisions history would have received under other thresholds.
+
+Stored ``label_scores`` already hold every signal ``text._decide`` reads (model labels,
+``keyword_heuristic``, ``sentiment_negative``), so history is re-decided without running
+a model. Rows are streamed in chunks; each chunk is decided in a few numpy passes and
+tallied per service, so memory is bounded by the chunk size, not the table. Results
+stored without model scores keep their decision and do not count as replayed. Decisions
+a moderator made are not the thresholds' to change: they keep their decision and are
+counted separately as ``overridden``.
+"""
+
+from __future__ import annotations
+
+import json
+import uuid
+from dataclasses import dataclass, field
+from typing import Dict, List, Sequence
+
+import numpy as np
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core import models, store
+from app.services import text as text_service
+
+DECISIONS = (
+    models.ModerationDecision.APPROVED,
+    models.ModerationDecision.REJECTED,
+    models.ModerationDecision.HUMAN_REVIEW,
+)
+_APPROVED, _REJECTED, _HUMAN_REVIEW = range(len(DECISIONS))
+_DECISION_CODES = {decision.value: code for code, decision in enumerate(DECISIONS)}
+_ACTION_CODES = {
+    models.RuleAction.AUTO_APPROVE: _APPROVED,
+    models.RuleAction.AUTO_REJECT: _REJECTED,
+    models.RuleAction.FLAG_FOR_REVIEW: _HUMAN_REVIEW,
+}
+_MODEL_LABELS = list(text_service.TOXIC_LABELS)
+_KEYWORD, _SENTIMENT = "keyword_heuristic", "sentiment_negative"
+
+
+@dataclass
+class _Tally:
+    total: int = 0
+    replayed: int = 0
+    overridden: int = 0
+    changed: int = 0
+    current: np.ndarray = field(default_factory=lambda: np.zeros(len(DECISIONS), dtype=np.int64))
+    proposed: np.ndarray = field(default_factory=lambda: np.zeros(len(DECISIONS), dtype=np.int64))
+
+
+def decide(
+    scores: np.ndarray,
+    labels: Sequence[str],
+    reject: float,
+    review: float,
+    sentiment_review: float,
+    rules: Sequence[models.WhatIfRule] = (),
+) -> np.ndarray:
+    """Vectorised ``text._decide`` plus label rules: one decision code per row of ``scores``.
+
+    ``scores`` has one column per entry of ``labels``; missing scores must be 0. Rules
+    are applied in priority order and the first matching rule overrides the thresholds.
+    """
+    column = {label: index for index, label in enumerate(labels)}
+    toxicity = scores[:, [column[label] for label in _MODEL_LABELS + [_KEYWORD]]].max(axis=1)
+    codes = np.full(len(scores), _APPROVED, dtype=np.int8)
+    codes[scores[:, column[_SENTIMENT]] >= sentiment_review] = _HUMAN_REVIEW
+    codes[toxicity >= review] = _HUMAN_REVIEW
+    codes[toxicity >= reject] = _REJECTED
+    matched = np.zeros(len(scores), dtype=bool)
+    for rule in sorted(rules, key=lambda rule: rule.priority):
+        hit = ~matched & (scores[:, column[rule.label]] >= rule.min_score)
+        codes[hit] = _ACTION_CODES[rule.action]
+        matched |= hit
+    return codes
+
+
+async def replay(session: AsyncSession, request: models.WhatIfRequest) -> models.WhatIfReport:
+    reject = request.auto_reject_threshold
+    review = request.human_review_threshold
+    sentiment_review = request.sentiment_review_threshold
+    reject = text_service.REJECT_THRESHOLD if reject is None else reject
+    review = text_service.REVIEW_THRESHOLD if review is None else review
+    sentiment_review = text_service.SENTIMENT_REVIEW_THRESHOLD if sentiment_review is None else sentiment_review
+    labels = list(dict.fromkeys(_MODEL_LABELS + [_KEYWORD, _SENTIMENT] + [rule.label for rule in request.rules]))
+
+    tallies: Dict[str, _Tally] = {}
+    async for chunk in store.iter_decision_scores(
+        session,
+        uuid.UUID(request.service_id) if request.service_id else None,
+        request.since,
+        request.until,
+    ):
+        stored = [json.loads(raw) if raw else {} for _, _, raw, _ in chunk]
+        scores = np.array([[row.get(label, np.nan) for label in labels] for row in stored], dtype=np.float64)
+        scores = scores.reshape(len(stored), len(labels))
+        overridden = np.array([moderated for _, _, _, moderated in chunk], dtype=bool)
+        replayable = ~np.isnan(scores[:, : len(_MODEL_LABELS)]).all(axis=1) & ~overridden
+        current = np.array([_DECISION_CODES[decision] for _, decision, _, _ in chunk], dtype=np.int8)
+        proposed = decide(np.nan_to_num(scores, nan=0.0), labels, reject, review, sentiment_review, request.rules)
+        proposed = np.where(replayable, proposed, current)
+
+        services, service_index = np.unique([str(service_id) for service_id, _, _, _ in chunk], return_inverse=True)
+        width = len(DECISIONS)
+        current_counts = np.bincount(service_index * width + current, minlength=len(services) * width)
+        proposed_counts = np.bincount(service_index * width + proposed, minlength=len(services) * width)
+        totals = np.bincount(service_index, minlength=len(services))
+        replayed = np.bincount(service_index, weights=replayable, minlength=len(services))
+        overridden_counts = np.bincount(service_index, weights=overridden, minlength=len(services))
+        changed = np.bincount(service_index, weights=proposed != current, minlength=len(services))
+        for index, service_id in enumerate(services):
+            tally = tallies.setdefault(service_id, _Tally())
+            tally.total += int(totals[index])
+            tally.replayed += int(replayed[index])
+            tally.overridden += int(overridden_counts[index])
+            tally.changed += int(changed[index])
+            tally.current += current_counts[index * width:(index + 1) * width]
+            tally.proposed += proposed_counts[index * width:(index + 1) * width]
+
+    return models.WhatIfReport(
+        auto_reject_threshold=reject,
+        human_review_threshold=review,
+        sentiment_review_threshold=sentiment_review,
+        services=[
+            models.WhatIfServiceReport(
+                service_id=service_id,
+                total=tally.total,
+                replayed=tally.replayed,
+                overridden=tally.overridden,
+                changed=tally.changed,
+                current=_by_decision(tally.current),
+                proposed=_by_decision(tally.proposed),
+            )
+            for service_id, tally in sorted(tallies.items())
+        ],
+    )
+
+
+def _by_decision(counts: np.ndarray) -> Dict[models.ModerationDecision, int]:
+    return {decision: int(count) for decision, count in zip(DECISIONS, counts)}
+
+
+def parse_rule(value: str) -> models.WhatIfRule:
+    """``LABEL:MIN_SCORE:ACTION[:PRIORITY]`` as accepted by ``python -m app.cli what-if --rule``."""
+    parts: List[str] = value.split(":")
+    if len(parts) not in (3, 4):
+        raise ValueError(f"Rule must look like LABEL:MIN_SCORE:ACTION[:PRIORITY], got {value!r}")
+    rule = {"label": parts[0], "min_score": parts[1], "action": parts[2]}
+    if len(parts) == 4:
+        rule["priority"] = parts[3]
+    return models.WhatIfRule.model_validate(rule)
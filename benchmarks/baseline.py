@@ -0,0 +1,93 @@
+"""Machine-readable benchmark baselines and regression comparison."""
+
+from __future__ import annotations
+
+import json
+import math
+import platform
+import subprocess
+from datetime import datetime
+from typing import Dict, List, Sequence
+
+# Metrics where a larger value is better; everything else is a latency.
+HIGHER_IS_BETTER = ("throughput_rps", "ops_per_sec")
+
+
+def percentile(values: Sequence[float], fraction: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, math.ceil(fraction * len(ordered)) - 1))
+    return ordered[index]
+
+
+def latency_summary(values_ms: Sequence[float]) -> Dict[str, float]:
+    return {
+        "count": len(values_ms),
+        "mean_ms": sum(values_ms) / len(values_ms) if values_ms else 0.0,
+        "p50_ms": percentile(values_ms, 0.50),
+        "p95_ms": percentile(values_ms, 0.95),
+        "p99_ms": percentile(values_ms, 0.99),
+    }
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def write_baseline(path: str, suite: str, scenarios: Dict[str, Dict]) -> None:
+    payload = {
+        "suite": suite,
+        "meta": {
+            "git_commit": _git_commit(),
+            "created_at": datetime.utcnow().isoformat(),
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+        },
+        "scenarios": scenarios,
+    }
+    with open(path, "w", encoding="utf-8") as handle:
+        json.dump(payload, handle, indent=2, sort_keys=True)
+
+
+def _flatten(data: Dict, prefix: str = "") -> Dict[str, float]:
+    flat: Dict[str, float] = {}
+    for key, value in data.items():
+        name = f"{prefix}.{key}" if prefix else key
+        if isinstance(value, dict):
+            flat.update(_flatten(value, name))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[name] = float(value)
+    return flat
+
+
+def compare(previous_path: str, scenarios: Dict[str, Dict], tolerance: float) -> List[str]:
+    """Return human-readable regressions beyond ``tolerance`` (0.1 == 10%)."""
+    with open(previous_path, encoding="utf-8") as handle:
+        previous = json.load(handle)["scenarios"]
+    regressions = []
+    for scenario, current in scenarios.items():
+        if scenario not in previous:
+            continue
+        before, after = _flatten(previous[scenario]), _flatten(current)
+        for metric, old in before.items():
+            new = after.get(metric)
+            if new is None or old <= 0 or metric.endswith("count"):
+                continue
+            if not metric.endswith(HIGHER_IS_BETTER) and not metric.endswith("_ms"):
+                continue
+            change = (new - old) / old
+            worse = -change if metric.endswith(HIGHER_IS_BETTER) else change
+            if worse > tolerance:
+                regressions.append(
+                    f"{scenario} {metric}: {old:.3f} -> {new:.3f} ({change:+.1%})"
+                )
+    return regressions
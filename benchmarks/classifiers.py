@@ -0,0 +1,69 @@
+"""Throughput of classifier backends (texts per second) at several batch sizes.
+
+    python -m benchmarks.classifiers --backends linear,transformers --batch-sizes 1,8,32
+"""
+
+from __future__ import annotations
+
+import argparse
+import itertools
+import sys
+import time
+from typing import Dict, List, Optional
+
+from benchmarks.baseline import write_baseline
+from benchmarks.thread_sweep import SAMPLE_COMMENTS
+
+
+def measure_backend(name: str, batch_size: int, duration: float) -> Dict[str, float]:
+    from app.services.classifiers import get_classifier
+
+    classifier = get_classifier(name)
+    comments = itertools.cycle(SAMPLE_COMMENTS)
+    classifier.evaluate([next(comments) for _ in range(batch_size)])
+
+    processed = 0
+    started = time.perf_counter()
+    while time.perf_counter() - started < duration:
+        classifier.evaluate([next(comments) for _ in range(batch_size)])
+        processed += batch_size
+    elapsed = time.perf_counter() - started
+    return {"throughput_rps": processed / elapsed, "mean_batch_ms": elapsed / (processed / batch_size) * 1000.0}
+
+
+def _list(value: str) -> List[str]:
+    return [item.strip() for item in value.split(",") if item.strip()]
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--backends", type=_list, default=["linear", "transformers"])
+    parser.add_argument("--batch-sizes", type=lambda value: [int(v) for v in _list(value)], default=[1, 8, 32])
+    parser.add_argument("--duration", type=float, default=5.0, help="seconds per measurement")
+    parser.add_argument("--output", help="write a baseline JSON file")
+    args = parser.parse_args(argv)
+
+    scenarios: Dict[str, Dict[str, float]] = {}
+    for backend, batch_size in itertools.product(args.backends, args.batch_sizes):
+        result = measure_backend(backend, batch_size, args.duration)
+        scenarios[f"{backend}/b{batch_size}"] = result
+        print(
+            f"{backend:<14} batch={batch_size:<4} {result['throughput_rps']:10.1f} texts/s "
+            f"({result['mean_batch_ms']:.2f} ms/batch)"
+        )
+
+    by_batch = {}
+    for key, result in scenarios.items():
+        backend, batch = key.split("/")
+        by_batch.setdefault(batch, {})[backend] = result["throughput_rps"]
+    for batch, results in by_batch.items():
+        if "linear" in results and "transformers" in results:
+            print(f"{batch}: linear is {results['linear'] / results['transformers']:.0f}x faster")
+
+    if args.output:
+        write_baseline(args.output, "classifiers", scenarios)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
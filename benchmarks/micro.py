@@ -0,0 +1,246 @@
+"""Micro-benchmarks for hot functions at realistic table sizes.
+
+Covers ``evaluate_text`` (stub classifier unless ``--real-models``), ``_keyword_score``,
+building the ``/moderation/text`` response body, ``store.validate_api_key`` and
+``store.compute_statistics``. Tables are filled in a
+scratch database (SQLite by default) with bulk inserts; only the key under test is
+bcrypt-hashed, the rest get dummy hashes with distinct prefixes. Example::
+
+    python -m benchmarks.micro --api-keys 10000 --requests 100000 --output micro.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import secrets
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from benchmarks.baseline import compare, latency_summary, write_baseline
+from benchmarks.thread_sweep import SAMPLE_COMMENTS
+
+
+def _measure(func: Callable[[], object], repeat: int) -> Dict[str, float]:
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - started) * 1000.0)
+    summary = latency_summary(samples)
+    summary["ops_per_sec"] = 1000.0 / summary["mean_ms"] if summary["mean_ms"] else 0.0
+    return summary
+
+
+async def _measure_async(func: Callable[[], Awaitable[object]], repeat: int) -> Dict[str, float]:
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        await func()
+        samples.append((time.perf_counter() - started) * 1000.0)
+    summary = latency_summary(samples)
+    summary["ops_per_sec"] = 1000.0 / summary["mean_ms"] if summary["mean_ms"] else 0.0
+    return summary
+
+
+def bench_text(real_models: bool, repeat: int) -> Dict[str, Dict[str, float]]:
+    from app.services import text as text_service
+    from benchmarks import stub
+
+    evaluate = text_service.evaluate_text if real_models else (
+        lambda comment: stub.stub_evaluate_texts([comment])[0]
+    )
+    comments = iter(SAMPLE_COMMENTS * (repeat // len(SAMPLE_COMMENTS) + 1))
+    evaluate(SAMPLE_COMMENTS[0])
+    return {
+        "evaluate_text": _measure(lambda: evaluate(next(comments)), repeat),
+        "keyword_score": _measure(
+            lambda: [text_service._keyword_score(comment) for comment in SAMPLE_COMMENTS],
+            repeat,
+        ),
+    }
+
+
+def bench_response(repeat: int) -> Dict[str, Dict[str, float]]:
+    """CPU spent turning a stored decision into the ``/moderation/text`` body.
+
+    ``response_model`` is the former path: ORM rows mapped to the API models (with a
+    ``label_scores`` JSON round trip), then validated and serialized by FastAPI's
+    response field. ``lean_response`` is what the route does now.
+    """
+    from app.api import routes_moderation
+    from app.core import models, store
+    from app.db import models as db_models
+    from app.services import text as text_service
+
+    field = next(route for route in routes_moderation.router.routes if route.path.endswith("/text")).response_field
+    labels = list(text_service.TOXIC_LABELS) + ["keyword_heuristic", "sentiment_negative"]
+    result = models.ModerationResult(
+        request_id="",
+        decision=models.ModerationDecision.APPROVED,
+        confidence_score=0.12,
+        model_version="micro",
+        label_scores={label: 0.01 * index for index, label in enumerate(labels)},
+    )
+    db_request = db_models.ModerationRequest(
+        request_id=uuid.uuid4(),
+        service_id=uuid.uuid4(),
+        timestamp=datetime.utcnow(),
+        content_type="TEXT",
+        content_text=SAMPLE_COMMENTS[0],
+        status="COMPLETED",
+    )
+    db_result = db_models.ModerationResult(
+        result_id=uuid.uuid4(),
+        request_id=db_request.request_id,
+        decision=result.decision.value,
+        confidence_score=result.confidence_score,
+        processed_at=result.processed_at,
+        model_version=result.model_version,
+        label_scores=json.dumps(result.label_scores),
+    )
+
+    def response_model() -> bytes:
+        response = models.ModerationResponse(
+            request=store.map_request_to_api(db_request), result=store.map_result_to_api(db_result)
+        )
+        value, _ = field.validate(response, {}, loc=("response",))
+        return field.serialize_json(value)
+
+    def lean_response() -> bytes:
+        return routes_moderation.moderation_response_body(db_request, db_result, result)
+
+    if json.loads(response_model()) != json.loads(lean_response()):
+        raise AssertionError("lean response body differs from the response_model body")
+    return {
+        "response_model": _measure(response_model, repeat),
+        "lean_response": _measure(lean_response, repeat),
+    }
+
+
+async def _populate(session, api_keys: int, requests: int):
+    from sqlalchemy import insert
+
+    from app.db import models
+
+    target = models.WebService(name="micro-target", contact_email="bench@example.com")
+    other = models.WebService(name="micro-other", contact_email="bench@example.com")
+    session.add_all([target, other])
+    await session.commit()
+
+    plain_key = models.APIKey.generate_plain_key()
+    key_hash, prefix = models.APIKey.hash_key(plain_key)
+    rows = [{"key_id": uuid.uuid4(), "service_id": target.service_id, "key_hash": key_hash, "key_prefix": prefix}]
+    dummy_hash = "$2b$12$" + "x" * 53
+    rows += [
+        {
+            "key_id": uuid.uuid4(),
+            "service_id": other.service_id,
+            "key_hash": dummy_hash,
+            "key_prefix": secrets.token_urlsafe(6)[:8],
+        }
+        for _ in range(max(api_keys - 1, 0))
+    ]
+    await session.execute(insert(models.APIKey), rows)
+
+    decisions = ("APPROVED", "APPROVED", "APPROVED", "REJECTED", "HUMAN_REVIEW")
+    started = datetime.utcnow() - timedelta(days=30)
+    for offset in range(0, requests, 5000):
+        chunk = range(offset, min(offset + 5000, requests))
+        request_rows = []
+        result_rows = []
+        for index in chunk:
+            request_id = uuid.uuid4()
+            service_id = target.service_id if index % 2 == 0 else other.service_id
+            request_rows.append(
+                {
+                    "request_id": request_id,
+                    "service_id": service_id,
+                    "timestamp": started + timedelta(seconds=index),
+                    "content_type": "TEXT",
+                    "content_text": SAMPLE_COMMENTS[index % len(SAMPLE_COMMENTS)],
+                    "status": "COMPLETED",
+                }
+            )
+            result_rows.append(
+                {
+                    "result_id": uuid.uuid4(),
+                    "request_id": request_id,
+                    "decision": decisions[index % len(decisions)],
+                    "confidence_score": 0.5,
+                    "processed_at": started + timedelta(seconds=index),
+                    "model_version": "micro",
+                    "label_scores": "{}",
+                }
+            )
+        await session.execute(insert(models.ModerationRequest), request_rows)
+        await session.execute(insert(models.ModerationResult), result_rows)
+    await session.commit()
+    return target.service_id, plain_key
+
+
+async def bench_store(api_keys: int, requests: int, repeat: int) -> Dict[str, Dict[str, float]]:
+    from app.core import store
+    from app.db.session import get_session, run_migrations
+
+    await run_migrations()
+    async with get_session() as session:
+        service_id, plain_key = await _populate(session, api_keys, requests)
+    async with get_session() as session:
+        return {
+            f"validate_api_key[{api_keys}]": await _measure_async(
+                lambda: store.validate_api_key(session, plain_key), repeat
+            ),
+            f"compute_statistics[{requests}]": await _measure_async(
+                lambda: store.compute_statistics(session, service_id), max(1, repeat // 5)
+            ),
+        }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Moderation micro-benchmarks")
+    parser.add_argument("--database-url", help="scratch database (default: temporary SQLite)")
+    parser.add_argument("--api-keys", type=int, default=10_000)
+    parser.add_argument("--requests", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--real-models", action="store_true")
+    parser.add_argument("--output", help="write a baseline JSON file")
+    parser.add_argument("--compare", help="baseline JSON to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.10)
+    args = parser.parse_args(argv)
+
+    scratch_dir = None
+    if args.database_url is None:
+        scratch_dir = tempfile.mkdtemp(prefix="moderation-micro-")
+        args.database_url = f"sqlite+aiosqlite:///{os.path.join(scratch_dir, 'micro.db')}"
+    # Settings are read at import time, so the URL must be set before importing app.
+    os.environ["DATABASE_URL"] = args.database_url
+    os.environ["ALLOW_SQLITE_FALLBACK"] = "false"
+
+    results = bench_text(args.real_models, args.repeat * 20)
+    results.update(bench_response(args.repeat * 200))
+    results.update(asyncio.run(bench_store(args.api_keys, args.requests, args.repeat)))
+    for name, summary in results.items():
+        print(
+            f"{name:<34} mean={summary['mean_ms']:9.4f}ms p95={summary['p95_ms']:9.4f}ms "
+            f"({summary['ops_per_sec']:.1f} ops/s)"
+        )
+
+    if args.output:
+        write_baseline(args.output, "micro", {"micro": results})
+    if args.compare:
+        regressions = compare(args.compare, {"micro": results}, args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
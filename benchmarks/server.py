@@ -0,0 +1,37 @@
+"""Run the moderation app for benchmarking, optionally with the stub classifier.
+
+The database URL is taken from ``DATABASE_URL`` like the real service; the load
+generator starts this module in a subprocess per database under test::
+
+    DATABASE_URL=sqlite+aiosqlite:///./bench.db python -m benchmarks.server --stub --port 8100
+"""
+
+from __future__ import annotations
+
+import argparse
+from typing import List, Optional
+
+import uvicorn
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Run the app for benchmarks")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--stub", action="store_true", help="use the stub classifier")
+    parser.add_argument("--stub-batch-ms", type=float, default=5.0)
+    parser.add_argument("--stub-item-ms", type=float, default=2.0)
+    args = parser.parse_args(argv)
+
+    from app import create_app
+
+    app = create_app()
+    if args.stub:
+        from benchmarks import stub
+
+        stub.install(batch_ms=args.stub_batch_ms, item_ms=args.stub_item_ms)
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
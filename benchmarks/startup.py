@@ -0,0 +1,138 @@
+"""Startup budget: import time of ``app`` and time until a fresh process serves.
+
+Each sample runs in a new interpreter so caches from earlier samples do not leak in.
+``import`` parses ``python -X importtime -c "import app"``; ``start_cold`` runs the
+startup hooks against an empty SQLite database (schema, demo data with bcrypt hashing),
+``start_warm`` against the same database again, where the schema fingerprint matches
+and DDL is skipped. The run fails when a warm start imports a module that must load
+lazily (transformers, torch, passlib), or when ``--budget-ms`` is exceeded::
+
+    python -m benchmarks.startup --repeat 5 --budget-ms 1500 --output startup.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+import tempfile
+from typing import Dict, List, Optional, Tuple
+
+from benchmarks.baseline import compare, latency_summary, write_baseline
+
+# Must stay out of the process until first inference / first password check.
+DEFERRED_MODULES = ("transformers", "torch", "passlib", "bcrypt")
+
+_IMPORTTIME_RE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$")
+
+_START_SNIPPET = """
+import asyncio, json, sys, time
+started = time.perf_counter()
+from app import create_app
+app = create_app()
+
+async def serve():
+    for handler in app.router.on_startup:
+        await handler()
+    ready = time.perf_counter()
+    for handler in app.router.on_shutdown:
+        await handler()
+    return ready
+
+ready = asyncio.run(serve())
+print(json.dumps({
+    "ms": (ready - started) * 1000.0,
+    "deferred_loaded": sorted(m for m in %r if m in sys.modules),
+}))
+""" % (DEFERRED_MODULES,)
+
+
+def parse_importtime(stderr: str) -> Tuple[float, Dict[str, float]]:
+    """Total milliseconds for ``app`` and cumulative milliseconds per top-level package."""
+    total = 0.0
+    packages: Dict[str, float] = {}
+    for line in stderr.splitlines():
+        match = _IMPORTTIME_RE.match(line)
+        if match is None:
+            continue
+        cumulative_ms = int(match.group(2)) / 1000.0
+        name = match.group(4)
+        if name == "app":
+            total = cumulative_ms
+        elif "." not in name:
+            packages[name] = max(packages.get(name, 0.0), cumulative_ms)
+    return total, packages
+
+
+def _run(args: List[str], env: Dict[str, str]) -> subprocess.CompletedProcess:
+    return subprocess.run(
+        [sys.executable, *args], capture_output=True, text=True, check=True, env=env
+    )
+
+
+def measure(repeat: int) -> Tuple[Dict[str, Dict[str, float]], Dict[str, float], List[str]]:
+    env = dict(os.environ)
+    imports: List[float] = []
+    packages: Dict[str, float] = {}
+    for _ in range(repeat):
+        total, per_package = parse_importtime(_run(["-X", "importtime", "-c", "import app"], env).stderr)
+        imports.append(total)
+        packages = per_package
+
+    cold: List[float] = []
+    warm: List[float] = []
+    deferred_loaded: List[str] = []
+    for _ in range(repeat):
+        with tempfile.TemporaryDirectory(prefix="moderation-startup-") as scratch:
+            env["DATABASE_URL"] = f"sqlite+aiosqlite:///{os.path.join(scratch, 'startup.db')}"
+            env["ALLOW_SQLITE_FALLBACK"] = "false"
+            for samples in (cold, warm):
+                report = json.loads(_run(["-c", _START_SNIPPET], env).stdout.strip().splitlines()[-1])
+                samples.append(report["ms"])
+            # A cold start hashes the demo credentials, so only the warm one is checked.
+            deferred_loaded = sorted(set(deferred_loaded) | set(report["deferred_loaded"]))
+
+    results = {
+        "import": latency_summary(imports),
+        "start_cold": latency_summary(cold),
+        "start_warm": latency_summary(warm),
+    }
+    return results, packages, deferred_loaded
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Import and startup time of the service")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10, help="heaviest packages to list")
+    parser.add_argument("--budget-ms", type=float, help="fail when warm start p50 exceeds this")
+    parser.add_argument("--output", help="write a baseline JSON file")
+    parser.add_argument("--compare", help="baseline JSON to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.10)
+    args = parser.parse_args(argv)
+
+    results, packages, deferred_loaded = measure(args.repeat)
+    for name, summary in results.items():
+        print(f"{name:<12} p50={summary['p50_ms']:8.1f}ms p95={summary['p95_ms']:8.1f}ms")
+    print("heaviest packages (cumulative import ms):")
+    for name, value in sorted(packages.items(), key=lambda item: -item[1])[: args.top]:
+        print(f"  {name:<24} {value:8.1f}")
+
+    failures = [f"deferred module imported during startup: {name}" for name in deferred_loaded]
+    if args.budget_ms is not None and results["start_warm"]["p50_ms"] > args.budget_ms:
+        failures.append(
+            f"warm start p50 {results['start_warm']['p50_ms']:.1f}ms exceeds budget {args.budget_ms:.1f}ms"
+        )
+    if args.output:
+        write_baseline(args.output, "startup", {"startup": results})
+    if args.compare:
+        failures.extend(f"REGRESSION {line}" for line in compare(args.compare, {"startup": results}, args.tolerance))
+    for line in failures:
+        print(line)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,65 @@
+"""Deterministic stand-in for the transformer models.
+
+Scores are derived from a hash of the text, so the same comment always gets the same
+decision, and decisions go through the real heuristic and rule code. A configurable
+sleep per batch and per item imitates model cost without downloading weights.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import time
+from typing import List
+
+from app.core import models, tracing
+from app.services import text as text_service
+
+STUB_MODEL_ID = "benchmark-stub"
+
+batch_latency_ms = 0.0
+item_latency_ms = 0.0
+
+
+def _pseudo_score(text: str, salt: str) -> float:
+    digest = hashlib.blake2b(f"{salt}:{text}".encode("utf-8"), digest_size=4).digest()
+    return int.from_bytes(digest, "big") / 0xFFFFFFFF
+
+
+def stub_evaluate_texts(texts: List[str]) -> List[models.ModerationResult]:
+    with tracing.model_phase(STUB_MODEL_ID, "forward"):
+        delay = batch_latency_ms + item_latency_ms * len(texts)
+        if delay:
+            time.sleep(delay / 1000.0)
+    results = []
+    for index, text in enumerate(texts):
+        with tracing.span("item", index=index):
+            # Mostly benign with a toxic tail, roughly like real traffic.
+            scores = {
+                label: _pseudo_score(text, label) ** 4 for label in text_service.TOXIC_LABELS
+            }
+            sentiment = _pseudo_score(text, "sentiment") ** 2
+            results.append(
+                text_service._build_result(text, scores, sentiment, model_version=STUB_MODEL_ID)
+            )
+    return results
+
+
+class StubClassifier:
+    model_version = STUB_MODEL_ID
+
+    def evaluate(self, texts: List[str]) -> List[models.ModerationResult]:
+        return stub_evaluate_texts(texts)
+
+
+def install(batch_ms: float = 0.0, item_ms: float = 0.0) -> None:
+    """Register the stub as a classifier backend and make it the active one."""
+    global batch_latency_ms, item_latency_ms
+    from app.config import settings
+    from app.services.classifiers import register_backend
+
+    batch_latency_ms = batch_ms
+    item_latency_ms = item_ms
+    register_backend(STUB_MODEL_ID, StubClassifier)
+    # Runtime-registered backends cannot be chosen through CLASSIFIER_BACKEND, whose
+    # validator only knows the built-in ones, so select it on the live settings.
+    settings.classifier_backend = STUB_MODEL_ID
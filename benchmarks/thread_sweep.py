@@ -0,0 +1,120 @@
+"""Sweep worker count x intra-op threads to find the best inference throughput.
+
+Each combination starts ``W`` worker processes, configures torch with ``T`` threads,
+loads the models, waits on a barrier and then classifies sample comments for a fixed
+duration. Example::
+
+    python -m benchmarks.thread_sweep --workers 1,2,4 --threads 1,2,4 --duration 20 --pin
+"""
+
+from __future__ import annotations
+
+import argparse
+import itertools
+import json
+import multiprocessing as mp
+import os
+import time
+from typing import List, Optional, Set
+
+SAMPLE_COMMENTS = [
+    "Thanks for the detailed write-up, this helped a lot.",
+    "You are an idiot and nobody wants you here.",
+    "I hate this movie, the plot makes no sense at all.",
+    "Great article! Looking forward to the next part.",
+    "Buy cheap followers now, best spam offer in town!!!",
+    "Not sure I agree, but the argument is interesting.",
+]
+
+
+def _split_cpus(workers: int) -> List[Optional[Set[int]]]:
+    if not hasattr(os, "sched_getaffinity"):
+        return [None] * workers
+    available = sorted(os.sched_getaffinity(0))
+    chunk = max(1, len(available) // workers)
+    return [
+        set(available[index * chunk:(index + 1) * chunk]) or None for index in range(workers)
+    ]
+
+
+def _worker(threads: int, cpus: Optional[Set[int]], duration: float, barrier, results) -> None:
+    from app.services import runtime
+
+    if cpus:
+        runtime.pin_to_cpus(cpus)
+    runtime.configure_inference_runtime(intra_op_threads=threads, inter_op_threads=1)
+
+    from app.services.text import evaluate_text
+
+    for text in SAMPLE_COMMENTS:
+        evaluate_text(text)
+    barrier.wait()
+
+    processed = 0
+    deadline = time.perf_counter() + duration
+    for text in itertools.cycle(SAMPLE_COMMENTS):
+        if time.perf_counter() >= deadline:
+            break
+        evaluate_text(text)
+        processed += 1
+    results.put(processed)
+
+
+def run_combination(workers: int, threads: int, duration: float, pin: bool) -> dict:
+    ctx = mp.get_context("spawn")
+    barrier = ctx.Barrier(workers)
+    results = ctx.Queue()
+    cpu_sets = _split_cpus(workers) if pin else [None] * workers
+    processes = [
+        ctx.Process(target=_worker, args=(threads, cpu_sets[index], duration, barrier, results))
+        for index in range(workers)
+    ]
+    for process in processes:
+        process.start()
+    processed = sum(results.get() for _ in processes)
+    for process in processes:
+        process.join()
+    return {
+        "workers": workers,
+        "threads": threads,
+        "pinned": pin,
+        "processed": processed,
+        "throughput_rps": processed / duration,
+    }
+
+
+def _int_list(value: str) -> List[int]:
+    return [int(item) for item in value.split(",") if item.strip()]
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=_int_list, default=[1, 2, 4])
+    parser.add_argument("--threads", type=_int_list, default=[1, 2, 4])
+    parser.add_argument("--duration", type=float, default=15.0, help="seconds per combination")
+    parser.add_argument("--pin", action="store_true", help="split available CPUs between workers")
+    parser.add_argument("--json", dest="json_path", help="write raw results to this file")
+    args = parser.parse_args(argv)
+
+    rows = []
+    for workers, threads in itertools.product(args.workers, args.threads):
+        row = run_combination(workers, threads, args.duration, args.pin)
+        rows.append(row)
+        print(
+            f"workers={workers:<3} threads={threads:<3} "
+            f"throughput={row['throughput_rps']:8.2f} req/s"
+        )
+
+    best = max(rows, key=lambda row: row["throughput_rps"])
+    print(
+        f"\nBest: workers={best['workers']} threads={best['threads']} "
+        f"({best['throughput_rps']:.2f} req/s). Suggested env: "
+        f"INFERENCE_INTRA_OP_THREADS={best['threads']} INFERENCE_INTER_OP_THREADS=1"
+    )
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as handle:
+            json.dump({"results": rows, "best": best}, handle, indent=2)
+
+
+if __name__ == "__main__":
+    main()